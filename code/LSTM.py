@@ -6,6 +6,8 @@
 '''
 
 from readData import CARDIAC_EVENTS, TYPES_OF_EVENTS_DICT
+from batchGenerator import DEFAULT_BATCH_SIZE, DEFAULT_DTYPE, BatchFeed
+import metrics
 import numpy as np
 
 from keras.layers.core import Dense, Activation, Dropout
@@ -16,10 +18,13 @@ from keras.optimizers import SGD
 # Hyperparameters
 # batch_size = 32:
 epoch = 10
+validationSplit = 0.05
 
 def createModel(numOfBeats, numOfReadings, numOfOutcomes):
         '''
                 Creates, compiles and returns an LSTM model that can be used to predict episodes of VT.
+
+                [numOfBeats] may be None, in which case the model accepts sequences of any number of beats.
         '''
 
         model = Sequential()
@@ -53,80 +58,29 @@ def evaluateModel(rawPredictedY, rawActualY, verboseFile):
     
     (numOfTesting, numOfOutcomes) = np.shape(rawActualY)
     
-    # Convert probabilities in rawPredictedY into classifications.
-    predictedY = np.zeros((numOfTesting, 1), dtype=np.int16)
-    for testingIndex in range(numOfTesting):
-        
-        maxVal = 0
-        maxOutcomeIndex = 0
-        for outcomeIndex in range(numOfOutcomes):
-            val = rawPredictedY[testingIndex, outcomeIndex]
-            if (val > maxVal):
-                maxVal = val
-                maxOutcomeIndex = outcomeIndex
-        
-        predictedY[testingIndex, 0] = maxOutcomeIndex
-
-    # Convert binary things in rawPredictedY into classficiations.
-    actualY = np.zeros((numOfTesting, 1), dtype=np.int16)
-    for testingIndex in range(numOfTesting):
-        for outcomeIndex in range(numOfOutcomes):
-            if (rawActualY[testingIndex, outcomeIndex] == 1):
-                actualY[testingIndex, 0] = outcomeIndex
-
-    # Set up dictionaries that keep track of the actual and predicted numbers
-    # of each cardiac event.
-    numOfEachAuxPredicted = {}
-    numOfEachAuxActual = {}
-    for aux in TYPES_OF_EVENTS_DICT:
-        numOfEachAuxPredicted[aux] = 0
-        numOfEachAuxActual[aux] = 0
-
-    # Compute entries in dictionaries that keep track of the actual and predicted
-    # numbers of each cardiac event.
-    for index in range(numOfTesting):
-        predictedAux = CARDIAC_EVENTS[predictedY[index, 0]]
-        actualAux = CARDIAC_EVENTS[actualY[index, 0]]
-            
-        numOfEachAuxPredicted[predictedAux] = numOfEachAuxPredicted[predictedAux] + 1
-        numOfEachAuxActual[actualAux] = numOfEachAuxActual[actualAux] + 1
-
-    # Print entries in dictionaries that keep track of the actual and predicted
-    # numbers of each cardiac event.
+    # Convert the probabilities in rawPredictedY and the binary vectors in rawActualY into classifications,
+    # and count the number of [Beats] objects of every pair of actual and predicted cardiac events.
+    predictedY = metrics.getPredictedClasses(rawPredictedY)
+    actualY = metrics.getActualClasses(rawActualY)
+    confusionMatrix = metrics.getConfusionMatrices(actualY, predictedY, numOfOutcomes)
+
+    # Print the actual and predicted numbers of each cardiac event.
+    numOfEachAuxActual = confusionMatrix.sum(axis=1)
+    numOfEachAuxPredicted = confusionMatrix.sum(axis=0)
     for aux in TYPES_OF_EVENTS_DICT:
         verboseFile.write('Cardiac Event: ' + str(TYPES_OF_EVENTS_DICT[aux]) + '\n')
-        verboseFile.write('\tActual: ' + str(numOfEachAuxActual[aux]) + '\n')
-        verboseFile.write('\tPredicted: ' + str(numOfEachAuxPredicted[aux]) + '\n')
+        verboseFile.write('\tActual: ' + str(numOfEachAuxActual[CARDIAC_EVENTS.index(aux)]) + '\n')
+        verboseFile.write('\tPredicted: ' + str(numOfEachAuxPredicted[CARDIAC_EVENTS.index(aux)]) + '\n')
         verboseFile.write('')
 
     # Calculate specificity and sensitivity.
-    tn = 0
-    n = 0
-    tp = 0
-    p = 0
-    numOfCorrect = 0
-
     numForVT = CARDIAC_EVENTS.index('(VT')
-    for i in range(numOfTesting):
-        
-        if (actualY[i, 0] == predictedY[i, 0]):
-            numOfCorrect = numOfCorrect + 1
-            
-        # Positives
-        if (actualY[i, 0] == numForVT):
-            p = p + 1
-                    
-            # True positives
-            if (predictedY[i, 0] == numForVT):
-                tp = tp + 1
-        
-        # Negatives
-        else:
-            n = n + 1
-                    
-            # True negatives
-            if (predictedY[i, 0] != numForVT):
-                tn = tn + 1
+    numOfCorrect = np.trace(confusionMatrix)
+
+    p = confusionMatrix[numForVT, :].sum()
+    n = numOfTesting - p
+    tp = confusionMatrix[numForVT, numForVT]
+    tn = n - (confusionMatrix[:, numForVT].sum() - tp)
 
     verboseFile.write('Num of positives: ' + str(p) + '\n')
     verboseFile.write('Num of negatives: ' + str(n) + '\n')
@@ -174,7 +128,7 @@ def runModel(trainingX, trainingY, testingX, testingY, verboseFile):
 
     # Train the LSTM model.
     print ("Training...")
-    model.fit(x = trainingX, y = trainingY, nb_epoch = epoch, validation_split = 0.05)
+    model.fit(x = trainingX, y = trainingY, nb_epoch = epoch, validation_split = validationSplit)
     print ("Completed!")
 
     # Evaluate the LSTM model.
@@ -187,3 +141,52 @@ def runModel(trainingX, trainingY, testingX, testingY, verboseFile):
     print ("Completed!")
 
     return (sensitivity, specificity)
+
+def runModelOnBatches(raggedBeats, trainingIndices, testingIndices, maxNumOfBeats, maxLengthOfBeat, verboseFile, batchSize = DEFAULT_BATCH_SIZE,
+                      dtype = DEFAULT_DTYPE):
+    '''
+        Creates, trains and evaluates an LSTM model that can be used to predict episodes of VT, like runModel, but
+        trains it on the windows of [raggedBeats] (a [RaggedBeats] object, see raggedBeats.py) whose indices are in
+        [trainingIndices] and tests it on the windows whose indices are in [testingIndices].
+
+        The windows are fed to the model in batches of windows with similar numbers of beats (see batchGenerator.py),
+        each of which is only built (and padded to the maximum number of beats of its windows) when it is needed, so
+        the padded training and testing data are never in memory at once.  Every beat is padded to [maxLengthOfBeat]
+        ECG readings, and the batches are numpy arrays whose elements are of type [dtype] (e.g. np.float32 or np.float16).
+
+        Returns a tuple of the form ([sensitivity], [specificity]) where [sensitivity] is the sensitivity
+        of the model's ability to predict episodes of VT and [specificity] is the specificity of the model's
+        ability to predict episodes of VT.
+    '''
+
+    # As with validation_split in model.fit, the last windows of the training data are used for validation.
+    splitIndex = int(len(trainingIndices) * (1.0 - validationSplit))
+    trainingFeed = BatchFeed(raggedBeats, trainingIndices[:splitIndex], maxLengthOfBeat, batchSize, dtype = dtype)
+    validationFeed = BatchFeed(raggedBeats, trainingIndices[splitIndex:], maxLengthOfBeat, batchSize, shuffle = False, dtype = dtype)
+    testingFeed = BatchFeed(raggedBeats, testingIndices, maxLengthOfBeat, batchSize, shuffle = False, dtype = dtype)
+    trainingFeed.reportPadding(maxNumOfBeats, verboseFile)
+
+    # Create the LSTM model.
+    print ("Creating...")
+    numOfOutcomes = len(CARDIAC_EVENTS)
+    model = createModel(None, maxLengthOfBeat, numOfOutcomes)
+    print ("Completed!")
+
+    # Train the LSTM model.
+    print ("Training...")
+    if (validationFeed.getNumOfSamples() > 0):
+        model.fit_generator(trainingFeed.generate(), samples_per_epoch = trainingFeed.getNumOfSamples(), nb_epoch = epoch,
+                            validation_data = validationFeed.generate(), nb_val_samples = validationFeed.getNumOfSamples())
+    else:
+        model.fit_generator(trainingFeed.generate(), samples_per_epoch = trainingFeed.getNumOfSamples(), nb_epoch = epoch)
+    print ("Completed!")
+
+    # Evaluate the LSTM model.
+    print ("Evaluating...")
+    rawPredictedY = testingFeed.predict(model)
+    testingY = testingFeed.getY()
+
+    (sensitivity, specificity) = evaluateModel(rawPredictedY, testingY, verboseFile)
+    print ("Completed!")
+
+    return (sensitivity, specificity)
@@ -0,0 +1,144 @@
+'''
+    This file contains the methods required to load the annotations of a record into a numpy structured array instead of
+    a list of tuples of strings (see getBeatsFromAnn in readData.py and getBeatsFromAtr in wfdbReader.py).
+
+    Every element of an annotation array (whose type is [ANNOTATION_DTYPE]) describes one beat:
+        * [begSampleIndex] and [endSampleIndex] - the indices of the first and last samples of the beat.
+        * [beatTypeCode] - a small integer code for the type of the beat.  The string it represents is
+          beatTypeNames[beatTypeCode].
+        * [auxCode] - a small integer code for the type of cardiac rhythm the beat is a part of.  The string it represents
+          is auxNames[auxCode].
+
+    The lists of strings [beatTypeNames] and [auxNames] always begin with [BEAT_TYPE_NAMES] and getAuxNames() (the
+    mnemonics of all of the MIT annotation codes and the keys of the dictionary [TYPES_OF_ALL_EVENTS_DICT] defined in
+    readData.py), so the code of every known string is the same for every record.  Any other string found in the
+    annotations of a record is appended to the list of that record.
+
+    Since the rhythms are integer codes, finding the beats at which the rhythm changes (see getIndicesOfAuxChanges) and
+    the beats that are a part of the cardiac events of interest (see getEventMask) are vectorized comparisons.
+'''
+
+import numpy as np
+
+import readData
+import wfdbReader
+from beatTable import CODE_DTYPE, checkNumOfCodes
+
+# CONSTANTS
+ANNOTATION_DTYPE = np.dtype([('begSampleIndex', np.int64), ('endSampleIndex', np.int64), ('beatTypeCode', CODE_DTYPE),
+                             ('auxCode', CODE_DTYPE)])
+
+# The strings represented by the first beat type codes.  The code of the type of a beat is the code of its annotation in
+# an MIT format annotation file.
+BEAT_TYPE_NAMES = list(wfdbReader.ANNOTATION_MNEMONICS)
+
+# The auxillary string of the beats that precede the first rhythm annotation of a record.
+NO_AUX = ""
+
+def getAuxNames():
+    '''
+        Returns the list of strings represented by the first rhythm codes: [NO_AUX] followed by the (sorted) keys of the
+        dictionary [TYPES_OF_ALL_EVENTS_DICT] defined in readData.py.
+    '''
+
+    return [NO_AUX] + sorted(readData.TYPES_OF_ALL_EVENTS_DICT.keys())
+
+def encode(strings, names):
+    '''
+        Returns a tuple of the form ([codes], [names]), where [codes] is a numpy array whose (n + 1)-th element is the index of
+        strings[n] in [names], a copy of the list [names] to which the strings in [strings] that are not in it are appended.
+    '''
+
+    names = list(names)
+    indices = dict((name, index) for (index, name) in enumerate(names))
+
+    (uniqueStrings, inverse) = np.unique(np.asarray(strings, dtype=str), return_inverse=True)
+
+    uniqueCodes = np.zeros(len(uniqueStrings), dtype=CODE_DTYPE)
+    for (index, string) in enumerate(uniqueStrings):
+        string = str(string)
+        if (string not in indices):
+            indices[string] = len(names)
+            names.append(string)
+        uniqueCodes[index] = indices[string]
+
+    checkNumOfCodes(names)
+    return (uniqueCodes[inverse], names)
+
+def fromAnnotations(sampleIndices, types, auxillaries):
+    '''
+        Returns a tuple of the form ([annotations], [beatTypeNames], [auxNames]), where [annotations] is the annotation array that
+        describes the same beats as the list of tuples returned by getBeatsFromAtr in wfdbReader.py for the annotations
+        ([sampleIndices], [types], [auxillaries]) (see readAnnotations in wfdbReader.py).
+    '''
+
+    sampleIndices = np.asarray(sampleIndices, dtype=np.int64)
+    numOfAnnotations = len(sampleIndices)
+
+    (beatTypeCodes, beatTypeNames) = encode(types, BEAT_TYPE_NAMES)
+
+    # rdann prints the auxillary string as the last column, so getBeatsFromAnn only notices it if it contains no whitespace.
+    auxIndices = np.array([index for (index, aux) in enumerate(auxillaries) if (aux != NO_AUX and len(aux.split()) == 1)],
+                          dtype=np.int64)
+    (auxIndexCodes, auxNames) = encode([auxillaries[index] for index in auxIndices], getAuxNames())
+
+    # Every beat is a part of the rhythm of the last rhythm annotation before the annotation that ends it.
+    lastAuxPositions = np.searchsorted(auxIndices, np.arange(numOfAnnotations), side='left') - 1
+    auxCodes = np.full(numOfAnnotations, auxNames.index(NO_AUX), dtype=CODE_DTYPE)
+    auxCodes[lastAuxPositions >= 0] = auxIndexCodes[lastAuxPositions[lastAuxPositions >= 0]]
+
+    # Every annotation ends the beat that began one sample after the previous annotation (see getBeatsFromAtr in wfdbReader.py).
+    annotations = np.zeros(numOfAnnotations, dtype=ANNOTATION_DTYPE)
+    annotations['begSampleIndex'][0:1] = -1
+    annotations['begSampleIndex'][1:] = sampleIndices[:-1]
+    annotations['endSampleIndex'] = sampleIndices - 1
+    annotations['beatTypeCode'] = beatTypeCodes
+    annotations['auxCode'] = auxCodes
+
+    # Remove the first and last beat because they are incomplete.
+    return (annotations[1:-1], beatTypeNames, auxNames)
+
+def readAnnotationsFromAtr(databaseName, patientName):
+    '''
+        Reads the annotation file associated with the ECG signal for patient [patientName] in database [databaseName] and returns
+        a tuple of the form ([annotations], [beatTypeNames], [auxNames]) (see fromAnnotations).
+    '''
+
+    return fromAnnotations(*wfdbReader.readAnnotations(databaseName, patientName))
+
+def toListOfBeats(annotations, beatTypeNames, auxNames):
+    '''
+        Returns the list of tuples of the form ([beginSampleIndex], [endSampleIndex], [typeOfBeat], [auxillary]) (see the
+        documentation for the method getBeatsFromAnn in readData.py) that describes the beats in [annotations].
+    '''
+
+    return [(begSampleIndex, endSampleIndex, beatTypeNames[beatTypeCode], auxNames[auxCode])
+            for (begSampleIndex, endSampleIndex, beatTypeCode, auxCode) in annotations.tolist()]
+
+def getIndicesOfAuxChanges(auxCodes, auxNames):
+    '''
+        Returns a numpy array containing the indices of the beats whose rhythm (auxNames[auxCodes[n]]) differs from the rhythm of
+        the previous beat.  The rhythm of the first beat is compared to [NO_AUX].
+    '''
+
+    auxCodes = np.asarray(auxCodes)
+    if (len(auxCodes) == 0):
+        return np.zeros(0, dtype=np.int64)
+
+    isChange = np.empty(len(auxCodes), dtype=bool)
+    isChange[0] = (auxNames[auxCodes[0]] != NO_AUX)
+    isChange[1:] = (auxCodes[1:] != auxCodes[:-1])
+
+    return np.flatnonzero(isChange)
+
+def getEventMask(auxNames, events=None):
+    '''
+        Returns a numpy array whose (n + 1)-th element is True if and only if auxNames[n] is one of the cardiac events in [events]
+        (or one of the keys of the dictionary [TYPES_OF_EVENTS_DICT] defined in readData.py, if [events] is None), so that
+        getEventMask(auxNames)[auxCodes] is True for the beats that are a part of these cardiac events.
+    '''
+
+    if (events is None):
+        events = readData.TYPES_OF_EVENTS_DICT
+
+    return np.array([name in events for name in auxNames], dtype=bool)
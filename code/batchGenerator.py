@@ -0,0 +1,232 @@
+'''
+    This file includes all of the methods required to feed the windows of beats in a [RaggedBeats] object (see
+    raggedBeats.py) to the LSTM in batches, instead of as one tensor padded to the maximum number of beats in any window.
+
+    The windows are sorted by their number of beats (and then by the maximum number of ECG readings in any of their
+    beats) and divided into batches of consecutive windows, so that the windows in a batch have similar numbers of beats.
+    Every batch is only padded to the maximum number of beats of the windows in it.
+
+    Note that every beat is still padded to the maximum number of ECG readings in any beat of any window
+    ([maxLengthOfBeat]): the number of ECG readings in a beat is the number of inputs of the first LSTM layer, which
+    is fixed when the model is created.
+
+    Every batch is built from the [RaggedBeats] object only when it is needed, so if the arrays of the [RaggedBeats]
+    object are memory-mapped (see loadRaggedBeats in datasetCache.py), only the ECG readings of one batch are ever in
+    memory at once.  A [BatchFeed] object feeds a subset of the windows (e.g. the training or the testing windows) in
+    this way.
+'''
+
+import numpy as np
+
+# CONSTANTS
+DEFAULT_BATCH_SIZE = 32
+
+# The type of the elements of the batches.  Keras computes in 32-bit floats anyway, so the ECG readings (which may be
+# raw 16-bit ADC values, see readData.USE_COMPACT_DTYPE) are only converted into 32-bit (or, optionally, 16-bit) floats
+# when a batch is built.
+DEFAULT_DTYPE = np.float32
+
+def getBatches(raggedBeats, batchSize=DEFAULT_BATCH_SIZE, windowIndices=None):
+    '''
+        Divides the windows of [raggedBeats] (or only the windows whose indices are in [windowIndices], if it is not None) into
+        batches of at most [batchSize] windows with similar numbers of beats.
+
+        Returns a list of numpy arrays, each of which contains the indices of the windows in one batch.
+    '''
+
+    if (windowIndices is None):
+        windowIndices = np.arange(len(raggedBeats))
+    windowIndices = np.asarray(windowIndices, dtype=np.int64)
+
+    # Sort the windows by their number of beats and then by the length of their longest beat.
+    order = np.lexsort((raggedBeats.getMaxLengthsOfBeats()[windowIndices], raggedBeats.getNumsOfBeats()[windowIndices]))
+    windowIndices = windowIndices[order]
+
+    return [windowIndices[begIndex:begIndex + batchSize] for begIndex in range(0, len(windowIndices), batchSize)]
+
+def getBatch(raggedBeats, windowIndices, maxLengthOfBeat, dtype=DEFAULT_DTYPE):
+    '''
+        Returns a tuple of the form ([X], [Y]), where [X] is a (len(windowIndices)) x (maximum number of beats in these windows)
+        x [maxLengthOfBeat] numpy array containing the ECG readings of the windows of [raggedBeats] whose indices are in
+        [windowIndices] (padded as in convertIntoNumpyArray in prepareForLSTM.py) and [Y] contains the one-hot encodings of the
+        cardiac events that these windows precede.
+    '''
+
+    batch = raggedBeats[np.asarray(windowIndices)]
+
+    # Keras cannot handle sequences without any time steps.
+    maxNumOfBeats = max(batch.getMaxNumOfBeats(), 1)
+
+    (X, beatMask, readingMask) = batch.toPadded(maxNumOfBeats, maxLengthOfBeat, dtype)
+    Y = batch.getOneHotCardiacEvents(dtype)
+
+    return (X, Y)
+
+def generateBatches(raggedBeats, batches, maxLengthOfBeat, shuffle=True, loop=True, dtype=DEFAULT_DTYPE):
+    '''
+        Yields the tuple ([X], [Y]) returned by getBatch for every batch in [batches] (a list returned by getBatches).
+
+        The order of the batches is shuffled every time all of them have been yielded if [shuffle] = True.  If [loop] = True,
+        the batches are yielded forever (as required by fit_generator in Keras).
+    '''
+
+    while True:
+        order = np.arange(len(batches))
+        if (shuffle):
+            np.random.shuffle(order)
+
+        for batchIndex in order:
+            yield getBatch(raggedBeats, batches[batchIndex], maxLengthOfBeat, dtype)
+
+        if (not(loop)):
+            break
+
+def predictInBatches(model, raggedBeats, batches, maxLengthOfBeat, dtype=DEFAULT_DTYPE, windowIndices=None):
+    '''
+        Returns the predictions of [model] for all of the windows of [raggedBeats] (or only the windows whose indices are in
+        [windowIndices], if it is not None), computed one batch in [batches] at a time.  The (n + 1)-th row of the returned
+        numpy array is the prediction for the (n + 1)-th of these windows.
+    '''
+
+    if (windowIndices is None):
+        windowIndices = np.arange(len(raggedBeats))
+
+    # The position of every window in the returned numpy array.
+    positions = np.zeros(len(raggedBeats), dtype=np.int64)
+    positions[np.asarray(windowIndices, dtype=np.int64)] = np.arange(len(windowIndices))
+
+    rawPredictedY = None
+    for batch in batches:
+        (X, Y) = getBatch(raggedBeats, batch, maxLengthOfBeat, dtype)
+        batchPredictedY = model.predict_on_batch(X)
+
+        if (rawPredictedY is None):
+            rawPredictedY = np.zeros((len(windowIndices), batchPredictedY.shape[1]), dtype=batchPredictedY.dtype)
+        rawPredictedY[positions[batch]] = batchPredictedY
+
+    return rawPredictedY
+
+def getPaddingRatio(raggedBeats, batches, maxLengthOfBeat):
+    '''
+        Returns the fraction of the elements of the numpy arrays [X] returned by getBatch for all of the batches in [batches] that
+        are padding (i.e. that do not contain an ECG reading).
+    '''
+
+    numsOfBeats = raggedBeats.getNumsOfBeats()
+    numsOfReadings = raggedBeats.getNumsOfReadings()
+
+    numOfElements = 0
+    numOfReadings = 0
+    for batch in batches:
+        numOfElements = numOfElements + len(batch) * max(int(np.max(numsOfBeats[batch])), 1) * maxLengthOfBeat
+        numOfReadings = numOfReadings + int(np.sum(numsOfReadings[batch]))
+
+    if (numOfElements == 0):
+        return 0.0
+
+    return 1.0 - float(numOfReadings) / float(numOfElements)
+
+def getGlobalPaddingRatio(raggedBeats, maxNumOfBeats, maxLengthOfBeat, windowIndices=None):
+    '''
+        Returns the fraction of the elements of the numpy array [X] returned by convertIntoNumpyArray in prepareForLSTM.py (i.e. of
+        the windows of [raggedBeats], or only of the windows whose indices are in [windowIndices] if it is not None, padded to
+        [maxNumOfBeats] beats of [maxLengthOfBeat] ECG readings) that are padding.
+    '''
+
+    numsOfReadings = raggedBeats.getNumsOfReadings()
+    if (windowIndices is not None):
+        numsOfReadings = numsOfReadings[np.asarray(windowIndices, dtype=np.int64)]
+
+    numOfElements = len(numsOfReadings) * maxNumOfBeats * maxLengthOfBeat
+    if (numOfElements == 0):
+        return 0.0
+
+    return 1.0 - float(np.sum(numsOfReadings)) / float(numOfElements)
+
+def reportPadding(raggedBeats, batches, maxNumOfBeats, maxLengthOfBeat, verboseFile=None):
+    '''
+        Prints (and writes to [verboseFile], if it is not None) the fraction of the elements fed to the LSTM that are padding
+        when the windows in [batches] are fed to it in these batches, compared to when all of them are padded to [maxNumOfBeats]
+        beats.
+    '''
+
+    windowIndices = np.concatenate([np.zeros(0, dtype=np.int64)] + list(batches))
+
+    paddingRatio = getPaddingRatio(raggedBeats, batches, maxLengthOfBeat)
+    globalPaddingRatio = getGlobalPaddingRatio(raggedBeats, maxNumOfBeats, maxLengthOfBeat, windowIndices)
+
+    report = 'Padding ratio (batches): ' + str(paddingRatio) + '\n'
+    report = report + 'Padding ratio (global): ' + str(globalPaddingRatio) + '\n'
+
+    print (report)
+    if (verboseFile is not None):
+        verboseFile.write(report)
+
+    return (paddingRatio, globalPaddingRatio)
+
+class BatchFeed(object):
+
+    def __init__(self, raggedBeats, windowIndices=None, maxLengthOfBeat=None, batchSize=DEFAULT_BATCH_SIZE, shuffle=True, dtype=DEFAULT_DTYPE):
+        '''
+            Creates an object of class [BatchFeed], which feeds the windows of [raggedBeats] whose indices are in [windowIndices] (or
+            all of them, if it is None) to the LSTM in batches of at most [batchSize] windows (see getBatches), every beat of which is
+            padded to [maxLengthOfBeat] ECG readings (or to the maximum number of ECG readings in any beat, if it is None).
+
+            Like a Keras [Sequence], the (b + 1)-th batch is feed[b] and the number of batches is len(feed).
+        '''
+
+        if (windowIndices is None):
+            windowIndices = np.arange(len(raggedBeats))
+        if (maxLengthOfBeat is None):
+            maxLengthOfBeat = raggedBeats.getMaxLengthOfBeat()
+
+        self.raggedBeats = raggedBeats
+        self.windowIndices = np.asarray(windowIndices, dtype=np.int64)
+        self.maxLengthOfBeat = maxLengthOfBeat
+        self.shuffle = shuffle
+        self.dtype = dtype
+
+        self.batches = getBatches(raggedBeats, batchSize, self.windowIndices)
+
+    def __len__(self):
+        return len(self.batches)
+
+    def __getitem__(self, batchIndex):
+        return getBatch(self.raggedBeats, self.batches[batchIndex], self.maxLengthOfBeat, self.dtype)
+
+    def getNumOfSamples(self):
+        '''
+            Returns the number of windows fed by this [BatchFeed] object.
+        '''
+
+        return len(self.windowIndices)
+
+    def generate(self, loop=True):
+        '''
+            Returns a generator that yields the batches of this [BatchFeed] object (see generateBatches), which can be passed to
+            fit_generator in Keras.
+        '''
+
+        return generateBatches(self.raggedBeats, self.batches, self.maxLengthOfBeat, self.shuffle, loop, self.dtype)
+
+    def getY(self):
+        '''
+            Returns the one-hot encodings of the cardiac events that the windows fed by this [BatchFeed] object precede, in the order
+            of [windowIndices].
+        '''
+
+        return self.raggedBeats.getOneHotCardiacEvents(self.dtype, self.windowIndices)
+
+    def predict(self, model):
+        '''
+            Returns the predictions of [model] for the windows fed by this [BatchFeed] object, in the order of [windowIndices].
+        '''
+
+        return predictInBatches(model, self.raggedBeats, self.batches, self.maxLengthOfBeat, self.dtype, self.windowIndices)
+
+    def reportPadding(self, maxNumOfBeats, verboseFile=None):
+        '''
+            Reports the fraction of the elements fed by this [BatchFeed] object that are padding (see reportPadding).
+        '''
+
+        return reportPadding(self.raggedBeats, self.batches, maxNumOfBeats, self.maxLengthOfBeat, verboseFile)
@@ -11,9 +11,14 @@ import numpy as np
 
 class Beat(object):
 
-    def __init__(self, timeStamps, ecgReadings, typeOfBeat, auxillary):
+    def __init__(self, timeStamps, ecgReadings, typeOfBeat, auxillary, beginSampleIndex=None, endSampleIndex=None):
         '''
             Creates an object of class [Beat]
+
+            [timeStamps] and [ecgReadings] may either be lists or numpy arrays.  In particular, they may be
+            slices (i.e. views, not copies) of the columns of the numpy array containing the ECG signal of the
+            whole record, in which case [beginSampleIndex] and [endSampleIndex] are the indices of the first and
+            last samples of this beat in that array.
             
         '''
         
@@ -21,6 +26,10 @@ class Beat(object):
         # beat (i.e. the data).
         self.timeStamps = timeStamps
         self.ecgReadings = ecgReadings
+
+        # Fields containing the location of the beat within the ECG signal of the whole record.
+        self.beginSampleIndex = beginSampleIndex
+        self.endSampleIndex = endSampleIndex
         
         # Fields containing information about the annotations associated with the beat.
         self.typeOfBeat = str(typeOfBeat)
@@ -40,6 +49,22 @@ class Beat(object):
     
         return self.timeStamps[0]
     
+    def getBeginSampleIndex(self):
+        '''
+            Returns the index of the first sample in this beat within the ECG signal of the whole record,
+            or None if it is not known.
+        '''
+
+        return self.beginSampleIndex
+
+    def getEndSampleIndex(self):
+        '''
+            Returns the index of the last sample in this beat within the ECG signal of the whole record,
+            or None if it is not known.
+        '''
+
+        return self.endSampleIndex
+
     def getAux(self):
         '''
             Returns the auxillary field of this beat, i.e. the short string abbreviation for 
@@ -88,15 +113,7 @@ class Beat(object):
             ECG signal reading taken at time arr[1, n]. 
         '''
 
-        numOfRows = 2
-	numOfCols = len(self.timeStamps)
-        arr = np.ones((numOfRows, numOfCols))
-
-	for col in range(numOfCols):
-            arr[0, col] = self.timeStamps[col]
-            arr[1, col] = self.ecgReadings[col]
-
-	return arr
+        return np.vstack((np.asarray(self.timeStamps, dtype=np.float64), np.asarray(self.ecgReadings, dtype=np.float64)))
             	
 
     def __str__(self):
@@ -0,0 +1,436 @@
+'''
+    This file contains the definition of the class 'BeatTable', each object of which stores a sequence of
+    beats from a single lead of a single ECG reading in a compact, columnar form, and the definition of the
+    class 'BeatRow', each object of which is a lightweight accessor for a single beat in a [BeatTable] object.
+
+    Instead of one [Beat] object per beat (each with its own dictionary of fields, lists and strings), a
+    [BeatTable] object stores the following arrays, each of which has one element per beat:
+        * [beginSampleIndices] and [endSampleIndices] - the indices of the first and last samples of each beat
+          in [timeStamps] and [ecgReadings].
+        * [beginTimeStamps] and [endTimeStamps] - the time stamps of the first and last samples of each beat.
+        * [beatTypeCodes] and [auxCodes] - small integer codes for the type of each beat and the type of cardiac
+          rhythm each beat is a part of.  The strings these codes represent are [beatTypeNames][code] and
+          [auxNames][code].
+
+    The ECG readings of all of the beats are stored in a single array, [ecgReadings] (and the time stamps of the
+    samples in a single array, [timeStamps]), which is usually a view into the ECG signal of the whole record.
+    If [gain] is not None, [ecgReadings] contains raw 16-bit ADC values (see getCompactECGSignalFromBinary in
+    wfdbReader.py), which are converted into millivolts by the accessors of single beats.
+    If [timeStamps] is None, the time stamp of every sample is its index in the record divided by [samplingFrequency],
+    and if [ecgReadings] is None, the [BeatTable] object only describes the boundaries and annotations of the beats (see
+    getRaggedBeatsForRecordFromRanges in readData.py).
+
+    A [BeatTable] object behaves like a list of [Beat] objects: len(table) is the number of beats, table[n] is a
+    [BeatRow] object with the same accessors as a [Beat] object, and table[m:n] is a [BeatTable] object containing
+    the (m + 1)-th through n-th beats whose arrays are views into the arrays of the original [BeatTable] object.
+'''
+
+import numpy as np
+
+from beat import Beat
+import wfdbReader
+
+# CONSTANTS
+
+# The type of the integer codes of the types of beats and of the types of cardiac rhythms (see checkNumOfCodes).
+CODE_DTYPE = np.int16
+
+def checkNumOfCodes(names):
+    '''
+        Raises a ValueError if the strings in the list [names] cannot all be represented by codes of type [CODE_DTYPE] (codes
+        of a larger index would silently wrap around to the codes of other strings).
+    '''
+
+    if (len(names) > np.iinfo(CODE_DTYPE).max + 1):
+        raise ValueError('There are ' + str(len(names)) + ' distinct names, but codes of type ' + np.dtype(CODE_DTYPE).name +
+                         ' can only represent ' + str(np.iinfo(CODE_DTYPE).max + 1) + '.')
+
+class BeatTable(object):
+
+    def __init__(self, timeStamps, ecgReadings, beginSampleIndices, endSampleIndices, beatTypeCodes, auxCodes,
+                 beatTypeNames, auxNames, sampleOffset=0, gain=None, baseline=None, samplingFrequency=None):
+        '''
+            Creates an object of class [BeatTable]
+
+            [timeStamps] and [ecgReadings] are one-dimensional numpy arrays containing the time stamps and the ECG
+            readings of consecutive samples of one lead.  [beginSampleIndices], [endSampleIndices], [beatTypeCodes] and
+            [auxCodes] are one-dimensional numpy arrays with one element per beat (see the documentation at the top of
+            this file).  [beatTypeNames] and [auxNames] are lists of strings that translate the codes back into strings.
+
+            [sampleOffset] is the index, within the ECG signal of the whole record, of the first sample in
+            [timeStamps] and [ecgReadings].
+
+            If [gain] is not None, [ecgReadings] contains raw ADC values, which are converted into millivolts using [gain]
+            and [baseline] (see adcToPhysical in wfdbReader.py), and [samplingFrequency] is the sampling frequency of the record.
+
+            If [timeStamps] is None, the time stamps are computed from the indices of the samples and [samplingFrequency].
+        '''
+
+        # Fields containing the actual ECG data associated with the beats (i.e. the data).
+        self.timeStamps = timeStamps
+        self.ecgReadings = ecgReadings
+        self.sampleOffset = sampleOffset
+
+        # Fields required to convert raw ADC values into millivolts.
+        self.gain = gain
+        self.baseline = baseline
+        self.samplingFrequency = samplingFrequency
+
+        # Fields containing the boundaries of the beats.
+        self.beginSampleIndices = beginSampleIndices
+        self.endSampleIndices = endSampleIndices
+        self.beginTimeStamps = self.getTimeStampsOfSamples(beginSampleIndices)
+        self.endTimeStamps = self.getTimeStampsOfSamples(endSampleIndices)
+
+        # Fields containing information about the annotations associated with the beats.
+        self.beatTypeCodes = beatTypeCodes
+        self.auxCodes = auxCodes
+        self.beatTypeNames = beatTypeNames
+        self.auxNames = auxNames
+
+    @classmethod
+    def fromListOfBeats(cls, listOfBeats, timeStamps, ecgReadings):
+        '''
+            Returns a [BeatTable] object containing the beats described by [listOfBeats], a list of tuples of the form
+            ([beginSampleIndex], [endSampleIndex], [typeOfBeat], [auxillary]) (see the documentation for the method
+            getBeatsFromAnn in readData.py), whose samples are in the one-dimensional numpy arrays [timeStamps] and
+            [ecgReadings].
+        '''
+
+        if (len(listOfBeats) == 0):
+            return cls(timeStamps, ecgReadings, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                       np.zeros(0, dtype=CODE_DTYPE), np.zeros(0, dtype=CODE_DTYPE), [], [])
+
+        (beginSampleIndices, endSampleIndices, typesOfBeats, auxillaries) = zip(*listOfBeats)
+
+        (beatTypeNames, beatTypeCodes) = np.unique(np.array(typesOfBeats, dtype=str), return_inverse=True)
+        (auxNames, auxCodes) = np.unique(np.array(auxillaries, dtype=str), return_inverse=True)
+        checkNumOfCodes(beatTypeNames)
+        checkNumOfCodes(auxNames)
+
+        return cls(timeStamps, ecgReadings, np.array(beginSampleIndices, dtype=np.int64), np.array(endSampleIndices, dtype=np.int64),
+                   beatTypeCodes.astype(CODE_DTYPE), auxCodes.astype(CODE_DTYPE), [str(name) for name in beatTypeNames],
+                   [str(name) for name in auxNames])
+
+    @classmethod
+    def fromAnnotations(cls, annotations, beatTypeNames, auxNames, timeStamps, ecgReadings, samplingFrequency=None):
+        '''
+            Returns a [BeatTable] object containing the beats described by [annotations], an annotation array whose codes
+            represent the strings in [beatTypeNames] and [auxNames] (see annotations.py), whose samples are in the
+            one-dimensional numpy arrays [timeStamps] and [ecgReadings] (see the documentation for the constructor if either
+            is None).
+        '''
+
+        return cls(timeStamps, ecgReadings, annotations['begSampleIndex'].copy(), annotations['endSampleIndex'].copy(),
+                   annotations['beatTypeCode'].copy(), annotations['auxCode'].copy(), beatTypeNames, auxNames,
+                   samplingFrequency=samplingFrequency)
+
+    @classmethod
+    def fromBeats(cls, beats):
+        '''
+            Returns a [BeatTable] object containing the same beats as [beats], a list of [Beat] objects.  The time stamps and
+            ECG readings of the beats are copied into two new arrays.
+        '''
+
+        lengths = np.array([len(beat.getECGReadings()) for beat in beats], dtype=np.int64)
+        endSampleIndices = np.cumsum(lengths) - 1
+        beginSampleIndices = endSampleIndices - lengths + 1
+
+        timeStamps = np.zeros(0, dtype=np.float64)
+        ecgReadings = np.zeros(0, dtype=np.float64)
+        if (len(beats) > 0):
+            timeStamps = np.concatenate([np.asarray(beat.timeStamps, dtype=np.float64) for beat in beats])
+            ecgReadings = np.concatenate([np.asarray(beat.getECGReadings(), dtype=np.float64) for beat in beats])
+
+        listOfBeats = [(beginSampleIndex, endSampleIndex, beat.typeOfBeat, beat.getAux())
+                       for (beginSampleIndex, endSampleIndex, beat) in zip(beginSampleIndices, endSampleIndices, beats)]
+
+        return cls.fromListOfBeats(listOfBeats, timeStamps, ecgReadings)
+
+    def withECGReadings(self, ecgReadings, gain=None, baseline=None, samplingFrequency=None):
+        '''
+            Returns a [BeatTable] object with the same beats as this [BeatTable] object but whose ECG readings are the
+            one-dimensional numpy array [ecgReadings] (e.g. the ECG readings of another lead of the same record).  All of the
+            other arrays are shared with this [BeatTable] object.
+
+            If [gain] is not None, [ecgReadings] contains raw ADC values (see the documentation for the constructor).
+        '''
+
+        beatTable = BeatTable.__new__(BeatTable)
+        beatTable.__dict__.update(self.__dict__)
+        beatTable.ecgReadings = ecgReadings
+        beatTable.gain = gain
+        beatTable.baseline = baseline
+        beatTable.samplingFrequency = samplingFrequency
+
+        return beatTable
+
+    def getTimeStampsOfSamples(self, sampleIndices):
+        '''
+            Returns a numpy array containing the time stamps of the samples whose indices (in [timeStamps]) are in the numpy array
+            [sampleIndices].
+
+            An empty beat (e.g. one between two annotations of the same sample) begins one sample after it ends, so its
+            boundaries can lie just outside of [timeStamps]; such indices are clamped to the first and last samples in
+            [timeStamps] (or give NaN if it is empty).
+        '''
+
+        if (self.timeStamps is None):
+            return (self.sampleOffset + np.asarray(sampleIndices, dtype=np.int64)) / self.samplingFrequency
+
+        sampleIndices = np.asarray(sampleIndices, dtype=np.int64)
+        if (len(self.timeStamps) == 0):
+            return np.full(sampleIndices.shape, np.nan)
+
+        return self.timeStamps[np.clip(sampleIndices, 0, len(self.timeStamps) - 1)]
+
+    def getLengths(self):
+        '''
+            Returns a numpy array containing the number of ECG readings in each beat.
+        '''
+
+        return self.endSampleIndices - self.beginSampleIndices + 1
+
+    def getMaxLengthOfBeat(self):
+        '''
+            Returns the maximum number of ECG readings in any single beat in this [BeatTable] object.
+        '''
+
+        if (len(self) == 0):
+            return 0
+
+        return int(np.max(self.getLengths()))
+
+    def isCompact(self):
+        '''
+            Returns True if and only if [ecgReadings] contains raw ADC values rather than ECG readings in millivolts.
+        '''
+
+        return self.gain is not None
+
+    def toPhysicalUnits(self, ecgReadings, dtype=np.float64):
+        '''
+            Returns [ecgReadings], a numpy array of values taken from [ecgReadings] of this [BeatTable] object, converted into
+            millivolts (if they are raw ADC values) and into a numpy array whose elements are of type [dtype].
+        '''
+
+        if (not(self.isCompact())):
+            return np.asarray(ecgReadings, dtype=dtype)
+
+        return wfdbReader.adcToPhysical(ecgReadings, self.gain, self.baseline, dtype)
+
+    def getFlatBeats(self):
+        '''
+            Returns a tuple of the form ([ecgReadings], [timeStamps], [lengths]) where [ecgReadings] and [timeStamps] are numpy arrays
+            containing the ECG readings and time stamps of all of the beats in this [BeatTable] object, one beat after the other, and
+            [lengths] is a numpy array containing the number of samples in each beat.
+
+            Note that if this [BeatTable] object is compact, [ecgReadings] contains raw ADC values (see toPhysicalUnits).
+        '''
+
+        lengths = self.getLengths()
+
+        # Compute the index (in [ecgReadings]) of every sample of every beat at once.
+        offsets = np.cumsum(lengths) - lengths
+        indices = np.arange(np.sum(lengths)) - np.repeat(offsets, lengths) + np.repeat(self.beginSampleIndices, lengths)
+
+        return (self.ecgReadings[indices], self.getTimeStampsOfSamples(indices), lengths)
+
+    def getAux(self, index):
+        '''
+            Returns the short string abbreviation for the type of cardiac rhythm the (index + 1)-th beat is a part of.
+        '''
+
+        return self.auxNames[self.auxCodes[index]]
+
+    def getTypeOfBeat(self, index):
+        '''
+            Returns the short string abbreviation for the type of the (index + 1)-th beat.
+        '''
+
+        return self.beatTypeNames[self.beatTypeCodes[index]]
+
+    def getECGReadings(self, index):
+        '''
+            Returns a numpy array (a view into [ecgReadings], unless this [BeatTable] object is compact) containing the ECG
+            readings (in millivolts) of the (index + 1)-th beat.
+        '''
+
+        ecgReadings = self.ecgReadings[self.beginSampleIndices[index]:self.endSampleIndices[index] + 1]
+        if (self.isCompact()):
+            return self.toPhysicalUnits(ecgReadings)
+
+        return ecgReadings
+
+    def getTimeStamps(self, index):
+        '''
+            Returns a numpy array (a view into [timeStamps], unless it is None) containing the time stamps of the (index + 1)-th beat.
+        '''
+
+        if (self.timeStamps is None):
+            return self.getTimeStampsOfSamples(np.arange(self.beginSampleIndices[index], self.endSampleIndices[index] + 1))
+
+        return self.timeStamps[self.beginSampleIndices[index]:self.endSampleIndices[index] + 1]
+
+    def getSlice(self, begIndex, endIndex):
+        '''
+            Returns a [BeatTable] object containing the (begIndex + 1)-th through endIndex-th beats of this [BeatTable] object.
+
+            The arrays of the returned [BeatTable] object are views into the arrays of this [BeatTable] object, restricted to
+            the samples of the returned beats, so that (for instance) pickling the returned object does not pickle the ECG
+            signal of the whole record.
+        '''
+
+        if (endIndex <= begIndex):
+            begIndex = endIndex = 0
+
+        beatTable = BeatTable.__new__(BeatTable)
+        beatTable.__dict__.update(self.__dict__)
+
+        if (endIndex > begIndex):
+            firstSampleIndex = self.beginSampleIndices[begIndex]
+            lastSampleIndex = self.endSampleIndices[endIndex - 1]
+        else:
+            firstSampleIndex = 0
+            lastSampleIndex = -1
+
+        if (self.timeStamps is not None):
+            beatTable.timeStamps = self.timeStamps[firstSampleIndex:lastSampleIndex + 1]
+        if (self.ecgReadings is not None):
+            beatTable.ecgReadings = self.ecgReadings[firstSampleIndex:lastSampleIndex + 1]
+        beatTable.sampleOffset = self.sampleOffset + firstSampleIndex
+
+        beatTable.beginSampleIndices = self.beginSampleIndices[begIndex:endIndex] - firstSampleIndex
+        beatTable.endSampleIndices = self.endSampleIndices[begIndex:endIndex] - firstSampleIndex
+        beatTable.beginTimeStamps = self.beginTimeStamps[begIndex:endIndex]
+        beatTable.endTimeStamps = self.endTimeStamps[begIndex:endIndex]
+        beatTable.beatTypeCodes = self.beatTypeCodes[begIndex:endIndex]
+        beatTable.auxCodes = self.auxCodes[begIndex:endIndex]
+
+        return beatTable
+
+    def toBeats(self):
+        '''
+            Returns a list of [Beat] objects containing the same beats as this [BeatTable] object.
+        '''
+
+        return [self[index].toBeat() for index in range(len(self))]
+
+    def __len__(self):
+        return len(self.beginSampleIndices)
+
+    def __getitem__(self, index):
+        if (isinstance(index, slice)):
+            (begIndex, endIndex, step) = index.indices(len(self))
+            if (step != 1):
+                raise ValueError('BeatTable objects can only be sliced with a step of 1.')
+            return self.getSlice(begIndex, endIndex)
+
+        if (index < 0):
+            index = index + len(self)
+        if (index < 0 or index >= len(self)):
+            raise IndexError('BeatTable index out of range')
+
+        return BeatRow(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield BeatRow(self, index)
+
+    def __str__(self):
+        # Heading
+        str1 = ' ****** BEAT TABLE OBJECT ********* \n \n'
+
+        str1 = str1 + 'Number of Beats: ' + str(len(self)) + '\n'
+        if (len(self) > 0):
+            str1 = str1 + 'First Time Stamp: ' + str(self.beginTimeStamps[0]) + '\n'
+            str1 = str1 + 'Last Time Stamp: ' + str(self.endTimeStamps[-1]) + '\n\n'
+
+        return str1
+
+class BeatRow(object):
+    '''
+        A lightweight accessor for the (index + 1)-th beat of the [BeatTable] object [table], with the same accessors as
+        an object of the class [Beat].
+    '''
+
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    def getLastTimeStamp(self):
+        '''
+            Returns the time stamp of the last sample in this beat.
+        '''
+
+        return self.table.endTimeStamps[self.index]
+
+    def getFirstTimeStamp(self):
+        '''
+            Returns the time stamp of the first sample in this beat.
+        '''
+
+        return self.table.beginTimeStamps[self.index]
+
+    def getBeginSampleIndex(self):
+        '''
+            Returns the index of the first sample in this beat within the ECG signal of the whole record.
+        '''
+
+        return self.table.sampleOffset + self.table.beginSampleIndices[self.index]
+
+    def getEndSampleIndex(self):
+        '''
+            Returns the index of the last sample in this beat within the ECG signal of the whole record.
+        '''
+
+        return self.table.sampleOffset + self.table.endSampleIndices[self.index]
+
+    def getAux(self):
+        '''
+            Returns the auxillary field of this beat, i.e. the short string abbreviation for
+            the type of cardiac rhythm this beat is a part of.
+        '''
+
+        return self.table.getAux(self.index)
+
+    def getTypeOfBeat(self):
+        '''
+            Returns the short string abbreviation for the type of this beat.
+        '''
+
+        return self.table.getTypeOfBeat(self.index)
+
+    def getECGReadings(self):
+        '''
+            Returns an array of the ecg readings.
+        '''
+
+        return self.table.getECGReadings(self.index)
+
+    def isPartOfAux(self, aux):
+        '''
+            Returns true if and only if this beat is a part of the rhythm described by the string abbreviation [aux]
+            (e.g. '(AB').
+        '''
+
+        return self.getAux() == aux
+
+    def getNumpyArr(self):
+        '''
+            Returns a numpy array representation of this beat (see the documentation for the method getNumpyArr
+            in beat.py).
+        '''
+
+        return np.vstack((self.table.getTimeStamps(self.index), self.getECGReadings()))
+
+    def toBeat(self):
+        '''
+            Returns a [Beat] object representing this beat, whose time stamps and ECG readings are views into the arrays
+            of the [BeatTable] object.
+        '''
+
+        return Beat(self.table.getTimeStamps(self.index), self.getECGReadings(), self.getTypeOfBeat(), self.getAux(),
+                    self.getBeginSampleIndex(), self.getEndSampleIndex())
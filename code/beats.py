@@ -18,9 +18,12 @@
     
     [cardiacEvent] begins as soon as [cardiacEventBegTimeStamp] seconds have elapsed in the specified patient's ECG
     reading.
+
+    The list of [Beat] objects is usually stored as a [BeatTable] object (see beatTable.py) rather than as a list.
 '''
 
 from beat import Beat
+from beatTable import BeatTable
 import numpy as np
 
 class Beats:
@@ -62,6 +65,9 @@ class Beats:
 	    Returns the maximum number of ECG readings associated with any single [Beat] object
 	    in the current [Beats] object.
 	'''
+	if (isinstance(self.beats, BeatTable)):
+		return self.beats.getMaxLengthOfBeat()
+
 	maxLengthOfBeat = 0
 	for beat in self.beats:
 		lengthOfBeat = len(beat.getECGReadings())
@@ -71,7 +77,8 @@ class Beats:
 
     def getBeats(self):
 	'''
-            Returns the list of [Beat] objects associated with the current [Beats] object.
+            Returns the list of [Beat] objects associated with the current [Beats] object.  This is usually
+            a [BeatTable] object, which can be used like a list of [Beat] objects.
 	'''
 	return self.beats
 	
@@ -79,37 +86,33 @@ class Beats:
         '''
              Returns the numpy array representation of the current [Beats] object.
    
-             The returned numpy array has 1 row and this row contains the numpy array 
-             representations of each of the [Beat] objects contained in the current [Beats]
-             object in the order in which the [Beat] objects occurred.
-
-	     DOES NOT WORK SINCE NUMPY CANNOT BE RAGGED
+             The returned numpy array has one row for each of the [Beat] objects contained in the current [Beats]
+             object (in the order in which the [Beat] objects occurred), and each row contains the ECG readings
+             of the corresponding [Beat] object, padded with zeros at the beginning to the maximum number of ECG
+             readings associated with any single [Beat] object in the current [Beats] object.
         '''
-       
-        numOfRows = 1
-        numOfCols = len(self.beats)
-        arr = np.ones((numOfRows, numOfCols))
 
-        for col in range(numOfCols):
-            arr[0, col] = self.beats[col].getNumpyArr()
+	# raggedBeats.py imports this file.
+	from raggedBeats import RaggedBeats
 
-	return arr
+	(X, beatMask, readingMask) = RaggedBeats.fromListOfBeatsObjs([self]).toPadded()
+	return X[0]
 
 
     def getArr(self):
         '''
              Returns the array representation of the current [Beats] object.
    
-             The returned array has 1 row and this row contains all of the ecg readings.
-
-	     DOES NOT WORK SINCE ARR CANNOT BE RAGGED
+             The returned numpy array has 1 row and this row contains all of the ecg readings, one [Beat] object
+             after the other.
         '''
 
-	arr = []
-        for beat in self.beats:
-            arr.extend(beat.getECGReadings())
-	
-	return arr
+	beats = self.beats
+	if (not isinstance(beats, BeatTable)):
+	    beats = BeatTable.fromBeats(beats)
+
+	(ecgReadings, timeStamps, lengths) = beats.getFlatBeats()
+	return beats.toPhysicalUnits(ecgReadings)
 
 
     def __str__(self):
@@ -0,0 +1,161 @@
+'''
+    This file contains the methods required to save the lists of [Beats] objects returned by getData in readData.py
+    to disk and to load them again, so that the ECG signals only need to be extracted from the databases once for every
+    pair of values of [amountOfTimeBeforeBeg] and [timeWindow].
+
+    Every saved list of [Beats] objects is stored in its own directory within [CACHE_DIR].  The name of this directory
+    contains a hash (the "key") of everything the list of [Beats] objects depends on:
+        * the values of [amountOfTimeBeforeBeg] and [timeWindow],
+        * the dictionary [TYPES_OF_EVENTS_DICT] defined in readData.py, the reader used ([USE_NATIVE_READER]) and whether
+          the raw ADC values are kept ([USE_COMPACT_DTYPE]),
+        * the names, sizes and modification times of all of the files in the databases (the names are listed in their
+          manifests, see recordManifest.py), and
+        * the contents of the source files that extract the [Beats] objects ([SOURCE_CODE_FILES]).
+    If any of these change, the key changes and the list of [Beats] objects is extracted again.
+
+    Instead of pickling millions of small Python objects, every list of [Beats] objects is saved as a [RaggedBeats]
+    object (see raggedBeats.py): the beats of all of the [Beats] objects are stored in flat numpy arrays (one .npy file
+    per array, so that they can be memory-mapped) together with the offsets that divide them into beats and windows,
+    and everything else (the names of the databases, patients, leads and cardiac events and the strings represented by
+    the integer codes) is stored in metadata.json.
+'''
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import readData
+import recordManifest
+from raggedBeats import RaggedBeats
+
+# CONSTANTS
+CACHE_DIR = "../listOfBeatsObjs/"
+
+# Increment this whenever the layout of the saved files changes.
+CACHE_VERSION = 3
+
+# The source files whose contents determine the [Beats] objects returned by getData.
+SOURCE_CODE_FILES = ['readData.py', 'wfdbReader.py', 'beat.py', 'beats.py', 'beatTable.py', 'ecgReading.py', 'raggedBeats.py', 'annotations.py', 'streamReader.py', 'recordCache.py',
+                     'recordManifest.py']
+
+def updateWithDatabase(sha, databaseName):
+    '''
+        Updates the hash object [sha] with the names, sizes and modification times of all of the files in the database [databaseName].
+
+        The names of the files are read from the manifest of the database (see recordManifest.py), so that the directory is only
+        listed again if it has changed, but every file is examined again, so that a file that is modified in place is noticed too.
+    '''
+
+    files = recordManifest.getManifest(databaseName)['files']
+    for fileName in sorted(files.keys()):
+        path = os.path.join(databaseName, fileName)
+        if not(os.path.isfile(path)):
+            continue
+
+        stat = os.stat(path)
+        sha.update((os.path.basename(os.path.normpath(databaseName)) + '/' + str(fileName) + ' ' + str(stat.st_size) + ' ' +
+                    repr(float(stat.st_mtime)) + '\n').encode('utf-8'))
+
+def getSourceFingerprint():
+    '''
+        Returns a string that changes whenever a file in one of the databases or one of the source files in
+        [SOURCE_CODE_FILES] changes.  The files in the databases are described by their names, sizes and modification
+        times (rather than their contents, which would take as long to hash as to read).
+    '''
+
+    sha = hashlib.sha1()
+
+    for databaseName in sorted(readData.getDatabases()):
+        updateWithDatabase(sha, databaseName)
+
+    codeDir = os.path.dirname(os.path.abspath(__file__))
+    for sourceCodeFile in SOURCE_CODE_FILES:
+        f = open(os.path.join(codeDir, sourceCodeFile), 'rb')
+        sha.update(f.read())
+        f.close()
+
+    return sha.hexdigest()
+
+def getCacheKey(amountOfTimeBeforeBeg, timeWindow, sourceFingerprint=None):
+    '''
+        Returns the key (a hexadecimal string) of the list of [Beats] objects that getData(amountOfTimeBeforeBeg, timeWindow, ...)
+        returns.  [sourceFingerprint] is the string returned by getSourceFingerprint; if it is None, it is computed.
+    '''
+
+    if (sourceFingerprint is None):
+        sourceFingerprint = getSourceFingerprint()
+
+    parameters = [CACHE_VERSION, repr(float(amountOfTimeBeforeBeg)), repr(float(timeWindow)),
+                  sorted(readData.TYPES_OF_EVENTS_DICT.items()), readData.USE_NATIVE_READER, readData.USE_COMPACT_DTYPE, sourceFingerprint]
+
+    return hashlib.sha1(json.dumps(parameters).encode('utf-8')).hexdigest()
+
+def getCacheDirName(amountOfTimeBeforeBeg, timeWindow, sourceFingerprint=None):
+    '''
+        Returns the name of the directory in which the list of [Beats] objects that getData(amountOfTimeBeforeBeg, timeWindow, ...)
+        returns is saved.
+    '''
+
+    key = getCacheKey(amountOfTimeBeforeBeg, timeWindow, sourceFingerprint)
+    return os.path.join(CACHE_DIR, 'listOfBeatsObjs' + str(amountOfTimeBeforeBeg) + '-' + str(timeWindow) + '-' + key)
+
+def isCached(amountOfTimeBeforeBeg, timeWindow, sourceFingerprint=None):
+    '''
+        Returns True if and only if an up-to-date list of [Beats] objects for [amountOfTimeBeforeBeg] and [timeWindow] has been saved.
+    '''
+
+    return os.path.isdir(getCacheDirName(amountOfTimeBeforeBeg, timeWindow, sourceFingerprint))
+
+def saveListOfBeatsObjs(listOfBeatsObjs, amountOfTimeBeforeBeg, timeWindow, sourceFingerprint=None):
+    '''
+        Saves [listOfBeatsObjs], the list of [Beats] objects that getData(amountOfTimeBeforeBeg, timeWindow, ...) returns, to the
+        directory returned by getCacheDirName.
+
+        The files are first written to a temporary directory, which is then renamed, so that an interrupted call never leaves
+        behind an incomplete directory.
+    '''
+
+    raggedBeats = listOfBeatsObjs
+    if (not isinstance(raggedBeats, RaggedBeats)):
+        raggedBeats = RaggedBeats.fromListOfBeatsObjs(listOfBeatsObjs)
+
+    cacheDirName = getCacheDirName(amountOfTimeBeforeBeg, timeWindow, sourceFingerprint)
+    if (not os.path.isdir(CACHE_DIR)):
+        os.makedirs(CACHE_DIR)
+
+    tempDirName = tempfile.mkdtemp(dir=CACHE_DIR)
+    raggedBeats.save(tempDirName)
+
+    if (os.path.isdir(cacheDirName)):
+        shutil.rmtree(tempDirName)
+    else:
+        os.rename(tempDirName, cacheDirName)
+
+def loadRaggedBeats(amountOfTimeBeforeBeg, timeWindow, sourceFingerprint=None, mmap=True):
+    '''
+        Loads and returns (as a [RaggedBeats] object) the list of [Beats] objects saved by saveListOfBeatsObjs for
+        [amountOfTimeBeforeBeg] and [timeWindow], or None if no up-to-date list has been saved.  The saved arrays are
+        memory-mapped if [mmap] = True.
+    '''
+
+    cacheDirName = getCacheDirName(amountOfTimeBeforeBeg, timeWindow, sourceFingerprint)
+    if (not os.path.isdir(cacheDirName)):
+        return None
+
+    return RaggedBeats.load(cacheDirName, mmap)
+
+def loadListOfBeatsObjs(amountOfTimeBeforeBeg, timeWindow, sourceFingerprint=None, mmap=True):
+    '''
+        Loads and returns the list of [Beats] objects saved by saveListOfBeatsObjs for [amountOfTimeBeforeBeg] and [timeWindow],
+        or None if no up-to-date list has been saved.
+
+        The beats of the returned [Beats] objects are views into the saved arrays, which are memory-mapped if [mmap] = True.
+    '''
+
+    raggedBeats = loadRaggedBeats(amountOfTimeBeforeBeg, timeWindow, sourceFingerprint, mmap)
+    if (raggedBeats is None):
+        return None
+
+    return raggedBeats.toListOfBeatsObjs()
@@ -7,6 +7,9 @@
 
 from beat import Beat
 from beats import Beats
+from beatTable import BeatTable
+import annotations
+import numpy as np
 import readData
 
 class ECGReading:
@@ -15,10 +18,11 @@ class ECGReading:
         ''' 
             Creates an object of class [ECGReading]
             
-            [beats] is a list of objects of the class [Beat].  Each element in this list represents
+            [beats] is a [BeatTable] object (or a list of objects of the class [Beat], which is converted into
+            a [BeatTable] object).  Each beat in [beats] represents
             a single ECG beat that was collected from one patient (whose name is [patietName]) and one lead
             (whose name is [leadName]) and that is stored in one database (whose name is [databaseName]).  
-            The order of the elements in the list [beat] is the order with which the beats were collected.
+            The order of the beats in [beats] is the order with which the beats were collected.
             
         '''
 
@@ -28,43 +32,46 @@ class ECGReading:
         self.leadName = str(leadName)
         
         # Fields containing information about the actual ECG readings (and the actual ECG beats)
+        if (not isinstance(beats, BeatTable)):
+            beats = BeatTable.fromBeats(beats)
         self.beats = beats
     
     def getIndexOfLastBeatEndingBefore(self, timeStamp):
         '''
-            Loops through [beats], the list of [Beat] objects associated with this [ECGReading] object,
+            Searches [beats], the list of [Beat] objects associated with this [ECGReading] object,
             and returns the index of the last [Beat] object in [beats] that ends before the time stamp
             [timeStamp], which is measured in seconds that have elasped since the beginning of the reading.
             
             If there is no such [Beat] object (i.e. there is no [Beat] object that ends before the time stamp
             [timeStamp] in this [ECGReading] object), then -1 (an invalid index) is returned.
+
+            If no [Beat] object in this [ECGReading] object ends after the specified time stamp [timeStamp],
+            then -1 (an invalid index) is returned.
             
         '''
-        lastIndex = -1
-        lastEndTimeStamp = 0
-    
-        # Loop through all of the beats in the ECGReading object.
-        for index in range(len(self.beats)):
-            beat = self.beats[index]
-            
-            endTimeStamp = beat.getLastTimeStamp()
 
-            # If the current beat ends after the specified time stamp, then break out of the loop.
-            # You have gone slightly too far.
-            if (endTimeStamp > timeStamp):
-                return lastIndex
-            
-            # Otherwise, you need to update things for the next iteration of the for loop.
-            else:
-                lastIndex = index
-                lastEndTimeStamp = endTimeStamp
-    
-        return -1
-                
+        return int(self.getIndicesOfLastBeatsEndingBefore(np.array([timeStamp]))[0])
+
+    def getIndicesOfLastBeatsEndingBefore(self, timeStamps):
+        '''
+            Returns a numpy array containing, for each time stamp in the numpy array [timeStamps], the value that
+            getIndexOfLastBeatEndingBefore returns for that time stamp.
+
+            Since the beats are in the order with which they were collected, the time stamps at which they end
+            are sorted, so the indices are found by bisection.
+        '''
+
+        endTimeStamps = self.beats.endTimeStamps
+        numOfBeats = len(endTimeStamps)
+
+        # The index of the first [Beat] object that ends after each time stamp.
+        indices = np.searchsorted(endTimeStamps, timeStamps, side='right')
+
+        return np.where(indices == numOfBeats, -1, indices - 1)
     
     def getIndexOfFirstBeatBegAfter(self, timeStamp):
         '''
-            Loops through [beats], the list of [Beat] objects associated with this [ECGReading] object,
+            Searches [beats], the list of [Beat] objects associated with this [ECGReading] object,
             and returns the index of the first [Beat] object in [beats] that begins after the time stamp
             [timeStamp], which is measured in seconds that have elasped since the beginning of the reading.
             
@@ -75,26 +82,52 @@ class ECGReading:
             then -1 (an invalid index) is returned.
                                                
         '''
-        
-        # If the time stamp is even before the first beat, then return -1.
-        if (timeStamp < self.beats[0].getFirstTimeStamp()):
-            return -1
-        
-        # Loop through all of the beats in the ECGReading object.
-        for index in range(len(self.beats)):
-            beat = self.beats[index]
-            
-            begTimeStamp = beat.getFirstTimeStamp()
-            
-            # If the current beat begins after the specified time stamp, then it is the first to do so.
-            if (begTimeStamp >= timeStamp):
-                return index
-        
-        return -1
+
+        return int(self.getIndicesOfFirstBeatsBegAfter(np.array([timeStamp]))[0])
+
+    def getIndicesOfFirstBeatsBegAfter(self, timeStamps):
+        '''
+            Returns a numpy array containing, for each time stamp in the numpy array [timeStamps], the value that
+            getIndexOfFirstBeatBegAfter returns for that time stamp.
+
+            Since the beats are in the order with which they were collected, the time stamps at which they begin
+            are sorted, so the indices are found by bisection.
+        '''
+
+        begTimeStamps = self.beats.beginTimeStamps
+        numOfBeats = len(begTimeStamps)
+        if (numOfBeats == 0):
+            return np.full(len(timeStamps), -1, dtype=np.int64)
+
+        # The index of the first [Beat] object that begins at or after each time stamp.
+        indices = np.searchsorted(begTimeStamps, timeStamps, side='left')
+
+        # If the time stamp is even before the first beat (or after the last beat), then the index is -1.
+        invalid = (timeStamps < begTimeStamps[0]) | (indices == numOfBeats)
+
+        return np.where(invalid, -1, indices)
+
+    def getIndicesOfWindows(self, auxTimeStamps, amountOfTimeBeforeBeg, timeWindow):
+        '''
+            Returns a tuple of numpy arrays of the form ([begIndices], [endIndices]).  For the abnormal cardiac rhythm beginning at
+            the time stamp [auxTimeStamps][n], [begIndices][n] is the index of the first [Beat] object that begins less than
+            ([amountOfTimeBeforeBeg] + [timeWindow]) seconds before the rhythm begins and [endIndices][n] is the index of the last
+            [Beat] object that ends less than [amountOfTimeBeforeBeg] seconds before the rhythm begins.  Either index is -1 (an
+            invalid index) if there is no such [Beat] object.
+
+            The windows of all of the rhythms are found at once.
+        '''
+
+        auxTimeStamps = np.asarray(auxTimeStamps, dtype=np.float64)
+
+        begIndices = self.getIndicesOfFirstBeatsBegAfter(auxTimeStamps - (amountOfTimeBeforeBeg + timeWindow))
+        endIndices = self.getIndicesOfLastBeatsEndingBefore(auxTimeStamps - amountOfTimeBeforeBeg)
+
+        return (begIndices, endIndices)
     
     def getIndicesOfBegOfAux(self):
         ''' 
-            Loops through [beats], the list of [Beat] objects associated with this [ECGReading] object, and returns an array of tuples
+            Searches [beats], the list of [Beat] objects associated with this [ECGReading] object, and returns an array of tuples
             containing the indicies of the first [Beat] object in each abnormal cardiac rhythm and the abbreviated string
             descriptions of abnormal cardiac rhythm.  This string abbreviation must be a key in the dictionary [TYPES_OF_EVENTS_DICT]
             defined in readData.py.
@@ -107,24 +140,33 @@ class ECGReading:
                   the string abbreviation for the abnormal cardiac rhythm.
             
         '''
-    
-        lastAux = ""
-        arr = []
-    
-        for index in range(len(self.beats)):
-            beat = self.beats[index]
-            aux = beat.getAux()
-            
-            # If this is the first beat in the new cardiac rhythm,...
-            if (lastAux != aux):
 
-                # If this beat is part of a cardiac rhythm of interest,...
-                if (aux in readData.TYPES_OF_EVENTS_DICT):
-                    arr.append((index, aux))
+        auxNames = self.beats.auxNames
+        (begAuxIndices, auxCodes) = self.getBegsOfAux()
 
-                lastAux = aux
-        
-        return arr
+        return [(index, auxNames[auxCode]) for (index, auxCode) in zip(begAuxIndices.tolist(), auxCodes.tolist())]
+
+    def getBegsOfAux(self):
+        '''
+            Returns a tuple of numpy arrays of the form ([begAuxIndices], [auxCodes]) containing the same abnormal cardiac rhythms as
+            the array returned by getIndicesOfBegOfAux, where the string abbreviation of the (n + 1)-th rhythm is
+            auxNames[auxCodes[n]] ([auxNames] is the list of strings of the [BeatTable] object of this [ECGReading] object).
+
+            The beats at which the rhythm changes and the rhythms of interest are found with vectorized comparisons of the integer
+            codes of the rhythms (see annotations.py).
+        '''
+
+        auxCodes = np.asarray(self.beats.auxCodes)
+        auxNames = self.beats.auxNames
+
+        # The first [Beat] object in each new cardiac rhythm...
+        begAuxIndices = annotations.getIndicesOfAuxChanges(auxCodes, auxNames)
+
+        # ... that is part of a cardiac rhythm of interest.
+        isEvent = annotations.getEventMask(auxNames, readData.TYPES_OF_EVENTS_DICT)
+        begAuxIndices = begAuxIndices[isEvent[auxCodes[begAuxIndices]]]
+
+        return (begAuxIndices, auxCodes[begAuxIndices])
 
     def createBeatsObj(self, begAuxIndex, aux, amountOfTimeBeforeBeg, timeWindow):
         '''
@@ -138,27 +180,32 @@ class ECGReading:
                 must be a key in the dictionary [TYPES_OF_EVENTS_DICT] defined in readData.py.
         '''
 
-        auxTimeStamp = self.beats[begAuxIndex].getFirstTimeStamp()
- 
-        begTimeStamp = auxTimeStamp - (amountOfTimeBeforeBeg + timeWindow)
-        endTimeStamp = auxTimeStamp - (amountOfTimeBeforeBeg)
- 
-        begIndex = self.getIndexOfFirstBeatBegAfter(begTimeStamp)
-        endIndex = self.getIndexOfLastBeatEndingBefore(endTimeStamp)
+        auxTimeStamp = self.beats.beginTimeStamps[begAuxIndex]
+
+        (begIndices, endIndices) = self.getIndicesOfWindows(np.array([auxTimeStamp]), amountOfTimeBeforeBeg, timeWindow)
+
+        return self.createBeatsObjFromWindow(begIndices[0], endIndices[0], aux, auxTimeStamp, amountOfTimeBeforeBeg, timeWindow)
+
+    def createBeatsObjFromWindow(self, begIndex, endIndex, aux, auxTimeStamp, amountOfTimeBeforeBeg, timeWindow):
+        '''
+                Returns a [Beats] object, that is associated with the list of contiguous [Beat] objects in this [ECGReading] object
+                that starts with the (begIndex + 1)-th [Beat] object and ends with the (endIndex + 1)-th [Beat] object and that
+                precedes the abnormal cardiac rhythm [aux] beginning at the time stamp [auxTimeStamp].
+
+                Returns None if either index is -1 or if there are no such [Beat] objects.
+        '''
     
         if (begIndex == -1 or endIndex == -1):
             return None
 
         else:
-            listOfBeatObjs = []
-            
-            for index in range(begIndex, endIndex + 1):
-                listOfBeatObjs.append(self.beats[index])
+            # The beats of the [Beats] object are a view into the [BeatTable] object of this [ECGReading] object.
+            beatTable = self.beats[begIndex:endIndex + 1]
 		
-            if (len(listOfBeatObjs) == 0):
+            if (len(beatTable) == 0):
                 return None
             else:
-                return Beats(self.databaseName, self.patientName, self.leadName, amountOfTimeBeforeBeg, timeWindow, aux, auxTimeStamp, listOfBeatObjs)
+                return Beats(self.databaseName, self.patientName, self.leadName, amountOfTimeBeforeBeg, timeWindow, aux, auxTimeStamp, beatTable)
 
     def createBeatsObjs(self, amountOfTimeBeforeBeg, timeWindow):
         '''
@@ -169,15 +216,40 @@ class ECGReading:
             that ends less than [amountOfTimeBeforeBeg] seconds before the (begAuxIndex + 1)-th [Beat] object in this [ECGReading] object.
             
         '''
-        
-        listOfBeatsObjs = []
-        for (begIndex, aux) in self.getIndicesOfBegOfAux():
-            beatsObj = self.createBeatsObj(begIndex, aux, amountOfTimeBeforeBeg, timeWindow)
 
-            if (beatsObj is not None):
-                listOfBeatsObjs.append(beatsObj)
+        configuration = (amountOfTimeBeforeBeg, timeWindow)
+        return self.createBeatsObjsForConfigurations([configuration])[configuration]
+
+    def createBeatsObjsForConfigurations(self, configurations):
+        '''
+            Returns a dictionary whose keys are the tuples of the form ([amountOfTimeBeforeBeg], [timeWindow]) in the list
+            [configurations] and whose values are the lists of [Beats] objects that createBeatsObjs(amountOfTimeBeforeBeg, timeWindow)
+            returns.
+
+            The beginnings of the abnormal cardiac rhythms are only found once for all of the configurations.
+        '''
+
+        (begAuxIndices, auxCodes) = self.getBegsOfAux()
+        auxTimeStamps = self.beats.beginTimeStamps[begAuxIndices]
+
+        listsOfBeatsObjs = {}
+        for configuration in configurations:
+            (amountOfTimeBeforeBeg, timeWindow) = configuration
+
+            # Find the windows preceding all of the abnormal cardiac rhythms at once.
+            (begIndices, endIndices) = self.getIndicesOfWindows(auxTimeStamps, amountOfTimeBeforeBeg, timeWindow)
+
+            listOfBeatsObjs = []
+            for index in range(len(begAuxIndices)):
+                aux = self.beats.auxNames[auxCodes[index]]
+                beatsObj = self.createBeatsObjFromWindow(begIndices[index], endIndices[index], aux, auxTimeStamps[index], amountOfTimeBeforeBeg, timeWindow)
+
+                if (beatsObj is not None):
+                    listOfBeatsObjs.append(beatsObj)
+
+            listsOfBeatsObjs[configuration] = listOfBeatsObjs
 
-        return listOfBeatsObjs
+        return listsOfBeatsObjs
 
     def __str__(self):
         # Heading
@@ -1,32 +1,21 @@
 #!/usr/bin/env python
 
-from readData import CARDIAC_EVENTS, getData
-from LSTM import runModel
-from prepareForLSTM import divideIntoTrainingAndTesting, convertIntoNumpyArrays
+# The numerical libraries (e.g. the OpenBLAS library loaded by numpy) only read the number of
+# threads they may use when they are loaded, and the processes that run the sets inherit them,
+# so the number of threads of every process is limited before anything imports numpy.
+import threadBudget
+threadBudget.setThreadBudget(threadBudget.THREADS_PER_WORKER)
 
-import random
-import pickle
-import numpy as np
-import os.path
-import os
-
-np.random.seed(1337)  # for reproducibility
-
-# ************************************************************
-# OPEN TWO FILES
-# ************************************************************
-overviewFileName = '../results/resultsOverview.txt'
-verboseFileName = '../results/resultsVerbose.txt'
+from readData import getRaggedBeatsForConfigurations
+import datasetCache
+import sweepRunner
 
-# If these files already exist then delete them.
-if (os.path.isfile(overviewFileName)):
-	os.remove(overviewFileName)
-if (os.path.isfile(verboseFileName)):
-	os.remove(verboseFileName)
+import numpy as np
 
-# Create the files.
-overviewFile = open(overviewFileName, 'w')
-verboseFile = open(verboseFileName, 'w')
+# If True, the windows are fed to the LSTM in batches of windows with similar numbers of
+# beats (see batchGenerator.py) instead of as one padded numpy array.  The batches are built
+# from the memory-mapped files saved by datasetCache.py, so only one batch is in memory at once.
+USE_BATCHES = True
 
 # ***********************************************************
 # SET UP LIST OF VALUES
@@ -37,123 +26,39 @@ verboseFile = open(verboseFileName, 'w')
 timeBefores = np.linspace(0, 20, 5)
 timeWindows = np.linspace(2, 22, 5)
 
-numOfTimeBefores = timeBefores.shape[0]
-numOfTimeWindows = timeWindows.shape[0]
-
-sensitivities = np.empty((numOfTimeBefores, numOfTimeWindows), dtype = float)
-specificities = np.empty((numOfTimeBefores, numOfTimeWindows), dtype = float)
-
-count = 0
-total = numOfTimeBefores * numOfTimeWindows
-
-for timeBeforeIndex in range(numOfTimeBefores):
-	amountOfTimeBeforeBeg = timeBefores[timeBeforeIndex]
-
-	for timeWindowIndex in range(numOfTimeWindows):
-		timeWindow = timeWindows[timeWindowIndex]
-		
-		count = count + 1		
-		print ('*********************************************')
-		print ('Doing set of ' + str(count) + ' \ ' + str(total))
-		print ('*********************************************')
-
-		verboseFile.write('**************************************************************\n')
-		verboseFile.write('Amount of time before beginning: ' + str(amountOfTimeBeforeBeg) + '\n')
-		verboseFile.write('Time Window: ' + str(timeWindow) + '\n')
-		verboseFile.write('**************************************************************\n\n')
-
-		# ************************************************************
-		# EXTRACTION OF ECG SIGNALS FROM DATABASES
-		# ************************************************************
-		print 'Extracting ECG signals from the databases... '
-
-		# Get the [Beats] objects that are [timeWindow] seconds in length
-		# and that end [amountOfTimeBeforeBeg] seconds before an abnormal
-		# cardiac rhythm begins.
-		fileName = '../listOfBeatsObjs/listOfBeatsObjs' + str(amountOfTimeBeforeBeg) + '-' + str(timeWindow)
-		fileExists = os.path.isfile(fileName)
-		#if (True):
-		if (not(fileExists)):
-			doCreateTextFiles = False
-			listOfBeatsObjs = getData(amountOfTimeBeforeBeg, timeWindow, doCreateTextFiles)
-			with open(fileName, 'w') as f:
-		    		pickle.dump([listOfBeatsObjs], f)
-		else:
-			with open(fileName) as f:
-		    		listOfBeatsObjs = pickle.load(f)[0]
-		
-		print 'Completed! \n'
-
-		# ********************************************************
-		# DIVISION OF ECG SIGNALS INTO TRAINING AND TESTING DATA
-		# *******************************************************
-		print 'Dividing the ECG signals into training and testing data...'
-		# The fraction of the [Beats] objects that should be a part of the
-		# training data.
-		trainingFract = 0.5
-		(trainingObjs, testingObjs) = divideIntoTrainingAndTesting(listOfBeatsObjs, trainingFract)
-		print 'Completed! \n'
-
-		# *********************************************************
-		# CONVERT INTO NUMPY ARRAYS
-		# ********************************************************
-		print 'Converting ECG signals into numpy arrays...'
-		(trainingX, trainingY, testingX, testingY) = convertIntoNumpyArrays(listOfBeatsObjs, trainingObjs, testingObjs)
-		print 'Completed! \n'
-
-		# *********************************************************
-		# CREATE, TRAIN, AND EVALUATE LSTM
-		# *********************************************************
-		print 'Creating, training and evaluating LSTM...'
-		numOfOutcomes = len(CARDIAC_EVENTS)
-		(sensitivity, specificity) = runModel(trainingX, trainingY, testingX, testingY, verboseFile)
-		sensitivities[timeBeforeIndex][timeWindowIndex] = sensitivity
-		specificities[timeBeforeIndex][timeWindowIndex] = specificity
-
-		print 'Completed! \n'
-
-# *********************************************************
-# PUT SENSITIVITY AND SPECIFICITY
-# *********************************************************
-
-# Print sensitivity
-overviewFile.write('Each column represents a different time window and each row represents a different time before beginning of cardiac event.  The first row and column contain the values of these variables.\n\n')
-
-np.set_printoptions(precision=3)
-
-# Print timeWindows.
-overviewFile.write('***********************\nTime Windows\n**********************\n\n')
-overviewFile.write(str(timeWindows))
-overviewFile.write('\n\n')
-
-# Print timeBefores.
-overviewFile.write('*************************\nTime Before Beginning of Cardiac Event\n************************\n\n')
-overviewFile.write(str(timeBefores))
-overviewFile.write('\n\n')
-
-# Print specificity.
-overviewFile.write('*************************\nSensitivity\n************************\n\n')
-overviewFile.write(str(specificities))
-overviewFile.write('\n\n')
-
-# Print sensitivity.
-overviewFile.write('*************************\nSpecificity\n************************\n\n')
-overviewFile.write(str(sensitivities))
-overviewFile.write('\n\n')
+# ************************************************************
+# EXTRACTION OF ECG SIGNALS FROM DATABASES
+# ************************************************************
+# The [Beats] objects of every pair of values are saved by datasetCache.py.  The [Beats]
+# objects of all of the pairs of values that have not been saved yet (or whose source
+# files have changed since they were saved) are extracted at once, so that every record
+# is only read once (by several processes in parallel, see getRaggedBeatsForConfigurations).
+sourceFingerprint = datasetCache.getSourceFingerprint()
+
+configurations = [(amountOfTimeBeforeBeg, timeWindow) for amountOfTimeBeforeBeg in timeBefores for timeWindow in timeWindows]
+missingConfigurations = [configuration for configuration in configurations if not(datasetCache.isCached(configuration[0], configuration[1], sourceFingerprint))]
+
+raggedBeatsForConfigurations = {}
+if (len(missingConfigurations) > 0):
+	print 'Extracting ECG signals from the databases for ' + str(len(missingConfigurations)) + ' sets... '
+	doCreateTextFiles = False
+	raggedBeatsForConfigurations = getRaggedBeatsForConfigurations(missingConfigurations, doCreateTextFiles)
+	for configuration in missingConfigurations:
+		datasetCache.saveListOfBeatsObjs(raggedBeatsForConfigurations[configuration], configuration[0], configuration[1], sourceFingerprint)
+	print 'Completed! \n'
 
-# *********************************************************
-# CLOSE THE TWO FILES
-# *********************************************************
-overviewFile.close()
-verboseFile.close()
+# ************************************************************
+# CREATE, TRAIN, AND EVALUATE AN LSTM FOR EVERY SET
+# ************************************************************
+# The sets are run in parallel by sweepRunner.py, which journals the result of every set as
+# soon as it is completed, so that a sweep that is interrupted only runs the remaining sets
+# when it is started again.  The results files are built from the journal.
+# The extracted [Beats] objects are freed before the sets are run, since every set loads its own.
+raggedBeatsForConfigurations = None
+cells = sweepRunner.runSweep(timeBefores, timeWindows, sourceFingerprint, USE_BATCHES)
+print 'Completed! \n'
 
 # *********************************************************
-# SAVE SENSITIVITY AND SPECIFICITY TO FILE
+# WRITE THE RESULTS FILES
 # *********************************************************
-sensitivitiesFileName = '../results/sensitivities.pickle'
-with open(sensitivitiesFileName, 'w') as f:
-	pickle.dump([sensitivities], f)
-
-specificitiesFileName = '../results/specificities.pickle'
-with open(specificitiesFileName, 'w') as f:
-	pickle.dump([specificities], f)
+sweepRunner.writeResults(timeBefores, timeWindows, cells)
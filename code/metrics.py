@@ -0,0 +1,258 @@
+'''
+    This file contains the methods required to evaluate the predictions of one or more LSTM models (see LSTM.py).
+
+    The predictions of a model are the softmax scores returned by model.predict, i.e. a numpy array [scores] with one row for
+    every testing [Beats] object and one column for every cardiac event in [CARDIAC_EVENTS] (see readData.py), and the actual
+    cardiac events are given by [actualClasses], a vector containing the index in [CARDIAC_EVENTS] of the cardiac event that
+    every testing [Beats] object precedes.
+
+    Every method also accepts a stack of evaluations: [scores] may have an additional first axis (one set of scores for every
+    model), and [weights] (a numpy array with one row for every evaluation and one column for every testing [Beats] object)
+    gives the number of times every testing [Beats] object is counted in every evaluation.  The bootstrap (see bootstrap) is
+    such a stack, in which the weights of every resample are the number of times every [Beats] object was drawn, so thousands of
+    resamples are evaluated with a few numpy operations and without copying [scores].
+
+    The metrics of a class that are undefined (e.g. the sensitivity of a class without any [Beats] objects) are NaN.
+'''
+
+import numpy as np
+
+# CONSTANTS
+
+# The number of resamples evaluated at once by bootstrap.
+BOOTSTRAP_CHUNK_SIZE = 64
+
+# The names of the per-class metrics returned by getClassMetrics.
+CLASS_METRIC_NAMES = ['sensitivity', 'specificity', 'ppv', 'f1']
+
+def getPredictedClasses(scores):
+    '''
+        Returns the index of the predicted cardiac event (i.e. the cardiac event with the highest score, or the first such
+        cardiac event if several have the highest score) of every row of [scores].
+    '''
+
+    return np.argmax(scores, axis=-1)
+
+def getActualClasses(oneHot):
+    '''
+        Returns the index of the cardiac event of every row of [oneHot], a numpy array of one-hot vectors (e.g. the array
+        testingY returned by convertIntoNumpyArrays in prepareForLSTM.py).  As in the original loop over the entries, this is
+        the index of the last entry that equals 1, or 0 if no entry does.
+    '''
+
+    isOne = (np.asarray(oneHot) == 1)
+    numOfOutcomes = isOne.shape[-1]
+
+    lastIndices = numOfOutcomes - 1 - np.argmax(isOne[..., ::-1], axis=-1)
+    return np.where(isOne.any(axis=-1), lastIndices, 0)
+
+def divide(numerators, denominators):
+    '''
+        Returns [numerators] / [denominators] as floats, where every quotient whose denominator is 0 is NaN.
+    '''
+
+    numerators = np.asarray(numerators, dtype=np.float64)
+    denominators = np.asarray(denominators, dtype=np.float64)
+
+    quotients = np.full(np.broadcast(numerators, denominators).shape, np.nan)
+    np.divide(numerators, denominators, out=quotients, where=(denominators != 0))
+
+    return quotients
+
+def getConfusionMatrices(actualClasses, predictedClasses, numOfClasses, weights=None):
+    '''
+        Returns the confusion matrix of [predictedClasses] and [actualClasses], whose entry (i, j) is the (weighted) number of
+        [Beats] objects that precede the i-th cardiac event and are predicted to precede the j-th cardiac event.
+
+        [predictedClasses] and [weights] may each have an additional first axis, in which case a stack of confusion matrices
+        (one for every row) is returned.  The matrices are counted with a single call to np.bincount.
+    '''
+
+    actualClasses = np.asarray(actualClasses)
+    predictedClasses = np.asarray(predictedClasses)
+    isStack = (predictedClasses.ndim > 1 or (weights is not None and np.ndim(weights) > 1))
+
+    if (weights is None):
+        (predictedClasses,) = np.broadcast_arrays(np.atleast_2d(predictedClasses))
+    else:
+        (predictedClasses, weights) = np.broadcast_arrays(np.atleast_2d(predictedClasses), np.atleast_2d(weights))
+    numOfMatrices = predictedClasses.shape[0]
+
+    # The index of every (weighted) [Beats] object in the flattened stack of confusion matrices.
+    flatIndices = (np.arange(numOfMatrices)[:, np.newaxis] * numOfClasses + actualClasses) * numOfClasses + predictedClasses
+
+    counts = np.bincount(flatIndices.ravel(), None if (weights is None) else weights.ravel(),
+                         minlength=numOfMatrices * numOfClasses * numOfClasses)
+    confusionMatrices = counts.reshape((numOfMatrices, numOfClasses, numOfClasses))
+
+    return confusionMatrices if (isStack) else confusionMatrices[0]
+
+def getClassMetrics(confusionMatrices):
+    '''
+        Returns a dictionary containing, for every metric in [CLASS_METRIC_NAMES], a numpy array containing the value of the
+        metric for every cardiac event (and every confusion matrix, if [confusionMatrices] is a stack of confusion matrices).
+        Every cardiac event is evaluated against all of the others (i.e. it is the positive class), so
+            * 'sensitivity' = tp / (tp + fn),
+            * 'specificity' = tn / (tn + fp),
+            * 'ppv' = tp / (tp + fp) (the positive predictive value or precision), and
+            * 'f1' = 2 tp / (2 tp + fp + fn).
+        The dictionary also contains the number of [Beats] objects of every cardiac event ('support').
+    '''
+
+    confusionMatrices = np.asarray(confusionMatrices, dtype=np.float64)
+
+    tp = np.diagonal(confusionMatrices, axis1=-2, axis2=-1)
+    support = confusionMatrices.sum(axis=-1)
+    numOfPredicted = confusionMatrices.sum(axis=-2)
+    total = confusionMatrices.sum(axis=(-2, -1))[..., np.newaxis]
+
+    fn = support - tp
+    fp = numOfPredicted - tp
+    tn = total - tp - fn - fp
+
+    return {'sensitivity': divide(tp, tp + fn),
+            'specificity': divide(tn, tn + fp),
+            'ppv': divide(tp, tp + fp),
+            'f1': divide(2 * tp, 2 * tp + fp + fn),
+            'support': support}
+
+def getAccuracies(confusionMatrices):
+    '''
+        Returns the fraction of the [Beats] objects whose cardiac event is predicted correctly (for every confusion matrix, if
+        [confusionMatrices] is a stack of confusion matrices).
+    '''
+
+    confusionMatrices = np.asarray(confusionMatrices, dtype=np.float64)
+    return divide(np.trace(confusionMatrices, axis1=-2, axis2=-1), confusionMatrices.sum(axis=(-2, -1)))
+
+def getAucs(scores, actualClasses, weights=None):
+    '''
+        Returns the area under the ROC curve of every cardiac event (evaluated against all of the others) given the scores in
+        [scores], i.e. the probability that a [Beats] object that precedes the cardiac event has a higher score than one that
+        does not (where ties count as one half).
+
+        [scores] and [weights] may each have an additional first axis, in which case the areas of every row of the stack are
+        returned.  The [Beats] objects are sorted once for every set of scores, and the weights of every group of tied scores are
+        then counted for all of the evaluations at once, so no pairs of [Beats] objects are enumerated.
+    '''
+
+    scores = np.asarray(scores, dtype=np.float64)
+    actualClasses = np.asarray(actualClasses)
+    isStack = (scores.ndim > 2 or (weights is not None and np.ndim(weights) > 1))
+
+    (numOfSamples, numOfClasses) = scores.shape[-2:]
+    if (weights is None):
+        weights = np.ones(numOfSamples)
+
+    # Axes: (evaluation, cardiac event, [Beats] object).
+    scores = np.swapaxes(scores.reshape((-1, numOfSamples, numOfClasses)), -2, -1)
+    weights = np.asarray(weights, dtype=np.float64).reshape((-1, 1, numOfSamples))
+    isPositive = (actualClasses[np.newaxis, :] == np.arange(numOfClasses)[:, np.newaxis])[np.newaxis]
+    numOfEvaluations = max(scores.shape[0], weights.shape[0])
+
+    # The rank of the group of tied scores of every [Beats] object (0 for the group with the lowest score).  The ranks only
+    # depend on the scores, so they are shared by all of the evaluations of a single set of scores (e.g. the bootstrap).
+    order = np.argsort(scores, axis=-1, kind='mergesort')
+    sortedScores = np.take_along_axis(scores, order, axis=-1)
+    isGroupBeg = np.ones(sortedScores.shape, dtype=bool)
+    isGroupBeg[..., 1:] = (sortedScores[..., 1:] != sortedScores[..., :-1])
+    ranks = np.empty(order.shape, dtype=np.intp)
+    np.put_along_axis(ranks, order, np.cumsum(isGroupBeg, axis=-1) - 1, axis=-1)
+
+    # The weights of the negative and positive [Beats] objects of every group, counted with a single call to np.bincount.
+    bins = (((np.arange(numOfEvaluations).reshape((-1, 1, 1)) * numOfClasses + np.arange(numOfClasses).reshape((1, -1, 1))) * 2 +
+             isPositive) * numOfSamples + ranks)
+    (bins, weights) = np.broadcast_arrays(bins, weights)
+    groupWeights = np.bincount(bins.ravel(), weights.ravel(), minlength=numOfEvaluations * numOfClasses * 2 * numOfSamples)
+    groupWeights = groupWeights.reshape((numOfEvaluations, numOfClasses, 2, numOfSamples))
+    (negativeWeights, positiveWeights) = (groupWeights[:, :, 0], groupWeights[:, :, 1])
+
+    # Every positive [Beats] object wins against the negative [Beats] objects of the lower groups, and ties with those of its group.
+    lowerNegativeWeights = np.cumsum(negativeWeights, axis=-1) - negativeWeights
+    numOfWins = (positiveWeights * (lowerNegativeWeights + 0.5 * negativeWeights)).sum(axis=-1)
+    aucs = divide(numOfWins, positiveWeights.sum(axis=-1) * negativeWeights.sum(axis=-1))
+
+    return aucs if (isStack) else aucs[0]
+
+def getRocCurve(scores, actualClasses, classIndex):
+    '''
+        Returns the ROC curve of the cardiac event whose index is [classIndex] (evaluated against all of the others) given the
+        scores in [scores] (of a single model), as a tuple of the form ([falsePositiveRates], [truePositiveRates], [thresholds]),
+        where the [Beats] objects whose scores are at least thresholds[i] are predicted to precede the cardiac event at the i-th
+        point of the curve.  The first point of the curve is (0, 0).
+    '''
+
+    classScores = np.asarray(scores, dtype=np.float64)[:, classIndex]
+    isPositive = (np.asarray(actualClasses) == classIndex)
+
+    order = np.argsort(-classScores, kind='mergesort')
+    sortedScores = classScores[order]
+    truePositives = np.cumsum(isPositive[order])
+    falsePositives = np.cumsum(~isPositive[order])
+
+    # Only the last [Beats] object of every group of tied scores is a point of the curve.
+    isGroupEnd = np.ones(len(sortedScores), dtype=bool)
+    isGroupEnd[:-1] = (sortedScores[1:] != sortedScores[:-1])
+
+    falsePositiveRates = divide(np.concatenate([[0], falsePositives[isGroupEnd]]), np.sum(~isPositive))
+    truePositiveRates = divide(np.concatenate([[0], truePositives[isGroupEnd]]), np.sum(isPositive))
+    thresholds = np.concatenate([[np.inf], sortedScores[isGroupEnd]])
+
+    return (falsePositiveRates, truePositiveRates, thresholds)
+
+def evaluate(scores, actualClasses, weights=None):
+    '''
+        Returns a dictionary containing the confusion matrix ('confusionMatrix'), the accuracy ('accuracy'), the metrics returned
+        by getClassMetrics and the areas under the ROC curves ('auc') of the predictions [scores] (or of every evaluation of the
+        stack given by [scores] and [weights]).
+    '''
+
+    scores = np.asarray(scores)
+    numOfClasses = scores.shape[-1]
+
+    confusionMatrices = getConfusionMatrices(actualClasses, getPredictedClasses(scores), numOfClasses, weights)
+
+    evaluation = getClassMetrics(confusionMatrices)
+    evaluation['confusionMatrix'] = confusionMatrices
+    evaluation['accuracy'] = getAccuracies(confusionMatrices)
+    evaluation['auc'] = getAucs(scores, actualClasses, weights)
+
+    return evaluation
+
+def getBootstrapWeights(numOfSamples, numOfResamples, randomState):
+    '''
+        Returns a numpy array containing, for each of [numOfResamples] resamples (drawn with replacement using [randomState], a
+        np.random.RandomState object), the number of times each of the [numOfSamples] [Beats] objects was drawn.
+    '''
+
+    indices = randomState.randint(0, numOfSamples, size=(numOfResamples, numOfSamples))
+    indices = indices + np.arange(numOfResamples)[:, np.newaxis] * numOfSamples
+
+    return np.bincount(indices.ravel(), minlength=numOfResamples * numOfSamples).reshape((numOfResamples, numOfSamples))
+
+def bootstrap(scores, actualClasses, numOfResamples=1000, seed=1337, chunkSize=BOOTSTRAP_CHUNK_SIZE):
+    '''
+        Evaluates the predictions [scores] (of a single model) on [numOfResamples] bootstrap resamples of the testing [Beats]
+        objects, [chunkSize] resamples at a time, and returns a dictionary containing the values of 'accuracy', 'auc' and the
+        metrics in [CLASS_METRIC_NAMES] (see evaluate), with one row for every resample.
+    '''
+
+    randomState = np.random.RandomState(seed)
+    numOfSamples = np.shape(scores)[0]
+
+    chunks = []
+    for begResampleIndex in range(0, numOfResamples, chunkSize):
+        weights = getBootstrapWeights(numOfSamples, min(chunkSize, numOfResamples - begResampleIndex), randomState)
+        chunks.append(evaluate(scores, actualClasses, weights))
+
+    names = ['accuracy', 'auc'] + CLASS_METRIC_NAMES
+    return dict([(name, np.concatenate([chunk[name] for chunk in chunks])) for name in names])
+
+def getConfidenceIntervals(samples, confidence=0.95):
+    '''
+        Returns a tuple of the form ([lower], [upper]) containing the bounds of the [confidence] percentile confidence intervals
+        of [samples] (e.g. one of the arrays returned by bootstrap), computed over its first axis and ignoring NaNs.
+    '''
+
+    alpha = 100.0 * (1.0 - confidence) / 2.0
+    return (np.nanpercentile(samples, alpha, axis=0), np.nanpercentile(samples, 100.0 - alpha, axis=0))
@@ -0,0 +1,314 @@
+'''
+    This file contains the methods required to export the weights of a trained LSTM model (see createModel in LSTM.py) to a
+    single file, and the definition of the class 'NumpyLSTMModel', each object of which computes the predictions of such a
+    model with numpy alone.  Neither Keras nor Theano is imported, so the predictions of a trained model can be computed on
+    machines without them (and without the time it takes to import them and compile the model).
+
+    The file written by exportModel is a .npz file containing two arrays:
+        * 'weights' - a flat array containing the weights of all of the layers (as 32-bit floats, as in Keras).
+        * 'metadata' - a JSON string containing [MODEL_FILE_VERSION] and, for every layer of the model, a dictionary containing
+          its type ('LSTM', 'Dense', 'Activation', 'Dropout' or 'Masking'), its activation functions, whether it returns its
+          whole sequence of outputs and the name, shape and offset in 'weights' of every array of weights.
+
+    The weights of every LSTM layer are stored as three arrays, [W] (inputs x 4 units), [U] (units x 4 units) and [b]
+    (4 units), containing the weights of the input, forget, cell and output gates (in this order).  This is the layout of the
+    LSTM layers of Keras 1.2 (and later); the twelve arrays of the LSTM layers of earlier versions of Keras (W_i, U_i, b_i,
+    W_c, U_c, b_c, W_f, U_f, b_f, W_o, U_o, b_o) are converted into it.
+
+    The forward pass is that of Keras at prediction time: Dropout layers do nothing, and the inputs of every LSTM layer are
+    multiplied by [W] for all of the time steps of a batch at once, so only the products with [U] are computed one time step
+    at a time.  As in Keras, a masked time step (see getMask) leaves the outputs and the states of every LSTM layer unchanged.
+'''
+
+import json
+
+import numpy as np
+
+# CONSTANTS
+
+# Increment this whenever the layout of the exported file changes.
+MODEL_FILE_VERSION = 1
+
+# The type of the weights and of the computations (Keras computes in 32-bit floats).
+DEFAULT_DTYPE = np.float32
+
+DEFAULT_BATCH_SIZE = 256
+
+def hardSigmoid(x):
+    return np.clip(0.2 * x + 0.5, 0.0, 1.0)
+
+def sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+def relu(x):
+    return np.maximum(x, 0.0)
+
+def linear(x):
+    return x
+
+def softmax(x):
+    e = np.exp(x - np.max(x, axis=-1, keepdims=True))
+    return e / np.sum(e, axis=-1, keepdims=True)
+
+# The activation functions that the layers may use, indexed by their names in Keras.
+ACTIVATIONS = {'hard_sigmoid': hardSigmoid,
+               'sigmoid': sigmoid,
+               'tanh': np.tanh,
+               'relu': relu,
+               'linear': linear,
+               'softmax': softmax}
+
+def getActivationName(activation):
+    '''
+        Returns the name of [activation], an activation function of Keras or its name.
+    '''
+
+    if (activation is None):
+        return 'linear'
+    if (not isinstance(activation, basestring)):
+        activation = activation.__name__
+
+    if (activation not in ACTIVATIONS):
+        raise ValueError('Unsupported activation function: ' + str(activation))
+
+    return str(activation)
+
+def getLSTMWeights(weights):
+    '''
+        Returns a tuple of the form ([W], [U], [b]) (see the documentation at the top of this file) containing the weights in the
+        list [weights] returned by get_weights for an LSTM layer of Keras.
+    '''
+
+    if (len(weights) == 3):
+        return tuple(weights)
+
+    if (len(weights) == 12):
+        (W_i, U_i, b_i, W_c, U_c, b_c, W_f, U_f, b_f, W_o, U_o, b_o) = weights
+        return (np.concatenate([W_i, W_f, W_c, W_o], axis=1), np.concatenate([U_i, U_f, U_c, U_o], axis=1),
+                np.concatenate([b_i, b_f, b_c, b_o]))
+
+    raise ValueError('An LSTM layer should have 3 or 12 arrays of weights, not ' + str(len(weights)) + '.')
+
+def getLayers(model):
+    '''
+        Returns a list containing, for every layer of [model] (a Sequential model of Keras), a tuple of the form ([layer], [arrays]),
+        where [layer] is the dictionary describing the layer in the metadata of the exported file and [arrays] is a list of tuples
+        of the form ([name], [array]) containing its weights.
+    '''
+
+    layers = []
+    for kerasLayer in model.layers:
+        layerType = kerasLayer.__class__.__name__
+        config = kerasLayer.get_config()
+        weights = kerasLayer.get_weights()
+
+        if (layerType == 'LSTM'):
+            (W, U, b) = getLSTMWeights(weights)
+            innerActivation = config.get('inner_activation', config.get('recurrent_activation'))
+            layer = {'type': layerType, 'activation': getActivationName(config.get('activation')),
+                     'innerActivation': getActivationName(innerActivation), 'returnSequences': bool(config.get('return_sequences'))}
+            arrays = [('W', W), ('U', U), ('b', b)]
+        elif (layerType == 'Dense'):
+            layer = {'type': layerType, 'activation': getActivationName(config.get('activation'))}
+            arrays = [('W', weights[0])]
+            if (len(weights) > 1):
+                arrays.append(('b', weights[1]))
+        elif (layerType == 'Activation'):
+            layer = {'type': layerType, 'activation': getActivationName(config.get('activation'))}
+            arrays = []
+        elif (layerType == 'Dropout'):
+            layer = {'type': layerType}
+            arrays = []
+        elif (layerType == 'Masking'):
+            layer = {'type': layerType, 'maskValue': float(config.get('mask_value', 0.0))}
+            arrays = []
+        else:
+            raise ValueError('Unsupported layer: ' + layerType)
+
+        layers.append((layer, arrays))
+
+    return layers
+
+def exportModel(model, fileName):
+    '''
+        Writes the weights of [model], a trained model created by createModel in LSTM.py (or any Sequential model of Keras
+        containing only the types of layers listed at the top of this file), to the file [fileName] (see the documentation at
+        the top of this file).
+    '''
+
+    layers = []
+    flatWeights = []
+    offset = 0
+
+    for (layer, arrays) in getLayers(model):
+        layer['arrays'] = []
+        for (name, array) in arrays:
+            array = np.asarray(array, dtype=DEFAULT_DTYPE)
+            layer['arrays'].append({'name': name, 'shape': list(array.shape), 'offset': offset})
+            flatWeights.append(array.ravel())
+            offset = offset + array.size
+        layers.append(layer)
+
+    metadata = {'version': MODEL_FILE_VERSION, 'layers': layers}
+    weights = np.concatenate([np.zeros(0, dtype=DEFAULT_DTYPE)] + flatWeights)
+
+    f = open(fileName, 'wb')
+    np.savez(f, weights=weights, metadata=np.array(json.dumps(metadata)))
+    f.close()
+
+def getMask(X, maskValue=0.0):
+    '''
+        Returns a boolean numpy array that is True for every time step of [X] (a numpy array of sequences, e.g. a batch returned by
+        getBatch in batchGenerator.py) that is not padding, i.e. whose inputs do not all equal [maskValue] (as the Masking layer
+        of Keras).
+    '''
+
+    return np.any(X != maskValue, axis=-1)
+
+class NumpyLSTMModel(object):
+
+    def __init__(self, layers, dtype=DEFAULT_DTYPE):
+        '''
+            Creates an object of class [NumpyLSTMModel] whose layers are described by [layers], a list of tuples of the form
+            ([layer], [arrays]) (see getLayers), and which computes in numpy arrays whose elements are of type [dtype].
+        '''
+
+        self.dtype = dtype
+        self.layers = []
+        for (layer, arrays) in layers:
+            layer = dict(layer)
+            for (name, array) in arrays:
+                layer[name] = np.ascontiguousarray(array, dtype=dtype)
+            self.layers.append(layer)
+
+    @classmethod
+    def fromKerasModel(cls, model, dtype=DEFAULT_DTYPE):
+        '''
+            Returns a [NumpyLSTMModel] object that computes the predictions of [model], a Sequential model of Keras.
+        '''
+
+        return cls(getLayers(model), dtype)
+
+    @classmethod
+    def load(cls, fileName, dtype=DEFAULT_DTYPE):
+        '''
+            Returns a [NumpyLSTMModel] object that computes the predictions of the model exported to the file [fileName] by
+            exportModel.
+        '''
+
+        f = np.load(fileName)
+        weights = f['weights']
+        metadata = json.loads(str(f['metadata']))
+        f.close()
+
+        if (metadata['version'] != MODEL_FILE_VERSION):
+            raise ValueError(fileName + ' was exported by version ' + str(metadata['version']) + ' of exportModel, not version ' +
+                             str(MODEL_FILE_VERSION) + '.')
+
+        layers = []
+        for layer in metadata['layers']:
+            arrays = []
+            for array in layer.pop('arrays'):
+                size = int(np.prod(array['shape']))
+                arrays.append((str(array['name']), weights[array['offset']:array['offset'] + size].reshape(array['shape'])))
+            layers.append((layer, arrays))
+
+        return cls(layers, dtype)
+
+    def runLSTM(self, layer, X, mask):
+        '''
+            Returns the outputs of the LSTM layer [layer] (one of the dictionaries in [layers]) for the inputs [X], a (number of
+            sequences) x (number of time steps) x (number of inputs) numpy array, where the time steps at which [mask] (a boolean
+            (number of sequences) x (number of time steps) numpy array, or None) is False are skipped.
+        '''
+
+        (numOfSequences, numOfTimeSteps, numOfInputs) = X.shape
+        (W, U, b) = (layer['W'], layer['U'], layer['b'])
+        numOfUnits = U.shape[0]
+        activation = ACTIVATIONS[layer['activation']]
+        innerActivation = ACTIVATIONS[layer['innerActivation']]
+
+        # The contributions of the inputs of all of the time steps to the gates, computed at once.
+        XW = (np.dot(X.reshape((-1, numOfInputs)), W) + b).reshape((numOfSequences, numOfTimeSteps, 4 * numOfUnits))
+
+        h = np.zeros((numOfSequences, numOfUnits), dtype=self.dtype)
+        c = np.zeros((numOfSequences, numOfUnits), dtype=self.dtype)
+        if (layer['returnSequences']):
+            outputs = np.zeros((numOfSequences, numOfTimeSteps, numOfUnits), dtype=self.dtype)
+
+        for timeStep in range(numOfTimeSteps):
+            z = XW[:, timeStep] + np.dot(h, U)
+
+            i = innerActivation(z[:, :numOfUnits])
+            f = innerActivation(z[:, numOfUnits:2 * numOfUnits])
+            newC = f * c + i * activation(z[:, 2 * numOfUnits:3 * numOfUnits])
+            o = innerActivation(z[:, 3 * numOfUnits:])
+            newH = o * activation(newC)
+
+            if (mask is None):
+                (h, c) = (newH, newC)
+            else:
+                isUnmasked = mask[:, timeStep, np.newaxis]
+                h = np.where(isUnmasked, newH, h)
+                c = np.where(isUnmasked, newC, c)
+
+            if (layer['returnSequences']):
+                outputs[:, timeStep] = h
+
+        return outputs if (layer['returnSequences']) else h
+
+    def predict_on_batch(self, X, mask=None):
+        '''
+            Returns the predictions of the model for the batch of sequences [X] (see runLSTM for [mask]).  Like the method of the same
+            name of the models of Keras, so a [NumpyLSTMModel] object can be passed to predictInBatches in batchGenerator.py.
+        '''
+
+        outputs = np.asarray(X, dtype=self.dtype)
+
+        for layer in self.layers:
+            if (layer['type'] == 'LSTM'):
+                outputs = self.runLSTM(layer, outputs, mask)
+                if (not(layer['returnSequences'])):
+                    mask = None
+            elif (layer['type'] == 'Dense'):
+                outputs = np.dot(outputs, layer['W'])
+                if ('b' in layer):
+                    outputs = outputs + layer['b']
+                outputs = ACTIVATIONS[layer['activation']](outputs)
+            elif (layer['type'] == 'Activation'):
+                outputs = ACTIVATIONS[layer['activation']](outputs)
+            elif (layer['type'] == 'Masking'):
+                layerMask = getMask(outputs, layer['maskValue'])
+                mask = layerMask if (mask is None) else (mask & layerMask)
+                outputs = outputs * layerMask[..., np.newaxis]
+
+        return outputs
+
+    def predict(self, X, mask=None, batchSize=DEFAULT_BATCH_SIZE):
+        '''
+            Returns the predictions of the model for the sequences [X] (see runLSTM for [mask]), computed [batchSize] sequences at a
+            time.
+        '''
+
+        predictions = []
+        for begIndex in range(0, len(X), batchSize):
+            batchMask = None if (mask is None) else mask[begIndex:begIndex + batchSize]
+            predictions.append(self.predict_on_batch(X[begIndex:begIndex + batchSize], batchMask))
+
+        return np.concatenate(predictions)
+
+    def __str__(self):
+        # Heading
+        str1 = ' ****** NUMPY LSTM MODEL OBJECT ********* \n \n'
+
+        for layer in self.layers:
+            str1 = str1 + layer['type']
+            if ('activation' in layer):
+                str1 = str1 + ' (' + layer['activation'] + ')'
+            if (layer['type'] == 'LSTM'):
+                str1 = str1 + ': ' + str(layer['W'].shape[0]) + ' inputs, ' + str(layer['U'].shape[0]) + ' units'
+            elif ('W' in layer):
+                str1 = str1 + ': ' + str(layer['W'].shape[0]) + ' inputs, ' + str(layer['W'].shape[1]) + ' outputs'
+            str1 = str1 + '\n'
+
+        return str1 + '\n'
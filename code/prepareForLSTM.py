@@ -8,19 +8,19 @@ import random
 import numpy as np
 
 import readData
+from raggedBeats import RaggedBeats
 
 np.random.seed(1337)  # for reproducibility
 
-def divideIntoTrainingAndTesting(listOfBeatsObjs, trainingFract):
+def divideIndicesIntoTrainingAndTesting(cardiacEvents, trainingFract):
     '''
-        Divides [listOfBeatsObjs], a vector of [Beats] objects, into [trainingObjs], a vector of [Beats] objects
-        that will be used to train the LSTM, and [testingObjs], a vector of [Beats] objects that will
-        be used to test the LSTM.
-        
-        Returns a vector of the form ([trainingObjs], [testingObjs])
-        
-        [trainingFract] fraction of the [Beats] objects in [listOfBeatsObjs] will be in [trainingObjs] and the rest of
-        the [Beats] objects will be in [testingObjs].
+        Divides the indices of [cardiacEvents], a vector containing the cardiac event that each [Beats] object precedes,
+        into [trainingIndices], the indices of the [Beats] objects that will be used to train the LSTM, and [testingIndices],
+        the indices of the [Beats] objects that will be used to test the LSTM.
+
+        Returns a vector of the form ([trainingIndices], [testingIndices]), both of which are shuffled numpy arrays.
+
+        [trainingFract] fraction of the [Beats] objects associated with each cardiac event will be used to train the LSTM.
     '''
 
     # Create a dictionary that keeps track of the number of [Beats] objects
@@ -31,12 +31,12 @@ def divideIntoTrainingAndTesting(listOfBeatsObjs, trainingFract):
 
     # Calculate the values of the entries of the dictionary that keeps track of the number
     # of [Beats] objects associated with each cardiac event and the indices of these [Beats] objects.
-    for index in range(len(listOfBeatsObjs)):
-        aux = listOfBeatsObjs[index].getCardiacEvent()
+    for index in range(len(cardiacEvents)):
+        aux = str(cardiacEvents[index])
         numOfEachAux[aux][0] = numOfEachAux[aux][0] + 1
         numOfEachAux[aux][1].append(index)
 
-    trainingIndices = []
+    trainingIndices = set()
 
     # Determine the number of [Beats] objects associated with each cardiac event and use that
     # to determine the indices of the [Beats] objects associated with each cardiac event that will
@@ -47,29 +47,43 @@ def divideIntoTrainingAndTesting(listOfBeatsObjs, trainingFract):
         numOfTrainingBeats = int(round(trainingFract * len(listOfIndices)))
         trainingBeatsIndices = random.sample(listOfIndices, numOfTrainingBeats)
             
-        trainingIndices.extend(trainingBeatsIndices)
+        trainingIndices.update(trainingBeatsIndices)
+
+    isTraining = np.array([index in trainingIndices for index in range(len(cardiacEvents))], dtype=bool)
+    trainingIndices = np.flatnonzero(isTraining)
+    testingIndices = np.flatnonzero(~isTraining)
 
+    np.random.shuffle(trainingIndices)
+    np.random.shuffle(testingIndices)
 
-    trainingObjs = []
-    testingObjs = []
+    return (trainingIndices, testingIndices)
+
+def divideIntoTrainingAndTesting(listOfBeatsObjs, trainingFract):
+    '''
+        Divides [listOfBeatsObjs], a vector of [Beats] objects, into [trainingObjs], a vector of [Beats] objects
+        that will be used to train the LSTM, and [testingObjs], a vector of [Beats] objects that will
+        be used to test the LSTM.
+        
+        Returns a vector of the form ([trainingObjs], [testingObjs])
+        
+        [trainingFract] fraction of the [Beats] objects in [listOfBeatsObjs] will be in [trainingObjs] and the rest of
+        the [Beats] objects will be in [testingObjs].
+    '''
 
-    for index in range(0, len(listOfBeatsObjs)):
-        beatsObj = listOfBeatsObjs[index]
-        if (index in trainingIndices):
-            trainingObjs.append(beatsObj)
-        else:
-            testingObjs.append(beatsObj)
+    cardiacEvents = [beatsObj.getCardiacEvent() for beatsObj in listOfBeatsObjs]
+    (trainingIndices, testingIndices) = divideIndicesIntoTrainingAndTesting(cardiacEvents, trainingFract)
 
-    np.random.shuffle(trainingObjs)
-    np.random.shuffle(testingObjs)
+    trainingObjs = [listOfBeatsObjs[index] for index in trainingIndices]
+    testingObjs = [listOfBeatsObjs[index] for index in testingIndices]
 
     return (trainingObjs, testingObjs)
 
 
-def convertIntoNumpyArrays(listOfBeatsObjs, trainingObjs, testingObjs):
+def convertIntoNumpyArrays(listOfBeatsObjs, trainingObjs, testingObjs, dtype=np.float64):
     '''
        Convert [trainingObjs], a vector of [Beats] objects that will be used to train the LSTM, and 
-       [testingObjs], a vector of [Beats] objects that will used be used to test the LSTM into Numpy Arrays.
+       [testingObjs], a vector of [Beats] objects that will used be used to test the LSTM into Numpy Arrays
+       whose elements are of type [dtype].
        
        Returns a tuple of the form ([trainingX], [trainingY], [testingX], [testingY])
     '''
@@ -83,48 +97,27 @@ def convertIntoNumpyArrays(listOfBeatsObjs, trainingObjs, testingObjs):
     for beatsObj in listOfBeatsObjs:
         maxLengthOfBeat = max(maxLengthOfBeat, beatsObj.getMaxLengthOfBeat())
 
+    (trainingX, trainingY) = convertIntoNumpyArray(trainingObjs, maxNumOfBeats, maxLengthOfBeat, dtype)
+    (testingX, testingY) = convertIntoNumpyArray(testingObjs, maxNumOfBeats, maxLengthOfBeat, dtype)
 
-    numOfTraining = len(trainingObjs)
-    numOfTesting = len(testingObjs)
-    numOfOutcomes = len(readData.CARDIAC_EVENTS)
-
-    # Initialize the arrays.
-    trainingX = np.zeros((numOfTraining, maxNumOfBeats, maxLengthOfBeat), dtype=np.float64)
-    trainingY = np.zeros((numOfTraining, numOfOutcomes), dtype=np.float64)
-
-    testingX = np.zeros((numOfTesting, maxNumOfBeats, maxLengthOfBeat), dtype=np.float64)
-    testingY = np.zeros((numOfTesting, numOfOutcomes), dtype=np.float64)
-
-    # Create training numpy arrays.
-    for sequenceIndex in range(numOfTraining):
-        sequenceOfBeats = trainingObjs[sequenceIndex].getBeats()
-	diff = maxNumOfBeats - len(sequenceOfBeats)            
+    return (trainingX, trainingY, testingX, testingY)
 
-        for beatIndex in range(len(sequenceOfBeats)):
-        	ecgReadings = sequenceOfBeats[beatIndex].getECGReadings()
-		ecgReadings = np.ndarray.tolist(np.pad(ecgReadings, (maxLengthOfBeat - len(ecgReadings), 0), 'constant', constant_values=(0, 0)))
-                    
-                for ecgReadingIndex in range(len(ecgReadings)):
-                    ecgReading = ecgReadings[ecgReadingIndex]
-                    trainingX[sequenceIndex, beatIndex, ecgReadingIndex] = ecgReading
+def convertIntoNumpyArray(beatsObjs, maxNumOfBeats, maxLengthOfBeat, dtype=np.float64):
+    '''
+       Convert [beatsObjs], a vector of [Beats] objects (or a [RaggedBeats] object, see raggedBeats.py), into Numpy Arrays.
 
-        cardiacEventIndex = readData.CARDIAC_EVENTS.index(trainingObjs[sequenceIndex].getCardiacEvent())
-        trainingY[sequenceIndex, cardiacEventIndex] = 1
+       Returns a tuple of the form ([X], [Y]), where [X] is a (len(beatsObjs)) x [maxNumOfBeats] x [maxLengthOfBeat]
+       array and [Y] is a (len(beatsObjs)) x (len(CARDIAC_EVENTS)) array.  [X][n, b] contains the ecg readings of the
+       (b + 1)-th beat of the (n + 1)-th [Beats] object, padded with zeros at the beginning, and [X][n, b] is all zeros
+       if the (n + 1)-th [Beats] object has fewer than (b + 1) beats.  [Y][n] is the one-hot encoding of the cardiac event
+       that the (n + 1)-th [Beats] object precedes.  The elements of [X] and [Y] are of type [dtype].
+    '''
 
-    # Create testing numpy arrays.
-    for sequenceIndex in range(numOfTesting):
-        sequenceOfBeats = testingObjs[sequenceIndex].getBeats()
-	diff = maxNumOfBeats - len(sequenceOfBeats)
-            
-        for beatIndex in range(len(sequenceOfBeats)):
-                ecgReadings = sequenceOfBeats[beatIndex].getECGReadings()
-		ecgReadings = np.ndarray.tolist(np.pad(ecgReadings, (maxLengthOfBeat - len(ecgReadings), 0), 'constant', constant_values=(0, 0)))
-                    
-                for ecgReadingIndex in range(len(ecgReadings)):
-                        ecgReading = ecgReadings[ecgReadingIndex]
-                        testingX[sequenceIndex, beatIndex, ecgReadingIndex] = ecgReading
+    raggedBeats = beatsObjs
+    if (not isinstance(raggedBeats, RaggedBeats)):
+        raggedBeats = RaggedBeats.fromListOfBeatsObjs(beatsObjs)
 
-        cardiacEventIndex = readData.CARDIAC_EVENTS.index(testingObjs[sequenceIndex].getCardiacEvent())
-        testingY[sequenceIndex, cardiacEventIndex] = 1
+    (X, beatMask, readingMask) = raggedBeats.toPadded(maxNumOfBeats, maxLengthOfBeat, dtype)
+    Y = raggedBeats.getOneHotCardiacEvents(dtype)
 
-    return (trainingX, trainingY, testingX, testingY)
+    return (X, Y)
@@ -0,0 +1,362 @@
+'''
+    This file contains the methods required to detect the R peaks of the QRS complexes of an ECG signal (in the style of the
+    detector of Pan and Tompkins), so that the beats of records without annotation files can be found, and to compare the
+    detected R peaks with the beat annotations of records that have them.
+
+    The stages of the detector that process every sample are vectorized:
+        1. The signal is filtered by a Butterworth bandpass filter with a passband of [BANDPASS_FREQUENCIES] Hz (forwards and
+           backwards, so the QRS complexes are not delayed).
+        2. The five-point derivative of the filtered signal is computed and squared.
+        3. The squared derivative is integrated over a moving window of [INTEGRATION_WINDOW] seconds (centred on every sample).
+        4. The peaks of the integrated signal that are at least [REFRACTORY_PERIOD] seconds apart are the candidate QRS
+           complexes, and the maximum slope of the filtered signal around every candidate is computed.
+    Only the adaptive thresholds (which depend on the QRS complexes and the noise peaks found so far) are computed one candidate
+    at a time, as in the original detector: a candidate is a QRS complex if it is above the signal threshold (and is not a
+    T wave), and if no QRS complex is found for [SEARCH_BACK_FACTOR] times the average RR interval, the largest candidate above
+    the (lower) search-back threshold since the last QRS complex is taken.  The R peak of every QRS complex is the sample with the
+    largest absolute value of the filtered signal within [R_PEAK_SEARCH_WINDOW] seconds of the peak of the integrated signal.
+
+    The detected beats are described exactly like the beats read from the annotation files (see getBeatsFromAtr in
+    wfdbReader.py and fromAnnotations in annotations.py), except that their type is [DETECTED_BEAT_TYPE] and they are not part
+    of any cardiac rhythm.
+
+    Usage: python qrsDetector.py [databaseName] [leadNum]
+    prints the accuracy of the detector on every record of the database (see getAccuracyReport).
+'''
+
+import sys
+import time
+
+import numpy as np
+import scipy.ndimage
+import scipy.signal
+
+import annotations
+import readData
+import recordManifest
+import wfdbReader
+
+# CONSTANTS
+BANDPASS_FREQUENCIES = (5.0, 15.0)
+BANDPASS_ORDER = 2
+
+# All of the following are in seconds.
+INTEGRATION_WINDOW = 0.150
+REFRACTORY_PERIOD = 0.200
+SLOPE_WINDOW = 0.075
+T_WAVE_WINDOW = 0.360
+R_PEAK_SEARCH_WINDOW = 0.075
+LEARNING_PERIOD = 2.0
+
+# A search back is started when no QRS complex has been found for [SEARCH_BACK_FACTOR] times the average of the last
+# [NUM_OF_RR_INTERVALS] RR intervals.
+SEARCH_BACK_FACTOR = 1.66
+NUM_OF_RR_INTERVALS = 8
+
+# The mnemonic given to every detected beat (the beat type "unclassifiable beat").
+DETECTED_BEAT_TYPE = 'Q'
+
+# The mnemonics of the annotations that mark beats (see https://www.physionet.org/physiobank/annotations.shtml).  Only these
+# annotations are compared with the detected R peaks.
+BEAT_TYPES = ['N', 'L', 'R', 'B', 'A', 'a', 'J', 'S', 'V', 'r', 'F', 'e', 'j', 'n', 'E', '/', 'f', 'Q', '?']
+
+# A detected R peak matches a beat annotation if it is at most [MATCHING_WINDOW] seconds away from it (as in the ANSI/AAMI EC57
+# standard).
+MATCHING_WINDOW = 0.150
+
+def getIntegratedSignal(ecgReadings, samplingFrequency):
+    '''
+        Returns a tuple of the form ([filteredReadings], [derivative], [integratedSignal]) containing the results of the first
+        three stages of the detector (see the documentation at the top of this file) for the ECG readings [ecgReadings] of a
+        signal sampled at [samplingFrequency] Hz.
+    '''
+
+    ecgReadings = np.asarray(ecgReadings, dtype=np.float64)
+
+    # Stage 1: bandpass filter.
+    nyquistFrequency = 0.5 * samplingFrequency
+    (b, a) = scipy.signal.butter(BANDPASS_ORDER, [BANDPASS_FREQUENCIES[0] / nyquistFrequency, BANDPASS_FREQUENCIES[1] / nyquistFrequency],
+                                 btype='band')
+    filteredReadings = scipy.signal.filtfilt(b, a, ecgReadings)
+
+    # Stage 2: five-point derivative (y[n] = (2 x[n + 2] + x[n + 1] - x[n - 1] - 2 x[n - 2]) / 8T) and squaring.
+    derivative = np.convolve(filteredReadings, np.array([2.0, 1.0, 0.0, -1.0, -2.0]) * (samplingFrequency / 8.0), mode='same')
+    squaredDerivative = derivative * derivative
+
+    # Stage 3: moving-window integration.
+    windowLength = max(1, int(round(INTEGRATION_WINDOW * samplingFrequency)))
+    integratedSignal = np.convolve(squaredDerivative, np.ones(windowLength) / windowLength, mode='same')
+
+    return (filteredReadings, derivative, integratedSignal)
+
+def getCandidates(derivative, integratedSignal, samplingFrequency):
+    '''
+        Returns a tuple of the form ([candidates], [slopes]) containing the sample indices of the peaks of [integratedSignal] that
+        are at least [REFRACTORY_PERIOD] seconds apart and the maximum absolute value of [derivative] within [SLOPE_WINDOW]
+        seconds of every such peak.
+    '''
+
+    (candidates, properties) = scipy.signal.find_peaks(integratedSignal, distance=max(1, int(round(REFRACTORY_PERIOD * samplingFrequency))))
+
+    slopeWindowLength = 2 * int(round(SLOPE_WINDOW * samplingFrequency)) + 1
+    slopes = scipy.ndimage.maximum_filter1d(np.abs(derivative), slopeWindowLength)[candidates]
+
+    return (candidates, slopes)
+
+def isTWave(index, qrsIndex, positions, slopes, tWaveWindow):
+    '''
+        Returns True if and only if the candidate [index] is a T wave of the QRS complex [qrsIndex], i.e. if it is less than
+        [tWaveWindow] samples after it and its slope is less than half of the slope of the QRS complex ([positions] and [slopes]
+        are lists containing the sample index and the slope of every candidate).
+    '''
+
+    return (positions[index] - positions[qrsIndex] < tWaveWindow and slopes[index] < 0.5 * slopes[qrsIndex])
+
+def getQRSComplexes(candidates, slopes, integratedSignal, samplingFrequency):
+    '''
+        Returns a numpy array containing the indices in [candidates] (see getCandidates) of the candidates that are QRS complexes,
+        found with the adaptive thresholds of the detector (see the documentation at the top of this file).
+    '''
+
+    values = integratedSignal[candidates].tolist()
+    positions = candidates.tolist()
+    slopes = slopes.tolist()
+
+    # The thresholds are initialized from the first [LEARNING_PERIOD] seconds of the signal.
+    learningSignal = integratedSignal[:max(1, int(LEARNING_PERIOD * samplingFrequency))]
+    signalLevel = 0.25 * float(np.max(learningSignal))
+    noiseLevel = 0.5 * float(np.mean(learningSignal))
+    threshold = noiseLevel + 0.25 * (signalLevel - noiseLevel)
+
+    tWaveWindow = T_WAVE_WINDOW * samplingFrequency
+    refractoryPeriod = REFRACTORY_PERIOD * samplingFrequency
+
+    qrsIndices = []
+    rrIntervals = []
+    lastQRSIndex = None
+    lastSearchBackIndex = 0
+
+    for index in range(len(positions)):
+        value = values[index]
+        isQRS = (value > threshold and (lastQRSIndex is None or not(isTWave(index, lastQRSIndex, positions, slopes, tWaveWindow))))
+
+        # If no QRS complex has been found for too long, the largest candidate above the search-back threshold (that is not too
+        # close to the last QRS complex) is a QRS complex.
+        if (not(isQRS) and lastQRSIndex is not None and len(rrIntervals) > 0):
+            averageRRInterval = sum(rrIntervals) / float(len(rrIntervals))
+            if (positions[index] - positions[lastQRSIndex] > SEARCH_BACK_FACTOR * averageRRInterval):
+                searchBackIndices = [otherIndex for otherIndex in range(max(lastQRSIndex + 1, lastSearchBackIndex), index + 1)
+                                     if (positions[otherIndex] - positions[lastQRSIndex] > refractoryPeriod and
+                                         values[otherIndex] > 0.5 * threshold)]
+                lastSearchBackIndex = index + 1
+
+                if (len(searchBackIndices) > 0):
+                    searchBackIndex = max(searchBackIndices, key=lambda otherIndex: values[otherIndex])
+                    signalLevel = 0.25 * values[searchBackIndex] + 0.75 * signalLevel
+
+                    rrIntervals.append(positions[searchBackIndex] - positions[lastQRSIndex])
+                    rrIntervals = rrIntervals[-NUM_OF_RR_INTERVALS:]
+                    qrsIndices.append(searchBackIndex)
+                    lastQRSIndex = searchBackIndex
+
+                    # The current candidate (if it is not the found QRS complex) was only rejected as a T wave of the previous
+                    # QRS complex, so it is examined again against the found one.
+                    if (searchBackIndex != index and value > threshold and
+                            positions[index] - positions[searchBackIndex] > refractoryPeriod and
+                            not(isTWave(index, searchBackIndex, positions, slopes, tWaveWindow))):
+                        isQRS = True
+
+        # The levels are only updated once it is known whether the current candidate is a QRS complex.
+        if (isQRS):
+            signalLevel = 0.125 * value + 0.875 * signalLevel
+
+            if (lastQRSIndex is not None):
+                rrIntervals.append(positions[index] - positions[lastQRSIndex])
+                rrIntervals = rrIntervals[-NUM_OF_RR_INTERVALS:]
+            qrsIndices.append(index)
+            lastQRSIndex = index
+        else:
+            noiseLevel = 0.125 * value + 0.875 * noiseLevel
+
+        threshold = noiseLevel + 0.25 * (signalLevel - noiseLevel)
+
+    return np.array(sorted(set(qrsIndices)), dtype=np.int64)
+
+def getRPeaks(filteredReadings, peaks, samplingFrequency):
+    '''
+        Returns a numpy array containing, for every sample index in [peaks], the index of the sample with the largest absolute
+        value of [filteredReadings] within [R_PEAK_SEARCH_WINDOW] seconds of it.
+    '''
+
+    searchWindowLength = int(round(R_PEAK_SEARCH_WINDOW * samplingFrequency))
+    offsets = np.arange(-searchWindowLength, searchWindowLength + 1)
+
+    sampleIndices = np.clip(peaks[:, np.newaxis] + offsets[np.newaxis, :], 0, len(filteredReadings) - 1)
+    rPeaks = sampleIndices[np.arange(len(peaks)), np.argmax(np.abs(filteredReadings[sampleIndices]), axis=1)]
+
+    # Two QRS complexes cannot share an R peak.
+    return np.unique(rPeaks)
+
+def detectRPeaks(ecgReadings, samplingFrequency):
+    '''
+        Returns a numpy array containing the (zero-indexed) sample indices of the R peaks of the QRS complexes of the ECG readings
+        [ecgReadings] (in millivolts) of a signal sampled at [samplingFrequency] Hz.
+    '''
+
+    if (len(ecgReadings) == 0):
+        return np.zeros(0, dtype=np.int64)
+
+    (filteredReadings, derivative, integratedSignal) = getIntegratedSignal(ecgReadings, samplingFrequency)
+    (candidates, slopes) = getCandidates(derivative, integratedSignal, samplingFrequency)
+    qrsIndices = getQRSComplexes(candidates, slopes, integratedSignal, samplingFrequency)
+
+    return getRPeaks(filteredReadings, candidates[qrsIndices], samplingFrequency)
+
+def readECGReadings(databaseName, patientName, leadNum=0):
+    '''
+        Returns a tuple of the form ([samplingFrequency], [ecgReadings]) containing the sampling frequency and the ECG readings (in
+        millivolts) of the lead [leadNum] of the record of patient [patientName] in database [databaseName].
+    '''
+
+    header = wfdbReader.readHeader(databaseName, patientName)
+    (timeStamps, adcValues) = wfdbReader.getCompactECGSignalFromBinary(databaseName, patientName, header)
+
+    signal = header['signals'][leadNum]
+    return (header['samplingFrequency'], wfdbReader.adcToPhysical(adcValues[:, leadNum], signal['gain'], signal['baseline']))
+
+def detectRPeaksOfRecord(databaseName, patientName, leadNum=0):
+    '''
+        Returns the sample indices of the R peaks (see detectRPeaks) of the lead [leadNum] of the record of patient [patientName]
+        in database [databaseName].
+    '''
+
+    (samplingFrequency, ecgReadings) = readECGReadings(databaseName, patientName, leadNum)
+    return detectRPeaks(ecgReadings, samplingFrequency)
+
+def readAnnotationsFromDetector(databaseName, patientName, leadNum=0):
+    '''
+        Like readAnnotationsFromAtr in annotations.py, but for the beats found by the detector in the lead [leadNum] of the record
+        of patient [patientName] in database [databaseName] (which does not need an annotation file).
+    '''
+
+    rPeaks = detectRPeaksOfRecord(databaseName, patientName, leadNum)
+    return annotations.fromAnnotations(rPeaks, [DETECTED_BEAT_TYPE] * len(rPeaks), [annotations.NO_AUX] * len(rPeaks))
+
+def getBeatsFromDetector(databaseName, patientName, leadNum=0):
+    '''
+        Like getBeatsFromAtr in wfdbReader.py, returns a list of tuples of the form ([beginSampleIndex], [endSampleIndex],
+        [typeOfBeat], [auxillary]), but for the beats found by the detector in the lead [leadNum] of the record of patient
+        [patientName] in database [databaseName].  This list can be passed to the constructor of the class [ECGReading].
+    '''
+
+    return annotations.toListOfBeats(*readAnnotationsFromDetector(databaseName, patientName, leadNum))
+
+def compareWithAnnotations(rPeaks, sampleIndices, types, samplingFrequency):
+    '''
+        Compares the detected R peaks [rPeaks] with the beat annotations among the annotations ([sampleIndices], [types]) (see
+        readAnnotations in wfdbReader.py), every one of which can be matched by at most one R peak at most [MATCHING_WINDOW]
+        seconds away.
+
+        Returns a dictionary containing the numbers of true positives ('tp'), false positives ('fp') and false negatives ('fn'),
+        the sensitivity ('sensitivity'), the positive predictive value ('ppv') and the mean and standard deviation of the time (in
+        seconds) from every matched beat annotation to its R peak ('meanError' and 'stdError').
+    '''
+
+    isBeat = np.in1d(np.array(types, dtype=object), BEAT_TYPES)
+    references = np.asarray(sampleIndices, dtype=np.int64)[isBeat]
+    rPeaks = np.asarray(rPeaks, dtype=np.int64)
+    matchingWindow = MATCHING_WINDOW * samplingFrequency
+
+    # The closest beat annotation to every R peak.
+    closestIndices = np.zeros(len(rPeaks), dtype=np.int64)
+    if (len(references) > 0):
+        rightIndices = np.clip(np.searchsorted(references, rPeaks), 0, len(references) - 1)
+        leftIndices = np.clip(rightIndices - 1, 0, len(references) - 1)
+        isLeftCloser = np.abs(references[leftIndices] - rPeaks) <= np.abs(references[rightIndices] - rPeaks)
+        closestIndices = np.where(isLeftCloser, leftIndices, rightIndices)
+        errors = rPeaks - references[closestIndices]
+        isMatch = (np.abs(errors) <= matchingWindow)
+    else:
+        errors = np.zeros(len(rPeaks), dtype=np.int64)
+        isMatch = np.zeros(len(rPeaks), dtype=bool)
+
+    # Only the closest of the R peaks that match the same beat annotation is a true positive.
+    order = np.lexsort((np.abs(errors), closestIndices))
+    isFirstMatch = np.zeros(len(rPeaks), dtype=bool)
+    matchedOrder = order[isMatch[order]]
+    isFirstMatch[matchedOrder[np.concatenate([[True], closestIndices[matchedOrder][1:] != closestIndices[matchedOrder][:-1]])
+                              if (len(matchedOrder) > 0) else np.zeros(0, dtype=bool)]] = True
+
+    tp = int(np.sum(isFirstMatch))
+    fp = len(rPeaks) - tp
+    fn = len(references) - tp
+    matchedErrors = errors[isFirstMatch] / float(samplingFrequency)
+
+    return {'tp': tp, 'fp': fp, 'fn': fn,
+            'sensitivity': float(tp) / (tp + fn) if (tp + fn > 0) else float('nan'),
+            'ppv': float(tp) / (tp + fp) if (tp + fp > 0) else float('nan'),
+            'meanError': float(np.mean(matchedErrors)) if (tp > 0) else float('nan'),
+            'stdError': float(np.std(matchedErrors)) if (tp > 0) else float('nan')}
+
+def getAccuracyReport(databaseName, patientNames=None, leadNum=0):
+    '''
+        Detects the R peaks of the lead [leadNum] of the records of the patients in [patientNames] (or of all of the records in
+        database [databaseName], if it is None) and compares them with their annotation files (see compareWithAnnotations).
+
+        Returns a tuple of the form ([results], [report]), where [results] is a dictionary containing the dictionary returned by
+        compareWithAnnotations for every record (with the number of seconds the detector took, 'seconds', and the duration of the
+        record, 'duration') and for all of the records together ('total'), and [report] is a string describing them in a table.
+    '''
+
+    if (patientNames is None):
+        patientNames = recordManifest.getPatientNames(databaseName)
+
+    results = {}
+    report = 'Record       Beats       TP      FP      FN   Se (%)  +P (%)  Error (ms)   Time (s)\n'
+    total = {'tp': 0, 'fp': 0, 'fn': 0, 'seconds': 0.0, 'duration': 0.0}
+
+    for patientName in patientNames:
+        (samplingFrequency, ecgReadings) = readECGReadings(databaseName, patientName, leadNum)
+
+        begTime = time.time()
+        rPeaks = detectRPeaks(ecgReadings, samplingFrequency)
+        seconds = time.time() - begTime
+
+        (sampleIndices, types, auxillaries) = wfdbReader.readAnnotations(databaseName, patientName)
+        result = compareWithAnnotations(rPeaks, sampleIndices, types, samplingFrequency)
+        result['seconds'] = seconds
+        result['duration'] = len(ecgReadings) / float(samplingFrequency)
+        results[patientName] = result
+
+        for name in ['tp', 'fp', 'fn', 'seconds', 'duration']:
+            total[name] = total[name] + result[name]
+
+        report = report + getReportLine(patientName, result)
+
+    total['sensitivity'] = float(total['tp']) / (total['tp'] + total['fn']) if (total['tp'] + total['fn'] > 0) else float('nan')
+    total['ppv'] = float(total['tp']) / (total['tp'] + total['fp']) if (total['tp'] + total['fp'] > 0) else float('nan')
+    total['meanError'] = float('nan')
+    total['stdError'] = float('nan')
+    results['total'] = total
+
+    report = report + getReportLine('Total', total)
+
+    return (results, report)
+
+def getReportLine(name, result):
+    '''
+        Returns the line of the table of getAccuracyReport that describes [result].
+    '''
+
+    return ('%-8s %9d %8d %7d %7d %8.2f %7.2f %11s %10.3f\n' %
+            (name, result['tp'] + result['fn'], result['tp'], result['fp'], result['fn'], 100 * result['sensitivity'],
+             100 * result['ppv'], '' if np.isnan(result['meanError']) else ('%.1f' % (1000 * result['meanError'])), result['seconds']))
+
+if __name__ == '__main__':
+    arguments = sys.argv[1:]
+
+    databaseName = arguments[0] if (len(arguments) > 0) else readData.DATABASE_DIR + 'mitdb'
+    leadNum = int(arguments[1]) if (len(arguments) > 1) else 0
+
+    (results, report) = getAccuracyReport(databaseName, leadNum=leadNum)
+    print (report)
@@ -0,0 +1,628 @@
+'''
+    This file contains the definition of the class 'RaggedBeats', each object of which represents a list of [Beats]
+    objects (each of which is a "window" of beats) without padding and without one Python object per beat.
+
+    The ECG readings of all of the beats of all of the windows are stored one after the other in a single numpy
+    array, [values] (and their time stamps in [timeStamps]).  Two arrays of offsets ("row splits") divide [values]
+    into beats and beats into windows:
+        * The (b + 1)-th beat consists of the readings values[beatRowSplits[b]:beatRowSplits[b + 1]].
+        * The (n + 1)-th window consists of the beats windowRowSplits[n] through windowRowSplits[n + 1] - 1.
+
+    Everything else about each beat (the codes of the type of the beat and the type of the cardiac rhythm it is a part
+    of, and the index of its first sample in the record) is stored in an array with one element per beat, and everything
+    else about each window (the database, patient, lead, cardiac event, ...) is stored in an array with one element per
+    window.
+
+    If the [Beats] objects are compact (see readData.USE_COMPACT_DTYPE), [values] contains the raw 16-bit ADC values of
+    the ECG readings, which are converted into millivolts using the gain and baseline of each window only when they are
+    used, and [timeStamps] is None: the time stamps are computed from the index of the first sample of each beat and the
+    sampling frequency of each window.
+
+    Slicing a [RaggedBeats] object with a range of windows (ragged[m:n]) returns a [RaggedBeats] object that shares all
+    of these arrays with the original object, i.e. the ECG readings are not copied.  The padded numpy arrays that the LSTM
+    needs (and boolean masks that mark which of their elements are not padding) are only created on demand by toPadded.
+'''
+
+import json
+import os
+
+import numpy as np
+
+import readData
+import wfdbReader
+from beats import Beats
+from beatTable import CODE_DTYPE, BeatTable, checkNumOfCodes
+
+# The names of the arrays with one element per beat.
+BEAT_ARRAY_NAMES = ['beatTypeCodes', 'auxCodes', 'beatBegSampleIndices']
+
+# The names of the arrays with one element per window.
+WINDOW_ARRAY_NAMES = ['databaseNames', 'patientNames', 'leadNames', 'cardiacEvents', 'eventTimeStamps', 'sampleOffsets',
+                      'timeBefores', 'timeWindows', 'gains', 'baselines', 'samplingFrequencies']
+
+# The names of the arrays saved by save to .npy files ([timeStamps] is only saved if it is not None).
+ARRAY_NAMES = ['values', 'timeStamps', 'beatRowSplits', 'windowRowSplits', 'beatTypeCodes', 'auxCodes', 'beatBegSampleIndices',
+               'eventTimeStamps', 'sampleOffsets', 'timeBefores', 'timeWindows', 'gains', 'baselines', 'samplingFrequencies']
+
+# The names of the lists of strings (with one element per window) saved by save to metadata.json.
+STRING_ARRAY_NAMES = ['databaseNames', 'patientNames', 'leadNames', 'cardiacEvents']
+
+def getRangeIndices(begIndices, lengths):
+    '''
+        Returns a numpy array containing the concatenation of the ranges begIndices[n], ..., begIndices[n] + lengths[n] - 1
+        for all n, computed without a Python loop.
+    '''
+
+    lengths = np.asarray(lengths, dtype=np.int64)
+    offsets = np.cumsum(lengths) - lengths
+
+    return np.arange(np.sum(lengths), dtype=np.int64) - np.repeat(offsets, lengths) + np.repeat(np.asarray(begIndices, dtype=np.int64), lengths)
+
+def getRowSplits(lengths):
+    '''
+        Returns the row splits (a numpy array whose first element is 0 and whose (n + 1)-th element is the sum of the first n
+        elements of [lengths]) that divide a flat array into consecutive rows with the lengths [lengths].
+    '''
+
+    return np.concatenate([np.zeros(1, dtype=np.int64), np.cumsum(np.asarray(lengths, dtype=np.int64))])
+
+def getCodes(names, sharedNames):
+    '''
+        Appends the strings in [names] that are not in [sharedNames] to [sharedNames] and returns a numpy array whose (n + 1)-th
+        element is the index of names[n] in [sharedNames], i.e. an array that translates codes representing the strings in [names]
+        into codes representing the strings in [sharedNames].
+    '''
+
+    indices = dict((name, index) for (index, name) in enumerate(sharedNames))
+    for name in names:
+        if (name not in indices):
+            indices[name] = len(sharedNames)
+            sharedNames.append(name)
+
+    checkNumOfCodes(sharedNames)
+    return np.array([indices[name] for name in names], dtype=CODE_DTYPE)
+
+class RaggedBeats(object):
+
+    def __init__(self, values, timeStamps, beatRowSplits, windowRowSplits, beatTypeCodes, auxCodes, beatTypeNames, auxNames,
+                 databaseNames, patientNames, leadNames, cardiacEvents, eventTimeStamps, sampleOffsets, timeBefores, timeWindows,
+                 beatBegSampleIndices, gains, baselines, samplingFrequencies):
+        '''
+            Creates an object of class [RaggedBeats]
+
+            See the documentation at the top of this file for a description of [values], [timeStamps], [beatRowSplits] and
+            [windowRowSplits].  [beatTypeCodes] and [auxCodes] are numpy arrays with one element per beat, whose elements are
+            indices into the lists of strings [beatTypeNames] and [auxNames], and [beatBegSampleIndices] contains the index of
+            the first sample of each beat within the ECG signal of the whole record.
+
+            [gains], [baselines] and [samplingFrequencies] are numpy arrays with one element per window, containing the gain
+            and baseline required to convert the raw ADC values of the window into millivolts and the sampling frequency of
+            its record (or NaN, if [values] contains ECG readings in millivolts).  All of the remaining arguments are numpy
+            arrays with one element per window, containing the fields of the same names of the corresponding [Beats] objects.
+        '''
+
+        # Fields containing the actual ECG data (i.e. the data) and the offsets dividing it into beats and windows.
+        self.values = values
+        self.timeStamps = timeStamps
+        self.beatRowSplits = beatRowSplits
+        self.windowRowSplits = windowRowSplits
+
+        # Fields containing information about each beat.
+        self.beatTypeCodes = beatTypeCodes
+        self.auxCodes = auxCodes
+        self.beatTypeNames = beatTypeNames
+        self.auxNames = auxNames
+        self.beatBegSampleIndices = beatBegSampleIndices
+
+        # Fields containing information about each window.
+        self.databaseNames = databaseNames
+        self.patientNames = patientNames
+        self.leadNames = leadNames
+        self.cardiacEvents = cardiacEvents
+        self.eventTimeStamps = eventTimeStamps
+        self.sampleOffsets = sampleOffsets
+        self.timeBefores = timeBefores
+        self.timeWindows = timeWindows
+
+        # Fields required to convert raw ADC values into millivolts and to compute time stamps.
+        self.gains = gains
+        self.baselines = baselines
+        self.samplingFrequencies = samplingFrequencies
+
+    @classmethod
+    def fromListOfBeatsObjs(cls, listOfBeatsObjs):
+        '''
+            Returns a [RaggedBeats] object representing the [Beats] objects in the list [listOfBeatsObjs].
+
+            The returned object is compact if and only if all of the [Beats] objects are compact; otherwise the raw ADC values of
+            the compact [Beats] objects are converted into millivolts.
+        '''
+
+        beatTables = []
+        for beatsObj in listOfBeatsObjs:
+            beatTable = beatsObj.getBeats()
+            if (not isinstance(beatTable, BeatTable)):
+                beatTable = BeatTable.fromBeats(beatTable)
+            beatTables.append(beatTable)
+
+        isCompact = (len(beatTables) > 0 and all(beatTable.isCompact() for beatTable in beatTables))
+
+        beatTypeNames = []
+        auxNames = []
+
+        listsOfValues = [np.zeros(0, dtype=np.float64)]
+        if (isCompact):
+            listsOfValues = [np.zeros(0, dtype=np.int16)]
+        listsOfTimeStamps = [np.zeros(0, dtype=np.float64)]
+        listsOfLengths = [np.zeros(0, dtype=np.int64)]
+        listsOfBeatTypeCodes = [np.zeros(0, dtype=CODE_DTYPE)]
+        listsOfAuxCodes = [np.zeros(0, dtype=CODE_DTYPE)]
+        listsOfBeatBegSampleIndices = [np.zeros(0, dtype=np.int64)]
+
+        for beatTable in beatTables:
+            (values, timeStamps, lengths) = beatTable.getFlatBeats()
+            if (not(isCompact)):
+                values = beatTable.toPhysicalUnits(values)
+                listsOfTimeStamps.append(timeStamps)
+            listsOfValues.append(values)
+            listsOfLengths.append(lengths)
+            listsOfBeatBegSampleIndices.append(beatTable.sampleOffset + np.asarray(beatTable.beginSampleIndices, dtype=np.int64))
+
+            # Translate the codes of the [BeatTable] object into codes shared by all of the windows.
+            listsOfBeatTypeCodes.append(getCodes(beatTable.beatTypeNames, beatTypeNames)[beatTable.beatTypeCodes])
+            listsOfAuxCodes.append(getCodes(beatTable.auxNames, auxNames)[beatTable.auxCodes])
+
+        timeStamps = None
+        if (not(isCompact)):
+            timeStamps = np.concatenate(listsOfTimeStamps)
+
+        def getOptionalField(beatTable, fieldName):
+            value = getattr(beatTable, fieldName)
+            if (value is None or not(isCompact)):
+                return np.nan
+            return value
+
+        return cls(np.concatenate(listsOfValues), timeStamps, getRowSplits(np.concatenate(listsOfLengths)),
+                   getRowSplits([len(beatTable) for beatTable in beatTables]), np.concatenate(listsOfBeatTypeCodes),
+                   np.concatenate(listsOfAuxCodes), beatTypeNames, auxNames,
+                   np.array([beatsObj.databaseName for beatsObj in listOfBeatsObjs], dtype=str),
+                   np.array([beatsObj.patientName for beatsObj in listOfBeatsObjs], dtype=str),
+                   np.array([beatsObj.leadName for beatsObj in listOfBeatsObjs], dtype=str),
+                   np.array([beatsObj.getCardiacEvent() for beatsObj in listOfBeatsObjs], dtype=str),
+                   np.array([beatsObj.cardiacEventBegTimeStamp for beatsObj in listOfBeatsObjs], dtype=np.float64),
+                   np.array([beatTable.sampleOffset for beatTable in beatTables], dtype=np.int64),
+                   np.array([beatsObj.timeBefore for beatsObj in listOfBeatsObjs], dtype=np.float64),
+                   np.array([beatsObj.timeWindow for beatsObj in listOfBeatsObjs], dtype=np.float64),
+                   np.concatenate(listsOfBeatBegSampleIndices),
+                   np.array([getOptionalField(beatTable, 'gain') for beatTable in beatTables], dtype=np.float64),
+                   np.array([getOptionalField(beatTable, 'baseline') for beatTable in beatTables], dtype=np.float64),
+                   np.array([getOptionalField(beatTable, 'samplingFrequency') for beatTable in beatTables], dtype=np.float64))
+
+    @classmethod
+    def concatenate(cls, listOfRaggedBeats):
+        '''
+            Returns a [RaggedBeats] object containing the windows of all of the [RaggedBeats] objects in the list [listOfRaggedBeats],
+            in order.  The returned object is compact if and only if all of the [RaggedBeats] objects are compact.
+        '''
+
+        # Empty [RaggedBeats] objects are skipped, so that they do not determine whether the returned object is compact.
+        listOfRaggedBeats = [raggedBeats.compact() for raggedBeats in listOfRaggedBeats if len(raggedBeats) > 0]
+        if (len(listOfRaggedBeats) == 0):
+            return cls.fromListOfBeatsObjs([])
+        if (not all(raggedBeats.isCompact() for raggedBeats in listOfRaggedBeats)):
+            listOfRaggedBeats = [raggedBeats.toPhysicalUnits() for raggedBeats in listOfRaggedBeats]
+
+        beatTypeNames = []
+        auxNames = []
+        listsOfBeatTypeCodes = [np.zeros(0, dtype=CODE_DTYPE)]
+        listsOfAuxCodes = [np.zeros(0, dtype=CODE_DTYPE)]
+        for raggedBeats in listOfRaggedBeats:
+            listsOfBeatTypeCodes.append(getCodes(raggedBeats.beatTypeNames, beatTypeNames)[raggedBeats.beatTypeCodes])
+            listsOfAuxCodes.append(getCodes(raggedBeats.auxNames, auxNames)[raggedBeats.auxCodes])
+
+        def concatenateArrays(name, dtype):
+            arrays = [getattr(raggedBeats, name) for raggedBeats in listOfRaggedBeats]
+            if (len(arrays) > 0 and arrays[0] is None):
+                return None
+            return np.concatenate([np.zeros(0, dtype=dtype)] + arrays)
+
+        valuesDtype = np.float64
+        if (len(listOfRaggedBeats) > 0 and listOfRaggedBeats[0].isCompact()):
+            valuesDtype = np.int16
+
+        return cls(concatenateArrays('values', valuesDtype), concatenateArrays('timeStamps', np.float64),
+                   getRowSplits(np.concatenate([np.zeros(0, dtype=np.int64)] + [raggedBeats.getLengthsOfBeats() for raggedBeats in listOfRaggedBeats])),
+                   getRowSplits(np.concatenate([np.zeros(0, dtype=np.int64)] + [raggedBeats.getNumsOfBeats() for raggedBeats in listOfRaggedBeats])),
+                   np.concatenate(listsOfBeatTypeCodes), np.concatenate(listsOfAuxCodes), beatTypeNames, auxNames,
+                   concatenateArrays('databaseNames', str), concatenateArrays('patientNames', str), concatenateArrays('leadNames', str),
+                   concatenateArrays('cardiacEvents', str), concatenateArrays('eventTimeStamps', np.float64),
+                   concatenateArrays('sampleOffsets', np.int64), concatenateArrays('timeBefores', np.float64),
+                   concatenateArrays('timeWindows', np.float64), concatenateArrays('beatBegSampleIndices', np.int64),
+                   concatenateArrays('gains', np.float64), concatenateArrays('baselines', np.float64),
+                   concatenateArrays('samplingFrequencies', np.float64))
+
+    def __len__(self):
+        return len(self.windowRowSplits) - 1
+
+    def isCompact(self):
+        '''
+            Returns True if and only if [values] contains raw ADC values rather than ECG readings in millivolts.
+        '''
+
+        return np.issubdtype(self.values.dtype, np.integer)
+
+    def copyWith(self, **fields):
+        '''
+            Returns a [RaggedBeats] object whose fields are the same as the fields of this [RaggedBeats] object, except for the
+            fields given as keyword arguments.
+        '''
+
+        raggedBeats = RaggedBeats.__new__(RaggedBeats)
+        raggedBeats.__dict__.update(self.__dict__)
+        raggedBeats.__dict__.update(fields)
+
+        return raggedBeats
+
+    def getNumsOfBeats(self):
+        '''
+            Returns a numpy array containing the number of beats in each window.
+        '''
+
+        return np.diff(self.windowRowSplits)
+
+    def getLengthsOfBeats(self):
+        '''
+            Returns a numpy array containing the number of ECG readings in each beat of each window, one window after the other.
+        '''
+
+        return np.diff(self.beatRowSplits[self.windowRowSplits[0]:self.windowRowSplits[-1] + 1])
+
+    def getNumsOfReadings(self):
+        '''
+            Returns a numpy array containing the total number of ECG readings in the beats of each window.
+        '''
+
+        return self.beatRowSplits[self.windowRowSplits[1:]] - self.beatRowSplits[self.windowRowSplits[:-1]]
+
+    def getMaxLengthsOfBeats(self):
+        '''
+            Returns a numpy array containing, for each window, the maximum number of ECG readings in any single beat in the window.
+        '''
+
+        maxLengthsOfBeats = np.zeros(len(self), dtype=np.int64)
+        numsOfBeats = self.getNumsOfBeats()
+        nonEmpty = (numsOfBeats > 0)
+        if (np.any(nonEmpty)):
+            maxLengthsOfBeats[nonEmpty] = np.maximum.reduceat(self.getLengthsOfBeats(), (self.windowRowSplits[:-1] - self.windowRowSplits[0])[nonEmpty])
+
+        return maxLengthsOfBeats
+
+    def getMaxNumOfBeats(self):
+        '''
+            Returns the maximum number of beats in any single window.
+        '''
+
+        if (len(self) == 0):
+            return 0
+
+        return int(np.max(self.getNumsOfBeats()))
+
+    def getMaxLengthOfBeat(self):
+        '''
+            Returns the maximum number of ECG readings in any single beat in any window.
+        '''
+
+        lengthsOfBeats = self.getLengthsOfBeats()
+        if (len(lengthsOfBeats) == 0):
+            return 0
+
+        return int(np.max(lengthsOfBeats))
+
+    def getCardiacEventIndices(self, windowIndices=None):
+        '''
+            Returns a numpy array containing, for each window (or for each window whose index is in [windowIndices], if it is not None),
+            the index in [CARDIAC_EVENTS] (defined in readData.py) of the cardiac event that the window precedes.
+        '''
+
+        cardiacEvents = self.cardiacEvents
+        if (windowIndices is not None):
+            cardiacEvents = cardiacEvents[np.asarray(windowIndices, dtype=np.int64)]
+
+        cardiacEventIndices = dict((str(cardiacEvent), index) for (index, cardiacEvent) in enumerate(readData.CARDIAC_EVENTS))
+        return np.array([cardiacEventIndices[str(cardiacEvent)] for cardiacEvent in cardiacEvents], dtype=np.int64)
+
+    def getOneHotCardiacEvents(self, dtype=np.float64, windowIndices=None):
+        '''
+            Returns a (number of windows) x (len(CARDIAC_EVENTS)) numpy array, whose (n + 1)-th row is the one-hot encoding of the cardiac
+            event that the (n + 1)-th window (or the window whose index is the (n + 1)-th element of [windowIndices], if it is not None)
+            precedes.  Unlike take, this does not read any ECG readings.
+        '''
+
+        cardiacEventIndices = self.getCardiacEventIndices(windowIndices)
+
+        Y = np.zeros((len(cardiacEventIndices), len(readData.CARDIAC_EVENTS)), dtype=dtype)
+        Y[np.arange(len(cardiacEventIndices)), cardiacEventIndices] = 1
+
+        return Y
+
+    def getValues(self, dtype=np.float64):
+        '''
+            Returns a numpy array containing the ECG readings (in millivolts) of all of the beats of all of the windows, one after
+            the other, whose elements are of type [dtype].  If this [RaggedBeats] object is compact, the raw ADC values are converted
+            into millivolts here.
+        '''
+
+        firstBeatIndex = self.windowRowSplits[0]
+        lastBeatIndex = self.windowRowSplits[-1]
+        values = self.values[self.beatRowSplits[firstBeatIndex]:self.beatRowSplits[lastBeatIndex]]
+
+        if (not(self.isCompact())):
+            return np.asarray(values, dtype=dtype)
+
+        numsOfReadings = self.getNumsOfReadings()
+        return wfdbReader.adcToPhysical(values, np.repeat(self.gains, numsOfReadings), np.repeat(self.baselines, numsOfReadings), dtype)
+
+    def getTimeStamps(self):
+        '''
+            Returns a numpy array containing the time stamps of all of the ECG readings of all of the beats of all of the windows, one
+            after the other.  If this [RaggedBeats] object is compact, the time stamps are computed from the index of the first sample
+            of each beat and the sampling frequency of each window.
+        '''
+
+        firstBeatIndex = self.windowRowSplits[0]
+        lastBeatIndex = self.windowRowSplits[-1]
+
+        if (self.timeStamps is not None):
+            return self.timeStamps[self.beatRowSplits[firstBeatIndex]:self.beatRowSplits[lastBeatIndex]]
+
+        lengthsOfBeats = self.getLengthsOfBeats()
+        sampleIndices = getRangeIndices(self.beatBegSampleIndices[firstBeatIndex:lastBeatIndex], lengthsOfBeats)
+        samplingFrequencies = np.repeat(np.repeat(self.samplingFrequencies, self.getNumsOfBeats()), lengthsOfBeats)
+
+        return sampleIndices / samplingFrequencies
+
+    def toPhysicalUnits(self):
+        '''
+            Returns a [RaggedBeats] object containing the same windows as this [RaggedBeats] object, whose ECG readings are in
+            millivolts (i.e. which is not compact).
+        '''
+
+        if (not(self.isCompact())):
+            return self
+
+        raggedBeats = self.compact()
+        numOfWindows = len(raggedBeats)
+
+        return raggedBeats.copyWith(values=raggedBeats.getValues(), timeStamps=raggedBeats.getTimeStamps(),
+                                    gains=np.nan * np.ones(numOfWindows), baselines=np.nan * np.ones(numOfWindows),
+                                    samplingFrequencies=np.nan * np.ones(numOfWindows))
+
+    def toPadded(self, maxNumOfBeats=None, maxLengthOfBeat=None, dtype=np.float64):
+        '''
+            Returns a tuple of the form ([X], [beatMask], [readingMask]), where [X] is a (len(self)) x [maxNumOfBeats] x [maxLengthOfBeat]
+            numpy array such that [X][n, b] contains the ECG readings of the (b + 1)-th beat of the (n + 1)-th window padded with zeros
+            at the beginning (and is all zeros if the (n + 1)-th window has fewer than (b + 1) beats), [beatMask] is a boolean
+            (len(self)) x [maxNumOfBeats] numpy array that is True for every beat that is not padding, and [readingMask] is a boolean
+            numpy array of the same shape as [X] that is True for every ECG reading that is not padding.
+
+            If [maxNumOfBeats] or [maxLengthOfBeat] is None, the maximum number of beats in any window or the maximum number of ECG readings
+            in any beat is used.  The elements of [X] are of type [dtype]; raw ADC values are only converted into it here.
+        '''
+
+        if (maxNumOfBeats is None):
+            maxNumOfBeats = self.getMaxNumOfBeats()
+        if (maxLengthOfBeat is None):
+            maxLengthOfBeat = self.getMaxLengthOfBeat()
+
+        numOfWindows = len(self)
+        numsOfBeats = self.getNumsOfBeats()
+        lengthsOfBeats = self.getLengthsOfBeats()
+        if (numOfWindows > 0 and np.max(numsOfBeats) > maxNumOfBeats):
+            raise ValueError('A window contains more than ' + str(maxNumOfBeats) + ' beats.')
+        if (len(lengthsOfBeats) > 0 and np.max(lengthsOfBeats) > maxLengthOfBeat):
+            raise ValueError('A beat contains more than ' + str(maxLengthOfBeat) + ' ECG readings.')
+
+        values = self.getValues(dtype)
+
+        # Determine the window, the beat and the position within the (padded) beat of every ECG reading.
+        windowIndices = np.repeat(np.arange(numOfWindows), numsOfBeats)
+        beatIndices = getRangeIndices(np.zeros(numOfWindows, dtype=np.int64), numsOfBeats)
+        readingIndices = getRangeIndices(maxLengthOfBeat - lengthsOfBeats, lengthsOfBeats)
+
+        X = np.zeros((numOfWindows, maxNumOfBeats, maxLengthOfBeat), dtype=dtype)
+        X[np.repeat(windowIndices, lengthsOfBeats), np.repeat(beatIndices, lengthsOfBeats), readingIndices] = values
+
+        beatMask = np.zeros((numOfWindows, maxNumOfBeats), dtype=bool)
+        beatMask[windowIndices, beatIndices] = True
+
+        readingMask = np.zeros((numOfWindows, maxNumOfBeats, maxLengthOfBeat), dtype=bool)
+        readingMask[np.repeat(windowIndices, lengthsOfBeats), np.repeat(beatIndices, lengthsOfBeats), readingIndices] = True
+
+        return (X, beatMask, readingMask)
+
+    def take(self, windowIndices):
+        '''
+            Returns a [RaggedBeats] object containing the windows whose indices are in [windowIndices], in that order.  Unlike slicing,
+            this copies the ECG readings of these windows.
+        '''
+
+        windowIndices = np.asarray(windowIndices, dtype=np.int64)
+
+        numsOfBeats = self.getNumsOfBeats()[windowIndices]
+        beatIndices = getRangeIndices(self.windowRowSplits[windowIndices], numsOfBeats)
+        lengthsOfBeats = self.beatRowSplits[beatIndices + 1] - self.beatRowSplits[beatIndices]
+        valueIndices = getRangeIndices(self.beatRowSplits[beatIndices], lengthsOfBeats)
+
+        fields = {'values': self.values[valueIndices], 'beatRowSplits': getRowSplits(lengthsOfBeats), 'windowRowSplits': getRowSplits(numsOfBeats)}
+        if (self.timeStamps is not None):
+            fields['timeStamps'] = self.timeStamps[valueIndices]
+        for arrayName in BEAT_ARRAY_NAMES:
+            fields[arrayName] = getattr(self, arrayName)[beatIndices]
+        for arrayName in WINDOW_ARRAY_NAMES:
+            fields[arrayName] = getattr(self, arrayName)[windowIndices]
+
+        return self.copyWith(**fields)
+
+    def compact(self):
+        '''
+            Returns a [RaggedBeats] object containing the same windows as this [RaggedBeats] object whose arrays only contain the
+            elements belonging to these windows (and whose offsets therefore start at 0).  The ECG readings are not copied.
+        '''
+
+        firstBeatIndex = self.windowRowSplits[0]
+        lastBeatIndex = self.windowRowSplits[-1]
+        firstValueIndex = self.beatRowSplits[firstBeatIndex]
+        lastValueIndex = self.beatRowSplits[lastBeatIndex]
+
+        if (firstBeatIndex == 0 and lastBeatIndex == len(self.beatRowSplits) - 1 and firstValueIndex == 0 and lastValueIndex == len(self.values)):
+            return self
+
+        fields = {'values': self.values[firstValueIndex:lastValueIndex],
+                  'beatRowSplits': self.beatRowSplits[firstBeatIndex:lastBeatIndex + 1] - firstValueIndex,
+                  'windowRowSplits': self.windowRowSplits - firstBeatIndex}
+        if (self.timeStamps is not None):
+            fields['timeStamps'] = self.timeStamps[firstValueIndex:lastValueIndex]
+        for arrayName in BEAT_ARRAY_NAMES:
+            fields[arrayName] = getattr(self, arrayName)[firstBeatIndex:lastBeatIndex]
+
+        return self.copyWith(**fields)
+
+    def getSlice(self, begIndex, endIndex):
+        '''
+            Returns a [RaggedBeats] object containing the (begIndex + 1)-th through endIndex-th windows, which shares all of its arrays
+            with this [RaggedBeats] object.
+        '''
+
+        endIndex = max(begIndex, endIndex)
+
+        fields = {'windowRowSplits': self.windowRowSplits[begIndex:endIndex + 1]}
+        for arrayName in WINDOW_ARRAY_NAMES:
+            fields[arrayName] = getattr(self, arrayName)[begIndex:endIndex]
+
+        return self.copyWith(**fields)
+
+    def toListOfBeatsObjs(self):
+        '''
+            Returns a list of [Beats] objects representing the windows of this [RaggedBeats] object.  The beats of every [Beats] object
+            are a [BeatTable] object whose ECG readings are views into the arrays of this [RaggedBeats] object.
+        '''
+
+        raggedBeats = self.compact()
+
+        # All of the beats of all of the windows are stored in a single [BeatTable] object.
+        beatRowSplits = np.asarray(raggedBeats.beatRowSplits)
+        beatTable = BeatTable(raggedBeats.getTimeStamps(), raggedBeats.values, beatRowSplits[:-1], beatRowSplits[1:] - 1,
+                              raggedBeats.beatTypeCodes, raggedBeats.auxCodes, raggedBeats.beatTypeNames, raggedBeats.auxNames)
+
+        # An empty beat (e.g. one between two annotations of the same sample) begins one sample after it ends, so the boundaries
+        # of an empty beat at either end of a window lie in a neighbouring window.  Its time stamps are taken from the nearest
+        # sample of its own window instead.
+        windowRowSplits = np.asarray(raggedBeats.windowRowSplits)
+        numsOfBeats = np.diff(windowRowSplits)
+        firstSampleIndices = np.repeat(beatRowSplits[windowRowSplits[:-1]], numsOfBeats)
+        lastSampleIndices = np.maximum(np.repeat(beatRowSplits[windowRowSplits[1:]] - 1, numsOfBeats), firstSampleIndices)
+        beatTable.beginTimeStamps = beatTable.getTimeStampsOfSamples(np.clip(beatRowSplits[:-1], firstSampleIndices, lastSampleIndices))
+        beatTable.endTimeStamps = beatTable.getTimeStampsOfSamples(np.clip(beatRowSplits[1:] - 1, firstSampleIndices, lastSampleIndices))
+
+        windowRowSplits = windowRowSplits.tolist()
+        sampleOffsets = np.asarray(raggedBeats.sampleOffsets).tolist()
+
+        listOfBeatsObjs = []
+        for index in range(len(raggedBeats)):
+            beats = beatTable.getSlice(windowRowSplits[index], windowRowSplits[index + 1])
+            beats.sampleOffset = sampleOffsets[index]
+            if (raggedBeats.isCompact()):
+                beats.gain = float(raggedBeats.gains[index])
+                beats.baseline = float(raggedBeats.baselines[index])
+                beats.samplingFrequency = float(raggedBeats.samplingFrequencies[index])
+
+            listOfBeatsObjs.append(Beats(str(raggedBeats.databaseNames[index]), str(raggedBeats.patientNames[index]),
+                                         str(raggedBeats.leadNames[index]), float(raggedBeats.timeBefores[index]),
+                                         float(raggedBeats.timeWindows[index]), str(raggedBeats.cardiacEvents[index]),
+                                         raggedBeats.eventTimeStamps[index], beats))
+
+        return listOfBeatsObjs
+
+    def save(self, dirName):
+        '''
+            Saves this [RaggedBeats] object to the (existing) directory [dirName]: every array is saved to its own .npy file (so that
+            it can be memory-mapped by load) and everything else is saved to the file metadata.json.
+        '''
+
+        raggedBeats = self.compact()
+
+        for arrayName in ARRAY_NAMES:
+            if (getattr(raggedBeats, arrayName) is not None):
+                np.save(os.path.join(dirName, arrayName + '.npy'), getattr(raggedBeats, arrayName))
+
+        metadata = {'beatTypeNames': [str(name) for name in raggedBeats.beatTypeNames],
+                    'auxNames': [str(name) for name in raggedBeats.auxNames]}
+        for stringArrayName in STRING_ARRAY_NAMES:
+            metadata[stringArrayName] = [str(string) for string in getattr(raggedBeats, stringArrayName)]
+
+        f = open(os.path.join(dirName, 'metadata.json'), 'w')
+        json.dump(metadata, f)
+        f.close()
+
+    @classmethod
+    def load(cls, dirName, mmap=True):
+        '''
+            Loads and returns the [RaggedBeats] object saved to the directory [dirName] by save.  The arrays are memory-mapped
+            if [mmap] = True.
+        '''
+
+        mmapMode = None
+        if (mmap):
+            mmapMode = 'r'
+
+        arrays = {}
+        for arrayName in ARRAY_NAMES:
+            fullFileName = os.path.join(dirName, arrayName + '.npy')
+            arrays[arrayName] = None
+            if (os.path.isfile(fullFileName)):
+                arrays[arrayName] = np.load(fullFileName, mmap_mode=mmapMode)
+
+        f = open(os.path.join(dirName, 'metadata.json'), 'r')
+        metadata = json.load(f)
+        f.close()
+
+        for stringArrayName in STRING_ARRAY_NAMES:
+            arrays[stringArrayName] = np.array([str(string) for string in metadata[stringArrayName]], dtype=str)
+
+        # The offsets are small and are needed in full to divide the ECG readings into beats and windows, so they are never memory-mapped.
+        arrays['beatRowSplits'] = np.array(arrays['beatRowSplits'])
+        arrays['windowRowSplits'] = np.array(arrays['windowRowSplits'])
+
+        return cls(arrays['values'], arrays['timeStamps'], arrays['beatRowSplits'], arrays['windowRowSplits'], arrays['beatTypeCodes'],
+                   arrays['auxCodes'], [str(name) for name in metadata['beatTypeNames']], [str(name) for name in metadata['auxNames']],
+                   arrays['databaseNames'], arrays['patientNames'], arrays['leadNames'], arrays['cardiacEvents'], arrays['eventTimeStamps'],
+                   arrays['sampleOffsets'], arrays['timeBefores'], arrays['timeWindows'], arrays['beatBegSampleIndices'], arrays['gains'],
+                   arrays['baselines'], arrays['samplingFrequencies'])
+
+    def __getitem__(self, index):
+        if (isinstance(index, slice)):
+            (begIndex, endIndex, step) = index.indices(len(self))
+            if (step != 1):
+                return self.take(np.arange(begIndex, endIndex, step))
+            return self.getSlice(begIndex, endIndex)
+
+        if (isinstance(index, (list, np.ndarray))):
+            return self.take(index)
+
+        if (index < 0):
+            index = index + len(self)
+        if (index < 0 or index >= len(self)):
+            raise IndexError('RaggedBeats index out of range')
+
+        return self.getSlice(index, index + 1).toListOfBeatsObjs()[0]
+
+    def __str__(self):
+        # Heading
+        str1 = ' ****** RAGGED BEATS OBJECT ********* \n \n'
+
+        str1 = str1 + 'Number of Windows: ' + str(len(self)) + '\n'
+        str1 = str1 + 'Number of Beats: ' + str(int(np.sum(self.getNumsOfBeats()))) + '\n'
+        str1 = str1 + 'Number of ECG Readings: ' + str(int(np.sum(self.getLengthsOfBeats()))) + '\n'
+        str1 = str1 + 'Compact: ' + str(self.isCompact()) + '\n\n'
+
+        return str1
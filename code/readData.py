@@ -20,20 +20,54 @@
 '''
 
 import os
-import ntpath
+import multiprocessing
+import multiprocessing.pool
+import subprocess
+import tempfile
 import matplotlib.pyplot as plt
 import numpy as np
 import scipy
 
 
 from beat import Beat
+from beats import Beats
+from beatTable import BeatTable
 from ecgReading import ECGReading
+import annotations
+import raggedBeats
+import recordCache
+import recordManifest
+import streamReader
+import wfdbReader
 
 # CONSTANTS
 DATABASE_DIR = "../../ecg-data2/"
 DATA_EXTENSION = "-dat"
 ANNOTATION_EXTENSION = "-ann"
 
+# The (approximate) number of bytes of a data text file that are parsed at once by getECGSignalFromDat.
+TEXT_CHUNK_SIZE = 2 ** 22
+
+# If True, the ECG data and annotations are read directly from the .atr, .dat and .hea files (see wfdbReader.py).
+# Otherwise, they are read from the text files produced by createTextFiles.
+USE_NATIVE_READER = True
+
+# If True (and [USE_NATIVE_READER] is True), the ECG readings are kept as the raw 16-bit ADC values stored in the .dat
+# files (see getCompactECGSignalFromBinary in wfdbReader.py) and are only converted into millivolts when they are used.
+USE_COMPACT_DTYPE = False
+
+# If True (and [USE_NATIVE_READER] is True), the annotations of every record are read first and only the samples of the
+# windows of beats that precede the cardiac events are read from the .dat files (see getRaggedBeatsForRecordFromRanges).
+USE_PARTIAL_READS = False
+
+# If True (and [USE_NATIVE_READER] is True), the ECG signal of every record is read in chunks of [STREAM_CHUNK_SIZE] samples
+# (see streamReader.py), so that the memory required does not depend on the length of the record.
+USE_STREAMING_READER = False
+STREAM_CHUNK_SIZE = 2 ** 20
+
+# The number of processes that read the records in parallel (see getRaggedBeatsForConfigurations).
+NUM_OF_WORKERS = multiprocessing.cpu_count()
+
 # A dictionary containing descriptions of the abbrevations of many cardiac events.
 TYPES_OF_ALL_EVENTS_DICT = {'(AB': 'Atrial bigeminy',
                             '(AFIB': 'Atrial fibrillation',
@@ -82,37 +116,15 @@ def getPatientNames(databaseName):
 	the database whose full relative path name is [databaseName].
 
 	Note that if "100" is in the vector returned by this method, all of the following files must be in the directory 
-    [databaseName] - 100.cat, 100.dat, 100.hea
+    [databaseName] - 100.atr, 100.dat, 100.hea
 
+	The records are found in the manifest of the database (see recordManifest.py), so the directory is only scanned again
+	if a file has been added, removed or renamed since it was last scanned.
 	'''
-    
-	fullFileNames = [os.path.join(databaseName, entry) for entry in os.listdir(databaseName) if os.path.isfile(os.path.join(databaseName, entry))]
-
-	patientNames = []
-	patientNamesDict = {}
-	for fullFileName in fullFileNames:
-		# Extract out the file name from the entire path name.
-		head, tail = ntpath.split(fullFileName)
-    		fileName = tail or ntpath.basename(head)
-		
-		# Split into the name and the extension.
-		patientName, extension = fileName.split(".")
 
-		if (patientName in patientNamesDict):
-			patientNamesDict[patientName].append(extension)
+	return recordManifest.getPatientNames(databaseName)
 
-			# Check if all of the desired extensions are associated with the current
-			# file name being considered.
-			currentExtensions = patientNamesDict[patientName]
-			if ("atr" in currentExtensions and "dat" in currentExtensions and "hea" in currentExtensions and len(currentExtensions) == 3):
-				patientNames.append(patientName)
-		else:
-			patientNamesDict[patientName] = [extension]
-
-	patientNames.sort()
-	return patientNames
-
-def createTextFiles():
+def createTextFiles(numOfWorkers=None):
 	'''
 	Loops through all of the patients whose ECG readings have been downloaded (manually) into a database directory within
     the directory [DATABASE_DIR] and for each such patient, runs the rdsamp and rdann WFDB commands to produce a text file
@@ -147,26 +159,91 @@ def createTextFiles():
     
     These two text files are saved to the same directory as the source files - [patientName].cat, [patientName].dea, [patientName].hea -
     and are saved to the directory [databaseName] within [DATABASE_DIR].
-    
+
+	The commands are run (without a shell) by at most [numOfWorkers] processes at once ([NUM_OF_WORKERS] if [numOfWorkers]
+	is None).  A text file is only produced if it does not exist yet or if it is older than one of the files it is produced
+	from, so that only the text files of new (or modified) records are produced.  Every text file is first written to a
+	temporary file, which is only renamed once the command has succeeded, so that an interrupted or failed command never
+	leaves behind an incomplete text file.  If any command fails, an exception is raised once all of the commands have
+	been run.
 	'''
-	
-	databaseNames = getDatabases()
-	for databaseName in databaseNames:
-		patientNames = getPatientNames(databaseName)
-		
-		for patientName in patientNames:
-			# Change directories into the database.
-        		cdBashCommand = "cd \"" + databaseName + "\""
 
-        		# Run the bash command to produce a text file containing the ECG signal.
-        		rdSampBashCommand = "rdsamp -r \"" + patientName + "\" -p -v >\"" + patientName + DATA_EXTENSION + ".txt\""
-			print (cdBashCommand + "; " + rdSampBashCommand)
-			os.system(cdBashCommand + "; " +  rdSampBashCommand)
+	if (numOfWorkers is None):
+		numOfWorkers = NUM_OF_WORKERS
+
+	conversions = []
+	for databaseName in sorted(getDatabases()):
+		for patientName in getPatientNames(databaseName):
+			# The text file containing the ECG signal.
+			conversions.append((databaseName, ['rdsamp', '-r', patientName, '-p', '-v'], patientName + DATA_EXTENSION + ".txt",
+			                    [patientName + ".dat", patientName + ".hea"]))
+
+			# The text file containing the annotations for the ECG signal.
+			conversions.append((databaseName, ['rdann', '-r', patientName, '-a', 'atr', '-v'], patientName + ANNOTATION_EXTENSION + ".txt",
+			                    [patientName + ".atr", patientName + ".hea"]))
+
+	conversions = [conversion for conversion in conversions if not(isTextFileUpToDate(conversion[0], conversion[2], conversion[3]))]
+	print ('Producing ' + str(len(conversions)) + ' text files...')
+
+	pool = multiprocessing.pool.ThreadPool(max(1, min(numOfWorkers, len(conversions))))
+	errors = pool.map(runConversion, conversions)
+	pool.close()
+	pool.join()
+
+	errors = [error for error in errors if error is not None]
+	if (len(errors) > 0):
+		raise RuntimeError('Could not produce ' + str(len(errors)) + ' text files:\n' + '\n'.join(errors))
+
+def isTextFileUpToDate(databaseName, textFileName, sourceFileNames):
+	'''
+	Returns True if and only if the text file [textFileName] in the database [databaseName] exists and is newer than all of
+	the files [sourceFileNames] in the database that it is produced from.
+	'''
+
+	fullTextFileName = os.path.join(databaseName, textFileName)
+	if (not os.path.isfile(fullTextFileName)):
+		return False
+
+	modificationTime = os.path.getmtime(fullTextFileName)
+	for sourceFileName in sourceFileNames:
+		fullSourceFileName = os.path.join(databaseName, sourceFileName)
+		if (os.path.isfile(fullSourceFileName) and os.path.getmtime(fullSourceFileName) >= modificationTime):
+			return False
+
+	return True
+
+def runConversion(conversion):
+	'''
+	Runs the command [command] (a list of arguments) in the directory [databaseName], where [conversion] is a tuple of the
+	form ([databaseName], [command], [textFileName], [sourceFileNames]), and saves its output to the text file [textFileName]
+	in that directory.
+
+	Returns None if the command succeeded, or a string describing the error otherwise.  The text file is only replaced once
+	the command has succeeded.
+	'''
 
-			# Run the bash command to produce a text file containing the annotations for the ECG signal.
-			rdAnnBashCommand = "rdann -r \"" + patientName + "\" -a atr -v >\"" + patientName + ANNOTATION_EXTENSION + ".txt\""
-			print (cdBashCommand + "; " + rdAnnBashCommand)
-			os.system(cdBashCommand + "; " + rdAnnBashCommand)
+	(databaseName, command, textFileName, sourceFileNames) = conversion
+	print ('cd "' + databaseName + '"; ' + ' '.join(command) + ' >"' + textFileName + '"')
+
+	# The temporary file is in the same directory as the text file, so that it can be renamed atomically.
+	(fileDescriptor, tempFileName) = tempfile.mkstemp(prefix=os.path.splitext(textFileName)[0] + '-', suffix='.tmp', dir=databaseName)
+	try:
+		f = os.fdopen(fileDescriptor, 'w')
+		try:
+			returnCode = subprocess.call(command, cwd=databaseName, stdout=f)
+		finally:
+			f.close()
+
+		if (returnCode != 0):
+			return os.path.join(databaseName, textFileName) + ': ' + command[0] + ' exited with status ' + str(returnCode)
+
+		os.rename(tempFileName, os.path.join(databaseName, textFileName))
+		return None
+	except OSError as error:
+		return os.path.join(databaseName, textFileName) + ': ' + str(error)
+	finally:
+		if (os.path.isfile(tempFileName)):
+			os.remove(tempFileName)
 
 def getBeatsFromAnn(databaseName, patientName):
 	'''
@@ -226,14 +303,78 @@ def getBeatsFromAnn(databaseName, patientName):
 	return listOfBeats
 
 
-def getECGSignalFromDat(databaseName, patientName):
+def getAnnotationsFromAnn(databaseName, patientName):
+	'''
+	Reads the annotation text file associated with the ECG signal for patient [patientName] in database [databaseName]
+	and returns a tuple of the form ([annotations], [beatTypeNames], [auxNames]), where [annotations] is an annotation array
+	(see annotations.py) describing the same beats as the list of tuples returned by getBeatsFromAnn.
+	'''
+
+	fullFileName = os.path.join(databaseName, patientName) + ANNOTATION_EXTENSION + ".txt"
+
+	f = open(fullFileName, 'r')
+
+	# The first line in the file is a header and should be ignored.
+	f.readline()
+
+	sampleIndices = []
+	types = []
+	auxillaries = []
+	for line in f:
+		dataArr = line.split()
+
+		sampleIndices.append(int(dataArr[1]))
+		types.append(dataArr[2])
+
+		# Only an element in the "aux" column without whitespace is noticed (see getBeatsFromAnn).
+		if (len(dataArr) == 7):
+			auxillaries.append(dataArr[6])
+		else:
+			auxillaries.append(annotations.NO_AUX)
+
+	f.close()
+
+	return annotations.fromAnnotations(sampleIndices, types, auxillaries)
+
+def parseDataLines(lines, numOfColumns):
+	'''
+	Parses [lines], a list of lines of a data text file produced by "rdsamp -p" (not including the two header lines),
+	and returns a (len(lines)) x [numOfColumns] numpy array containing the numbers in these lines.
+
+	All of the lines are parsed at once by numpy.  If this fails, which happens if a line is blank or contains an invalid
+	sample (printed by rdsamp as "-"), the lines are parsed one at a time and invalid samples are represented by NaN.  Every
+	line is a row of the returned array, so that the row of every sample is its sample index: a line that does not contain
+	[numOfColumns] numbers (e.g. a blank or truncated line) is represented by a row of NaN.
+	'''
+
+	values = np.fromstring(''.join(lines), dtype=np.float64, sep=' ')
+	if (values.size == len(lines) * numOfColumns):
+		return values.reshape((len(lines), numOfColumns))
+
+	rows = np.full((len(lines), numOfColumns), np.nan, dtype=np.float64)
+	for (lineIndex, line) in enumerate(lines):
+		dataArr = line.split()
+		if (len(dataArr) == numOfColumns):
+			try:
+				rows[lineIndex] = [np.nan if dataArrElement == '-' else float(dataArrElement) for dataArrElement in dataArr]
+			except ValueError:
+				pass
+
+	return rows
+
+def getECGSignalFromDat(databaseName, patientName, leadNums=None):
     
 	''' 
 	Reads the data text file associated with the ECG signal for patient [patientName] in database [databaseName]
-	and produces (and returns) a [numOfSamples] x (1 + [numOfDataSources]) two-dimensional array, where [numOfSamples] 
+	and produces (and returns) a [numOfSamples] x (1 + [numOfDataSources]) two-dimensional numpy array, where [numOfSamples] 
     is the number of samples in the ECG signal and [numOfDataSources] is the number of data sources.  For instance, if 
     the ECG signal for a particular patient in a particular database was collected from 3 leads, then [numOfDataSources] = 3.
 
+	If [leadNums] is not None, only the time stamps and the readings of the leads whose (zero-indexed) numbers are in
+	[leadNums] are returned, in which case the returned array is [numOfSamples] x (1 + len([leadNums])).  The numbers of the
+	leads are their indices in the vector returned by getLeadNames.
+
+	The file is parsed [TEXT_CHUNK_SIZE] bytes at a time so that the text of the file is never held in memory all at once.
 	'''
 	
 	# Construct the full file name (path and all) of the text file that contains the annotations for [patientName]
@@ -241,25 +382,32 @@ def getECGSignalFromDat(databaseName, patientName):
 	fullFileName = os.path.join(databaseName, patientName) + DATA_EXTENSION + ".txt"
 
 	f = open(fullFileName, 'r')
-	
-	ecgData = []
 
-	# Loop through the lines in the text file.  The first two lines in the file are a header and should be ignored.
-	lineIndex = 0
-	for line in f:
-		# If this line is not the first two lines in the file, then this line contains contains data.
-		if (lineIndex != 0 and lineIndex != 1):
-			dataArr = line.split()
+	# The first two lines in the file are a header and should be ignored.  The first line contains the names of the
+	# leads, preceded by the two words heading the "Elapsed Time" column.
+	numOfColumns = 1 + len(f.readline().split()) - 2
+	f.readline()
 
-			# Convert the ecg signal from a string into integers.
-			dataArr = [float(dataArrElement) for dataArrElement in dataArr]
-			ecgData.append(dataArr)
-	
-		lineIndex = lineIndex + 1
+	columns = range(numOfColumns)
+	if (leadNums is not None):
+		columns = [0] + [leadNum + 1 for leadNum in leadNums]
+
+	chunks = []
+	lines = f.readlines(TEXT_CHUNK_SIZE)
+	while (len(lines) > 0):
+		chunk = parseDataLines(lines, numOfColumns)
+		if (leadNums is not None):
+			chunk = chunk[:, columns]
+		chunks.append(chunk)
+
+		lines = f.readlines(TEXT_CHUNK_SIZE)
     
 	f.close()
 
-	return ecgData
+	if (len(chunks) == 0):
+		return np.empty((0, len(columns)), dtype=np.float64)
+
+	return np.ascontiguousarray(np.concatenate(chunks))
 
 def getLeadNames(databaseName, patientName):
 	'''
@@ -293,23 +441,19 @@ def getBeatFromDat(listOfBeats, ecgData, beatNum, leadNum):
 	Returns an object of the [Beat] class that contains the data associated with the (beatNum + 1)-th beat and
 	(leadNum + 1)-th lead of the ECG signal associated with the patient whose list of beats is specified by the list of
 	tuples [listOfBeats] (see the documentation for the above method getBeatsFromAnn for a full description of [listOfBeats])
-	and whose ECG signal is specified by the array [ecgData] (see the documentation for the above method getECGSignalFromDat for
+	and whose ECG signal is specified by the numpy array [ecgData] (see the documentation for the above method getECGSignalFromDat for
 	a full description of [ecgData].
+
+	The time stamps and ECG readings of the returned [Beat] object are views into [ecgData], not copies.
     
 	'''
     
 	(beginSampleIndex, endSampleIndex, typeOfBeat, auxillary) = listOfBeats[beatNum]
-    
-	timeStamps = []
-	ecgReadings = []
-    
-	for index in range(beginSampleIndex, endSampleIndex + 1):
-		sample = ecgData[index]
-        
-        	timeStamps.append(sample[0])
-        	ecgReadings.append(sample[leadNum + 1])
 
-    	return Beat(timeStamps, ecgReadings, typeOfBeat, auxillary)
+	timeStamps = ecgData[beginSampleIndex:endSampleIndex + 1, 0]
+	ecgReadings = ecgData[beginSampleIndex:endSampleIndex + 1, leadNum + 1]
+
+	return Beat(timeStamps, ecgReadings, typeOfBeat, auxillary, beginSampleIndex, endSampleIndex)
 
 def getData(amountOfTimeBeforeBeg, timeWindow, doCreateTextFiles):
 	'''
@@ -322,55 +466,306 @@ def getData(amountOfTimeBeforeBeg, timeWindow, doCreateTextFiles):
 
 	Creates the text file representations of the ECG data and annotations if and only if [doCreateTextFiles]
 	= True.  Otherwise, the text file representations are not created and it is assumed that they have
-	already been created.
+	already been created.  If [USE_NATIVE_READER] = True, the text file representations are never needed
+	(and hence never created) since the ECG data and annotations are read directly from the .atr, .dat and
+	.hea files.
+	'''
+
+	configuration = (amountOfTimeBeforeBeg, timeWindow)
+	return getDataForConfigurations([configuration], doCreateTextFiles)[configuration]
+
+def getDataForConfigurations(configurations, doCreateTextFiles, numOfWorkers=None):
+	'''
+	Determines and returns, for every tuple of the form ([amountOfTimeBeforeBeg], [timeWindow]) in the list [configurations],
+	the list of [Beats] objects that getData(amountOfTimeBeforeBeg, timeWindow, doCreateTextFiles) returns.
+
+	The lists are returned in a dictionary whose keys are the tuples in [configurations].  Every record is only read (and
+	divided into beats) once, no matter how many configurations there are, since only the windows depend on the configuration.
+
+	See getRaggedBeatsForConfigurations for a description of [numOfWorkers].
 	'''
-	if (doCreateTextFiles):
+
+	raggedBeatsForConfigurations = getRaggedBeatsForConfigurations(configurations, doCreateTextFiles, numOfWorkers)
+
+	listsOfBeatsObjs = {}
+	for configuration in configurations:
+		listsOfBeatsObjs[configuration] = raggedBeatsForConfigurations[configuration].toListOfBeatsObjs()
+
+	return listsOfBeatsObjs
+
+def getRaggedBeatsForConfigurations(configurations, doCreateTextFiles, numOfWorkers=None):
+	'''
+	Like getDataForConfigurations, but returns, for every tuple in the list [configurations], a [RaggedBeats] object (see
+	raggedBeats.py) representing the list of [Beats] objects rather than the list itself.
+
+	The records of all of the patients in all of the databases are read by [numOfWorkers] processes in parallel (by
+	[NUM_OF_WORKERS] processes if [numOfWorkers] is None, and without any additional processes if it is 1).  Every process
+	returns the windows of a record in flat numpy arrays rather than as [Beats] objects, and the windows are always returned
+	in the same order (that of the databases and then of the patients), no matter how many processes there are.
+
+	The processes take the records from a single pool as soon as they are free, and exit when every record has been read,
+	so the records they keep in their caches (see recordCache.py) are freed at the end of every call.
+	'''
+	if (doCreateTextFiles and not USE_NATIVE_READER):
 		createTextFiles()
 
-	# Contains a list of [Beats] objects.
-	listOfBeatsObjs = []
+	if (numOfWorkers is None):
+		numOfWorkers = NUM_OF_WORKERS
+
+	records = []
+	for databaseName in sorted(getDatabases()):
+		for patientName in getPatientNames(databaseName):
+			records.append((databaseName, patientName, configurations))
+
+	if (numOfWorkers > 1 and len(records) > 1):
+		pool = multiprocessing.Pool(min(numOfWorkers, len(records)))
+		results = pool.imap(getRaggedBeatsForRecordFromTuple, records)
+	else:
+		pool = None
+		results = (getRaggedBeatsForRecordFromTuple(record) for record in records)
+
+	# Contains, for every configuration, a list of [RaggedBeats] objects (one for every record) and the number of windows
+	# that precede each cardiac event.
+	listsOfRaggedBeats = {}
+	auxNums = {}
+	for configuration in configurations:
+		listsOfRaggedBeats[configuration] = []
+		auxNums[configuration] = {}
+		for cardiacEvent in CARDIAC_EVENTS:
+			auxNums[configuration][cardiacEvent] = 0
+
+	databaseName = None
+	for (record, (raggedBeatsForRecord, auxNumsForRecord)) in zip(records, results):
+		if (record[0] != databaseName):
+			databaseName = record[0]
+			print '**************************************'
+			print 'Working on database ' + str(databaseName)
+			print '**************************************'
+		print 'Working on patient ' + str(record[1])
+
+		for configuration in configurations:
+			listsOfRaggedBeats[configuration].append(raggedBeatsForRecord[configuration])
+			for cardiacEvent in auxNumsForRecord[configuration]:
+				auxNums[configuration][cardiacEvent] = auxNums[configuration][cardiacEvent] + auxNumsForRecord[configuration][cardiacEvent]
+
+	if (pool is not None):
+		pool.close()
+		pool.join()
+
+	raggedBeatsForConfigurations = {}
+	for configuration in configurations:
+		raggedBeatsForConfigurations[configuration] = raggedBeats.RaggedBeats.concatenate(listsOfRaggedBeats[configuration])
+
+		if (len(configurations) > 1):
+			print ('Amount of time before beginning: ' + str(configuration[0]) + ', Time Window: ' + str(configuration[1]))
+
+		auxNum = auxNums[configuration]
+		for cardiacEvent in auxNum:
+			print ('The number associated with ' + str(cardiacEvent) + ' is ' + str(auxNum[cardiacEvent]))
+
+	return raggedBeatsForConfigurations
+
+def getRaggedBeatsForRecordFromTuple(record):
+	'''
+	Returns getRaggedBeatsForRecord(databaseName, patientName, configurations), where [record] is the tuple
+	([databaseName], [patientName], [configurations]).  (multiprocessing.Pool can only pass a single argument.)
+	'''
 
-	databaseNames = [getDatabases()[0]]
-	for databaseName in databaseNames:
-		print '**************************************'
-		print 'Working on database ' + str(databaseName)
-		print '**************************************'
-		patientNames = getPatientNames(databaseName)
-	
-		'''
-		if (databaseName == getDatabases()[0]):
-			proportion = 25
+	(databaseName, patientName, configurations) = record
+	return getRaggedBeatsForRecord(databaseName, patientName, configurations)
+
+def getRaggedBeatsForRecord(databaseName, patientName, configurations):
+	'''
+	Reads the record of patient [patientName] in database [databaseName] and returns a tuple of the form
+	([raggedBeatsForConfigurations], [auxNums]), where [raggedBeatsForConfigurations] is a dictionary containing, for every
+	tuple of the form ([amountOfTimeBeforeBeg], [timeWindow]) in the list [configurations], a [RaggedBeats] object representing
+	the [Beats] objects of all of the leads of the record for that configuration, and [auxNums] is a dictionary containing, for
+	every such tuple, a dictionary containing the number of these [Beats] objects that precede each cardiac event.
+
+	The [RaggedBeats] objects contain copies of the ECG readings of the windows only (not of the whole record), so that
+	they can be returned cheaply by a worker process.
+
+	The parsed parts of the record are kept in the cache of the current process (see recordCache.py), so calling this method
+	again for the same record (e.g. for other configurations) does not read it from disk again.
+	'''
+
+	if (USE_NATIVE_READER and USE_STREAMING_READER):
+		return getRaggedBeatsForRecordFromStream(databaseName, patientName, configurations)
+
+	if (USE_NATIVE_READER and USE_PARTIAL_READS):
+		return getRaggedBeatsForRecordFromRanges(databaseName, patientName, configurations)
+
+	if (USE_NATIVE_READER and USE_COMPACT_DTYPE):
+		header = recordCache.readHeader(databaseName, patientName)
+		(annotationArr, beatTypeNames, auxNames) = recordCache.readAnnotationsFromAtr(databaseName, patientName)
+		(timeStamps, adcValues) = recordCache.getCompactECGSignalFromBinary(databaseName, patientName)
+		leadNames = [signal['leadName'] for signal in header['signals']]
+
+		# The beats of this patient are views into these arrays.
+		beatTable = BeatTable.fromAnnotations(annotationArr, beatTypeNames, auxNames, timeStamps, adcValues[:, 0])
+	else:
+		if (USE_NATIVE_READER):
+			(annotationArr, beatTypeNames, auxNames) = recordCache.readAnnotationsFromAtr(databaseName, patientName)
+			ecgData = recordCache.getECGSignalFromBinary(databaseName, patientName)
+			leadNames = [signal['leadName'] for signal in recordCache.readHeader(databaseName, patientName)['signals']]
 		else:
-			proportion = 36
-		'''
-		for patientName in patientNames:
-			print 'Working on patient ' + str(patientName)
-			listOfBeats = getBeatsFromAnn(databaseName, patientName)
-			ecgData = getECGSignalFromDat(databaseName, patientName)
-			leadNames = getLeadNames(databaseName, patientName)
-
-			for leadNum in range(len(leadNames)):
-				leadName = leadNames[leadNum]
-				beats = []
-				for beatNum in range(len(listOfBeats)):
-					beat = getBeatFromDat(listOfBeats, ecgData, beatNum, leadNum)
-					#beat.resample(proportion)
-					beats.append(beat)
-				
-				ecgReading = ECGReading(databaseName, patientName, leadName, beats)
-				beatsObjs = ecgReading.createBeatsObjs(amountOfTimeBeforeBeg, timeWindow)
-
-				for beatsObj in beatsObjs:
-					if (beatsObj is not None):
-						listOfBeatsObjs.append(beatsObj)				
-	auxNum = {}
-	for cardiacEvent in CARDIAC_EVENTS:
-		auxNum[cardiacEvent] = 0	
-
-	for beatsObj in listOfBeatsObjs:
-		auxNum[beatsObj.getCardiacEvent()] = auxNum[beatsObj.getCardiacEvent()] + 1
-
-	for cardiacEvent in auxNum:
-		print ('The number associated with ' + str(cardiacEvent) + ' is ' + str(auxNum[cardiacEvent]))
-
-	return listOfBeatsObjs
+			(annotationArr, beatTypeNames, auxNames) = recordCache.getAnnotationsFromAnn(databaseName, patientName)
+			ecgData = recordCache.getECGSignalFromDat(databaseName, patientName)
+			leadNames = recordCache.getLeadNames(databaseName, patientName)
+
+		# All of the beats of this patient are views into this single array.
+		ecgData = np.asarray(ecgData, dtype=np.float64)
+
+		# The boundaries and annotations of the beats are the same for every lead, so they are only
+		# computed once.
+		beatTable = BeatTable.fromAnnotations(annotationArr, beatTypeNames, auxNames, ecgData[:, 0], ecgData[:, 1])
+
+	# Contains a list of [Beats] objects for every configuration.
+	listsOfBeatsObjs = {}
+	for configuration in configurations:
+		listsOfBeatsObjs[configuration] = []
+
+	for leadNum in range(len(leadNames)):
+		leadName = leadNames[leadNum]
+		if (USE_NATIVE_READER and USE_COMPACT_DTYPE):
+			signal = header['signals'][leadNum]
+			beats = beatTable.withECGReadings(adcValues[:, leadNum], signal['gain'], signal['baseline'], header['samplingFrequency'])
+		else:
+			beats = beatTable.withECGReadings(ecgData[:, leadNum + 1])
+		
+		ecgReading = ECGReading(databaseName, patientName, leadName, beats)
+		beatsObjsForConfigurations = ecgReading.createBeatsObjsForConfigurations(configurations)
+
+		for configuration in configurations:
+			for beatsObj in beatsObjsForConfigurations[configuration]:
+				if (beatsObj is not None):
+					listsOfBeatsObjs[configuration].append(beatsObj)
+
+	return getRaggedBeatsForConfigurationsOfRecord(listsOfBeatsObjs, configurations)
+
+def getRaggedBeatsForRecordFromRanges(databaseName, patientName, configurations):
+	'''
+	Returns the same tuple as getRaggedBeatsForRecord(databaseName, patientName, configurations), but reads the annotations of
+	the record first and then only the samples of the windows of beats that precede the cardiac events (see getSampleRanges),
+	instead of the whole ECG signal.  For long records, these samples are a tiny fraction of the .dat file.
+	'''
+
+	header = recordCache.readHeader(databaseName, patientName)
+	samplingFrequency = header['samplingFrequency']
+	(annotationArr, beatTypeNames, auxNames) = recordCache.readAnnotationsFromAtr(databaseName, patientName)
+	leadNames = [signal['leadName'] for signal in header['signals']]
+
+	# The boundaries and annotations of the beats (and therefore the windows) are the same for every lead and are found without
+	# reading any samples.
+	beatTable = BeatTable.fromAnnotations(annotationArr, beatTypeNames, auxNames, None, None, samplingFrequency)
+	windowsForConfigurations = ECGReading(databaseName, patientName, '', beatTable).createBeatsObjsForConfigurations(configurations)
+
+	windows = []
+	for configuration in configurations:
+		windows.extend(windowsForConfigurations[configuration])
+
+	# The index of the first sample of every window and one more than the index of its last sample.
+	begSampleIndices = np.array([window.getBeats().sampleOffset for window in windows], dtype=np.int64)
+	endSampleIndices = begSampleIndices + np.array([window.getBeats().endSampleIndices[-1] + 1 for window in windows], dtype=np.int64)
+
+	# Read the samples of every range of overlapping windows at once.
+	(begRangeIndices, endRangeIndices) = getSampleRanges(begSampleIndices, endSampleIndices)
+	ranges = []
+	for (begRangeIndex, endRangeIndex) in zip(begRangeIndices, endRangeIndices):
+		(timeStamps, adcValues) = wfdbReader.getCompactECGSignalFromBinary(databaseName, patientName, header, begRangeIndex, endRangeIndex)
+		ranges.append(adcValues)
+	rangeIndices = np.searchsorted(begRangeIndices, begSampleIndices, side='right') - 1
+
+	# Contains a list of [Beats] objects for every configuration.
+	listsOfBeatsObjs = {}
+	for configuration in configurations:
+		listsOfBeatsObjs[configuration] = []
+
+	for leadNum in range(len(leadNames)):
+		signal = header['signals'][leadNum]
+
+		windowIndex = 0
+		for configuration in configurations:
+			for window in windowsForConfigurations[configuration]:
+				rangeIndex = rangeIndices[windowIndex]
+				begIndex = begSampleIndices[windowIndex] - begRangeIndices[rangeIndex]
+				endIndex = endSampleIndices[windowIndex] - begRangeIndices[rangeIndex]
+				windowIndex = windowIndex + 1
+
+				ecgReadings = ranges[rangeIndex][begIndex:endIndex, leadNum]
+				if (USE_COMPACT_DTYPE):
+					beats = window.getBeats().withECGReadings(ecgReadings, signal['gain'], signal['baseline'], samplingFrequency)
+				else:
+					ecgReadings = wfdbReader.adcToPhysical(ecgReadings, signal['gain'], signal['baseline'])
+					beats = window.getBeats().withECGReadings(ecgReadings, samplingFrequency=samplingFrequency)
+
+				listsOfBeatsObjs[configuration].append(Beats(databaseName, patientName, leadNames[leadNum], window.timeBefore,
+				                                             window.timeWindow, window.getCardiacEvent(),
+				                                             window.cardiacEventBegTimeStamp, beats))
+
+	return getRaggedBeatsForConfigurationsOfRecord(listsOfBeatsObjs, configurations)
+
+def getRaggedBeatsForRecordFromStream(databaseName, patientName, configurations, chunkSize=None):
+	'''
+	Returns the same tuple as getRaggedBeatsForRecord(databaseName, patientName, configurations), but reads the ECG signal of the
+	record in chunks of [chunkSize] samples (or [STREAM_CHUNK_SIZE] samples, if it is None), so that the whole record is never
+	in memory at once (see streamReader.py).
+	'''
+
+	if (chunkSize is None):
+		chunkSize = STREAM_CHUNK_SIZE
+
+	recordStream = streamReader.RecordStream(databaseName, patientName, chunkSize)
+	windowExtractor = streamReader.WindowExtractor(recordStream, configurations)
+	for (begSampleIndex, adcValues, annotationArr) in recordStream:
+		windowExtractor.addChunk(begSampleIndex, adcValues, annotationArr)
+
+	return getRaggedBeatsForConfigurationsOfRecord(windowExtractor.getListsOfBeatsObjs(), configurations)
+
+def getSampleRanges(begSampleIndices, endSampleIndices):
+	'''
+	Returns a tuple of numpy arrays of the form ([begRangeIndices], [endRangeIndices]) describing the smallest sorted list of
+	disjoint ranges of samples that contains all of the ranges of samples whose indices are at least begSampleIndices[n] and less
+	than endSampleIndices[n].  The (m + 1)-th range contains the samples whose indices are at least begRangeIndices[m] and less
+	than endRangeIndices[m].
+	'''
+
+	order = np.argsort(begSampleIndices, kind='mergesort')
+	begSampleIndices = np.asarray(begSampleIndices, dtype=np.int64)[order]
+	endSampleIndices = np.asarray(endSampleIndices, dtype=np.int64)[order]
+	if (len(begSampleIndices) == 0):
+		return (begSampleIndices, endSampleIndices)
+
+	# A new range begins with every range of samples that begins after all of the ranges before it end.
+	maxEndSampleIndices = np.maximum.accumulate(endSampleIndices)
+	isBeg = np.ones(len(begSampleIndices), dtype=bool)
+	isBeg[1:] = (begSampleIndices[1:] > maxEndSampleIndices[:-1])
+
+	begRangePositions = np.flatnonzero(isBeg)
+	endRangePositions = np.append(begRangePositions[1:], len(begSampleIndices)) - 1
+
+	return (begSampleIndices[begRangePositions], maxEndSampleIndices[endRangePositions])
+
+def getRaggedBeatsForConfigurationsOfRecord(listsOfBeatsObjs, configurations):
+	'''
+	Returns the tuple ([raggedBeatsForConfigurations], [auxNums]) returned by getRaggedBeatsForRecord, where [listsOfBeatsObjs] is a
+	dictionary containing the list of [Beats] objects of all of the leads of the record for every configuration in [configurations].
+	'''
+
+	raggedBeatsForConfigurations = {}
+	auxNums = {}
+	for configuration in configurations:
+		raggedBeatsForConfigurations[configuration] = raggedBeats.RaggedBeats.fromListOfBeatsObjs(listsOfBeatsObjs[configuration])
+
+		auxNum = {}
+		for cardiacEvent in CARDIAC_EVENTS:
+			auxNum[cardiacEvent] = 0	
+
+		# Count the windows preceding each cardiac event at once.
+		(cardiacEvents, counts) = np.unique(raggedBeatsForConfigurations[configuration].cardiacEvents, return_counts=True)
+		for (cardiacEvent, count) in zip(cardiacEvents, counts):
+			auxNum[str(cardiacEvent)] = int(count)
+
+		auxNums[configuration] = auxNum
+
+	return (raggedBeatsForConfigurations, auxNums)
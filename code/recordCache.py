@@ -0,0 +1,233 @@
+'''
+    This file contains the definition of the class 'RecordCache', each object of which keeps the most recently parsed
+    parts of records (their ECG signals, annotations, headers and lead names) in memory, and the methods that read these
+    parts through the cache of the current process, [RECORD_CACHE].
+
+    Every entry of a [RecordCache] object is stored with the sizes and modification times of the files it was parsed
+    from, and is parsed again if any of these files has changed.  The least recently used entries are evicted whenever
+    the entries take more than [maxNumOfBytes] bytes.  The numpy arrays of the entries are read-only, since the same
+    arrays are returned by every call that hits the cache.
+
+    Within one process (e.g. when getData in readData.py is called once for every pair of values of
+    [amountOfTimeBeforeBeg] and [timeWindow]), every record is therefore only read from disk once.  The processes that read
+    the records in parallel (see getRaggedBeatsForConfigurations in readData.py) are created again for every call and
+    extract all of the configurations of a record at once, so the cache only saves reads when the records are read by
+    the calling process itself (with [numOfWorkers] equal to 1) or several times within the same process.
+'''
+
+import collections
+import os
+
+import numpy as np
+
+import annotations
+import readData
+import wfdbReader
+
+# CONSTANTS
+
+# The maximum number of bytes taken by the entries of [RECORD_CACHE] (0 disables the cache).
+RECORD_CACHE_SIZE = 2 ** 30
+
+def getNumOfBytes(value):
+    '''
+        Returns (an estimate of) the number of bytes taken by [value], a numpy array, a string, a number or a tuple, list or
+        dictionary of these.
+    '''
+
+    if (isinstance(value, np.ndarray)):
+        return value.nbytes
+    if (isinstance(value, (tuple, list))):
+        return 64 + sum([getNumOfBytes(element) for element in value])
+    if (isinstance(value, dict)):
+        return 64 + sum([getNumOfBytes(key) + getNumOfBytes(element) for (key, element) in value.items()])
+    if (isinstance(value, str)):
+        return 40 + len(value)
+
+    return 16
+
+def makeReadOnly(value):
+    '''
+        Makes all of the numpy arrays in [value] (a numpy array or a tuple, list or dictionary containing numpy arrays) read-only and
+        returns [value].
+    '''
+
+    if (isinstance(value, np.ndarray)):
+        value.setflags(write=False)
+    elif (isinstance(value, (tuple, list))):
+        for element in value:
+            makeReadOnly(element)
+    elif (isinstance(value, dict)):
+        for element in value.values():
+            makeReadOnly(element)
+
+    return value
+
+def getFileStamps(fullFileNames):
+    '''
+        Returns a tuple containing the size and modification time of every file in the list [fullFileNames].
+    '''
+
+    fileStamps = []
+    for fullFileName in fullFileNames:
+        fileStat = os.stat(fullFileName)
+        fileStamps.append((fullFileName, fileStat.st_size, fileStat.st_mtime))
+
+    return tuple(fileStamps)
+
+class RecordCache(object):
+
+    def __init__(self, maxNumOfBytes=RECORD_CACHE_SIZE):
+        '''
+            Creates an empty object of class [RecordCache] whose entries take at most [maxNumOfBytes] bytes.
+        '''
+
+        self.maxNumOfBytes = maxNumOfBytes
+
+        # Maps the key of every entry to a tuple of the form ([fileStamps], [value], [numOfBytes]), from the least to the most
+        # recently used entry.
+        self.entries = collections.OrderedDict()
+        self.numOfBytes = 0
+
+        self.numOfHits = 0
+        self.numOfMisses = 0
+        self.numOfEvictions = 0
+
+    def get(self, key, fullFileNames, load, *args):
+        '''
+            Returns the value of the entry [key] if it was parsed from the files in the list [fullFileNames] as they are now.
+            Otherwise, returns load(*args), which must only read these files, and stores it as the value of the entry [key].
+        '''
+
+        fileStamps = getFileStamps(fullFileNames)
+
+        if (key in self.entries):
+            (entryFileStamps, value, numOfBytes) = self.entries.pop(key)
+            self.numOfBytes = self.numOfBytes - numOfBytes
+
+            if (entryFileStamps == fileStamps):
+                self.numOfHits = self.numOfHits + 1
+                self.entries[key] = (entryFileStamps, value, numOfBytes)
+                self.numOfBytes = self.numOfBytes + numOfBytes
+                return value
+
+        self.numOfMisses = self.numOfMisses + 1
+        value = makeReadOnly(load(*args))
+
+        numOfBytes = getNumOfBytes(value)
+        if (numOfBytes <= self.maxNumOfBytes):
+            self.entries[key] = (fileStamps, value, numOfBytes)
+            self.numOfBytes = self.numOfBytes + numOfBytes
+            self.evict()
+
+        return value
+
+    def evict(self):
+        '''
+            Evicts the least recently used entries until the entries take at most [maxNumOfBytes] bytes.
+        '''
+
+        while (self.numOfBytes > self.maxNumOfBytes):
+            (key, (fileStamps, value, numOfBytes)) = self.entries.popitem(last=False)
+            self.numOfBytes = self.numOfBytes - numOfBytes
+            self.numOfEvictions = self.numOfEvictions + 1
+
+    def clear(self):
+        '''
+            Removes all of the entries (but keeps the counters).
+        '''
+
+        self.entries.clear()
+        self.numOfBytes = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __str__(self):
+        # Heading
+        str1 = ' ****** RECORD CACHE OBJECT ********* \n \n'
+
+        str1 = str1 + 'Number of Entries: ' + str(len(self)) + '\n'
+        str1 = str1 + 'Number of Bytes: ' + str(self.numOfBytes) + ' of ' + str(self.maxNumOfBytes) + '\n'
+        str1 = str1 + 'Hits: ' + str(self.numOfHits) + ', Misses: ' + str(self.numOfMisses) + ', Evictions: ' + \
+               str(self.numOfEvictions) + '\n\n'
+
+        return str1
+
+# The cache of the current process.  Its memory budget can be changed by setting RECORD_CACHE.maxNumOfBytes.
+RECORD_CACHE = RecordCache()
+
+def readHeader(databaseName, patientName):
+    '''
+        Returns wfdbReader.readHeader(databaseName, patientName) through [RECORD_CACHE].
+    '''
+
+    fullFileName = os.path.join(databaseName, patientName) + wfdbReader.HEADER_EXTENSION
+    return RECORD_CACHE.get(('readHeader', databaseName, patientName), [fullFileName], wfdbReader.readHeader,
+                            databaseName, patientName)
+
+def getSignalFileNames(databaseName, patientName):
+    '''
+        Returns a list containing the full file names of the header file and of the signal files of the record of patient
+        [patientName] in database [databaseName].
+    '''
+
+    fullFileNames = [os.path.join(databaseName, patientName) + wfdbReader.HEADER_EXTENSION]
+    for signal in readHeader(databaseName, patientName)['signals']:
+        fullFileName = os.path.join(databaseName, signal['fileName'])
+        if (fullFileName not in fullFileNames):
+            fullFileNames.append(fullFileName)
+
+    return fullFileNames
+
+def getECGSignalFromBinary(databaseName, patientName):
+    '''
+        Returns wfdbReader.getECGSignalFromBinary(databaseName, patientName) through [RECORD_CACHE].
+    '''
+
+    return RECORD_CACHE.get(('getECGSignalFromBinary', databaseName, patientName), getSignalFileNames(databaseName, patientName),
+                            wfdbReader.getECGSignalFromBinary, databaseName, patientName)
+
+def getCompactECGSignalFromBinary(databaseName, patientName):
+    '''
+        Returns wfdbReader.getCompactECGSignalFromBinary(databaseName, patientName) through [RECORD_CACHE].
+    '''
+
+    return RECORD_CACHE.get(('getCompactECGSignalFromBinary', databaseName, patientName), getSignalFileNames(databaseName, patientName),
+                            wfdbReader.getCompactECGSignalFromBinary, databaseName, patientName, readHeader(databaseName, patientName))
+
+def readAnnotationsFromAtr(databaseName, patientName):
+    '''
+        Returns annotations.readAnnotationsFromAtr(databaseName, patientName) through [RECORD_CACHE].
+    '''
+
+    fullFileName = os.path.join(databaseName, patientName) + wfdbReader.ANNOTATOR_EXTENSION
+    return RECORD_CACHE.get(('readAnnotationsFromAtr', databaseName, patientName), [fullFileName], annotations.readAnnotationsFromAtr,
+                            databaseName, patientName)
+
+def getECGSignalFromDat(databaseName, patientName):
+    '''
+        Returns readData.getECGSignalFromDat(databaseName, patientName) through [RECORD_CACHE].
+    '''
+
+    fullFileName = os.path.join(databaseName, patientName) + readData.DATA_EXTENSION + ".txt"
+    return RECORD_CACHE.get(('getECGSignalFromDat', databaseName, patientName), [fullFileName], readData.getECGSignalFromDat,
+                            databaseName, patientName)
+
+def getLeadNames(databaseName, patientName):
+    '''
+        Returns readData.getLeadNames(databaseName, patientName) through [RECORD_CACHE].
+    '''
+
+    fullFileName = os.path.join(databaseName, patientName) + readData.DATA_EXTENSION + ".txt"
+    return RECORD_CACHE.get(('getLeadNames', databaseName, patientName), [fullFileName], readData.getLeadNames,
+                            databaseName, patientName)
+
+def getAnnotationsFromAnn(databaseName, patientName):
+    '''
+        Returns readData.getAnnotationsFromAnn(databaseName, patientName) through [RECORD_CACHE].
+    '''
+
+    fullFileName = os.path.join(databaseName, patientName) + readData.ANNOTATION_EXTENSION + ".txt"
+    return RECORD_CACHE.get(('getAnnotationsFromAnn', databaseName, patientName), [fullFileName], readData.getAnnotationsFromAnn,
+                            databaseName, patientName)
@@ -0,0 +1,186 @@
+'''
+    This file contains the methods required to build, save and load the manifest of a database, which describes the files
+    and records in the directory of the database, so that the records can be found without listing (and splitting the names
+    of) all of the files in the directory every time.
+
+    The manifest of a database is a dictionary of the following form:
+        * 'version' - [MANIFEST_VERSION].
+        * 'dirModificationTime' - the modification time of the directory of the database when it was scanned.  The directory
+          is only scanned again if its modification time changes (i.e. if a file is added, removed or renamed).
+        * 'files' - a dictionary containing, for every file in the directory, a list of the form ([size], [modificationTime]).
+        * 'records' - a dictionary containing, for every record (e.g. "100"), a dictionary of the form
+          {'binary': [hasBinary], 'text': [hasText]}, where [hasBinary] is True if and only if the .atr, .dat and .hea files
+          of the record are all in the directory and [hasText] is True if and only if both text files produced by
+          createTextFiles in readData.py are in the directory.
+
+    Every manifest is saved as a JSON file in [MANIFEST_DIR], so later runs (and worker processes) only need to check the
+    modification time of the directory.  The directory is scanned with os.scandir (or the scandir package) if it is
+    available, since it returns the type of every entry without a separate system call, and with os.listdir otherwise.
+'''
+
+import hashlib
+import json
+import os
+import tempfile
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+import readData
+import wfdbReader
+
+# CONSTANTS
+MANIFEST_DIR = "../recordManifests/"
+
+# Increment this whenever the layout of a manifest changes.
+MANIFEST_VERSION = 1
+
+# The extensions of the files that every record must have.
+BINARY_EXTENSIONS = [wfdbReader.ANNOTATOR_EXTENSION, ".dat", wfdbReader.HEADER_EXTENSION]
+
+# The manifests already loaded by the current process.
+manifests = {}
+
+def listFiles(dirName):
+    '''
+        Returns a dictionary containing, for every file in the directory [dirName], a list of the form ([size], [modificationTime]).
+    '''
+
+    files = {}
+
+    if (scandir is not None):
+        for entry in scandir(dirName):
+            if (entry.is_file()):
+                fileStat = entry.stat()
+                files[entry.name] = [fileStat.st_size, fileStat.st_mtime]
+    else:
+        for entry in os.listdir(dirName):
+            fullFileName = os.path.join(dirName, entry)
+            if (os.path.isfile(fullFileName)):
+                fileStat = os.stat(fullFileName)
+                files[entry] = [fileStat.st_size, fileStat.st_mtime]
+
+    return files
+
+def getRecords(fileNames):
+    '''
+        Returns the dictionary 'records' of the manifest (see the documentation at the top of this file) of a directory that
+        contains the files whose names are in [fileNames].
+    '''
+
+    fileNames = set(fileNames)
+    textSuffixes = [readData.DATA_EXTENSION + ".txt", readData.ANNOTATION_EXTENSION + ".txt"]
+
+    # Split every name into the name of the record and the extension (which only begins at the last dot, so names such as
+    # "100.2.dat" are allowed).
+    patientNames = set()
+    for fileName in fileNames:
+        (patientName, extension) = os.path.splitext(fileName)
+        if (extension in BINARY_EXTENSIONS):
+            patientNames.add(patientName)
+
+    records = {}
+    for patientName in patientNames:
+        records[patientName] = {'binary': all([(patientName + extension) in fileNames for extension in BINARY_EXTENSIONS]),
+                                'text': all([(patientName + suffix) in fileNames for suffix in textSuffixes])}
+
+    return records
+
+def getManifestFileName(databaseName):
+    '''
+        Returns the full file name of the file in which the manifest of database [databaseName] is saved.
+    '''
+
+    # The hash of the full path distinguishes databases with the same name in different directories.
+    pathHash = hashlib.sha1(os.path.abspath(databaseName).encode('utf-8')).hexdigest()[:8]
+
+    return os.path.join(MANIFEST_DIR, 'manifest-' + os.path.basename(os.path.normpath(databaseName)) + '-' + pathHash + '.json')
+
+def buildManifest(databaseName):
+    '''
+        Scans the directory of database [databaseName] and returns its manifest.
+    '''
+
+    # The modification time is read before the directory is scanned, so that a file added during the scan causes the next
+    # call of getManifest to scan the directory again.
+    dirModificationTime = os.stat(databaseName).st_mtime
+    files = listFiles(databaseName)
+
+    return {'version': MANIFEST_VERSION, 'dirModificationTime': dirModificationTime, 'files': files,
+            'records': getRecords(files.keys())}
+
+def saveManifest(databaseName, manifest):
+    '''
+        Saves [manifest], the manifest of database [databaseName], to the file returned by getManifestFileName.  The manifest is
+        first written to a temporary file, which is then renamed, so that other processes never read an incomplete file.
+    '''
+
+    if (not os.path.isdir(MANIFEST_DIR)):
+        os.makedirs(MANIFEST_DIR)
+
+    (fileDescriptor, tempFileName) = tempfile.mkstemp(dir=MANIFEST_DIR)
+    f = os.fdopen(fileDescriptor, 'w')
+    json.dump(manifest, f)
+    f.close()
+
+    os.rename(tempFileName, getManifestFileName(databaseName))
+
+def loadManifest(databaseName):
+    '''
+        Returns the saved manifest of database [databaseName], or None if there is none.
+    '''
+
+    manifestFileName = getManifestFileName(databaseName)
+    if (not os.path.isfile(manifestFileName)):
+        return None
+
+    f = open(manifestFileName, 'r')
+    try:
+        manifest = json.load(f)
+    except ValueError:
+        manifest = None
+    f.close()
+
+    return manifest
+
+def isUpToDate(databaseName, manifest):
+    '''
+        Returns True if and only if [manifest] is an up-to-date manifest of database [databaseName].
+    '''
+
+    return (manifest is not None and manifest.get('version') == MANIFEST_VERSION and
+            manifest['dirModificationTime'] == os.stat(databaseName).st_mtime)
+
+def getManifest(databaseName):
+    '''
+        Returns the manifest of database [databaseName].  The directory of the database is only scanned if neither the current
+        process nor [MANIFEST_DIR] has an up-to-date manifest of it.
+    '''
+
+    manifest = manifests.get(databaseName)
+    if (not isUpToDate(databaseName, manifest)):
+        manifest = loadManifest(databaseName)
+
+        if (not isUpToDate(databaseName, manifest)):
+            manifest = buildManifest(databaseName)
+            saveManifest(databaseName, manifest)
+
+        manifests[databaseName] = manifest
+
+    return manifest
+
+def getPatientNames(databaseName, requireText=False):
+    '''
+        Returns a sorted list containing the names of the records in database [databaseName] whose .atr, .dat and .hea files are
+        all in the directory of the database (and, if [requireText] = True, whose text files are too).
+    '''
+
+    records = getManifest(databaseName)['records']
+
+    return sorted([str(patientName) for (patientName, record) in records.items()
+                   if (record['binary'] and (record['text'] or not(requireText)))])
@@ -0,0 +1,174 @@
+'''
+    This file contains checks of behaviours that have been broken before and that the rest of the code cannot notice by itself.
+    Every check raises a ValueError describing the first difference it finds.
+
+    Usage: python regressionChecks.py
+    runs all of the checks (see [CHECKS]) on small synthetic signals and prints the name of every check that passes.
+'''
+
+import numpy as np
+
+import annotations
+from beats import Beats
+from beatTable import BeatTable
+from raggedBeats import RaggedBeats
+from rhythmEpisodes import RhythmEpisodeIndex
+from streamingPredictor import DEFAULT_STRIDE, StreamingPredictor
+
+# CONSTANTS
+SAMPLING_FREQUENCY = 100.0
+NUM_OF_SAMPLES = 1000
+
+# The annotations of the synthetic record of checkEmptyBeats.  The two annotations of sample 250 (e.g. a rhythm annotation on
+# the sample of a beat) create an empty beat.
+SAMPLE_INDICES = [50, 150, 250, 250, 350, 450, 550]
+TYPES = ['N', 'N', '+', 'N', 'V', 'N', 'N']
+AUXILLARIES = ['', '', '(AFIB', '', '', '', '']
+
+# The synthetic stream of checkChunkSizes: its number of samples, its beat marks and the values used by its windows.
+NUM_OF_STREAMED_SAMPLES = 1300
+BEAT_MARKS = [100, 300, 500, 700, 1000, 1200]
+TIME_WINDOW = 7.0
+MAX_LENGTH_OF_BEAT = 400
+
+# The numbers of samples per call of addSamples compared by checkChunkSizes (None passes all of the samples at once).  The
+# windows are compared after every sample (a stride of one sample), so that every beat mark is at the end of a stride.
+CHECKED_CHUNK_SIZES = [None, 1, 7, 100, 1000]
+
+def getSyntheticWindows():
+    '''
+        Returns a list of the [Beats] objects of four windows of a synthetic record (see [SAMPLE_INDICES]), two of which end with
+        an empty beat (including the last one) and one of which begins with it.
+    '''
+
+    timeStamps = np.arange(NUM_OF_SAMPLES) / SAMPLING_FREQUENCY
+    ecgReadings = np.sin(timeStamps)
+    beatTable = BeatTable.fromAnnotations(*(annotations.fromAnnotations(SAMPLE_INDICES, TYPES, AUXILLARIES) + (timeStamps, ecgReadings)))
+
+    return [Beats('db', '100', 'MLII', 0.0, 5.0, '(AFIB', 2.5, beatTable.getSlice(begBeatIndex, endBeatIndex))
+            for (begBeatIndex, endBeatIndex) in [(0, 3), (2, 5), (3, 5), (1, 3)]]
+
+def checkEmptyBeats():
+    '''
+        Checks that the windows of a [RaggedBeats] object whose first or last beat is empty can be turned back into [Beats]
+        objects (see toListOfBeatsObjs in raggedBeats.py), and that the time stamps of their beats are those of the original
+        [Beats] objects (or, for an empty beat, at most one sample away from them).
+    '''
+
+    listOfBeatsObjs = getSyntheticWindows()
+    raggedBeats = RaggedBeats.fromListOfBeatsObjs(listOfBeatsObjs)
+
+    for (windowIndex, (expectedBeatsObj, beatsObj)) in enumerate(zip(listOfBeatsObjs, raggedBeats.toListOfBeatsObjs())):
+        expectedBeats = expectedBeatsObj.getBeats()
+        beats = beatsObj.getBeats()
+
+        if (len(beats) != len(expectedBeats)):
+            raise ValueError('Window ' + str(windowIndex) + ' has ' + str(len(beats)) + ' beats instead of ' + str(len(expectedBeats)) + '.')
+
+        for beatIndex in range(len(beats)):
+            expectedBeat = expectedBeats[beatIndex]
+            beat = beats[beatIndex]
+
+            if (len(beat.getECGReadings()) > 0):
+                isEqual = (beat.getFirstTimeStamp() == expectedBeat.getFirstTimeStamp() and
+                           beat.getLastTimeStamp() == expectedBeat.getLastTimeStamp())
+            else:
+                isEqual = (abs(beat.getFirstTimeStamp() - expectedBeat.getFirstTimeStamp()) <= 1.0 / SAMPLING_FREQUENCY and
+                           abs(beat.getLastTimeStamp() - expectedBeat.getLastTimeStamp()) <= 1.0 / SAMPLING_FREQUENCY)
+
+            if (not(isEqual)):
+                raise ValueError('The time stamps of beat ' + str(beatIndex) + ' of window ' + str(windowIndex) + ' are ' +
+                                 str((beat.getFirstTimeStamp(), beat.getLastTimeStamp())) + ' instead of ' +
+                                 str((expectedBeat.getFirstTimeStamp(), expectedBeat.getLastTimeStamp())) + '.')
+
+    # A single window is turned into a [Beats] object by itself.
+    raggedBeats[len(raggedBeats) - 1]
+
+def checkRecordsWithoutBeats():
+    '''
+        Checks that the [RhythmEpisodeIndex] object of a record with fewer than three annotations (and hence without any beats)
+        lists the record but has no episodes, and that it can be concatenated with the index of a record that has beats.
+    '''
+
+    listOfIndices = []
+    for numOfAnnotations in range(len(SAMPLE_INDICES) + 1):
+        (annotationArr, beatTypeNames, auxNames) = annotations.fromAnnotations(SAMPLE_INDICES[:numOfAnnotations], TYPES[:numOfAnnotations],
+                                                                               AUXILLARIES[:numOfAnnotations])
+        listOfIndices.append(RhythmEpisodeIndex.fromAnnotations('db', str(numOfAnnotations), annotationArr, auxNames, SAMPLING_FREQUENCY))
+
+    rhythmEpisodeIndex = RhythmEpisodeIndex.concatenate(listOfIndices)
+
+    if (len(rhythmEpisodeIndex.patientNames) != len(listOfIndices)):
+        raise ValueError('The index lists ' + str(len(rhythmEpisodeIndex.patientNames)) + ' records instead of ' + str(len(listOfIndices)) + '.')
+
+    for (recordIndex, recordIndexObj) in enumerate(listOfIndices[:3]):
+        if (len(recordIndexObj.labelCodes) != 0 or np.any(rhythmEpisodeIndex.recordIndices == recordIndex)):
+            raise ValueError('The record with ' + str(recordIndex) + ' annotations has episodes.')
+
+def generateStreamedWindows(samplingFrequency, ecgReadings, beatMarks, timeWindow, maxLengthOfBeat, stride=DEFAULT_STRIDE, chunkSize=None):
+    '''
+        Yields the tuples returned by getDueWindows (see streamingPredictor.py) for all of the strides of a stream to which
+        [ecgReadings] and [beatMarks] (see readRecord in streamReplay.py) are passed in chunks of [chunkSize] samples (or all at
+        once, if [chunkSize] is None).  Every mark is passed with its sample.
+    '''
+
+    stream = StreamingPredictor(samplingFrequency, timeWindow, maxLengthOfBeat, stride)
+    if (chunkSize is None):
+        chunkSize = max(1, len(ecgReadings))
+
+    for begSampleIndex in range(0, len(ecgReadings), chunkSize):
+        endSampleIndex = min(len(ecgReadings), begSampleIndex + chunkSize)
+        begMarkIndex = np.searchsorted(beatMarks, begSampleIndex, side='left')
+        endMarkIndex = np.searchsorted(beatMarks, endSampleIndex, side='left')
+
+        stream.addSamples(ecgReadings[begSampleIndex:endSampleIndex], beatMarks[begMarkIndex:endMarkIndex])
+        for window in stream.getDueWindows():
+            yield window
+
+def getChunkDescription(chunkSize):
+    '''
+        Returns a string describing how the samples are passed to addSamples with chunks of [chunkSize] samples (see
+        generateStreamedWindows).
+    '''
+
+    if (chunkSize is None):
+        return 'when all of the samples are passed at once'
+
+    return 'when the samples are passed in chunks of ' + str(chunkSize)
+
+def checkChunkSizes(chunkSizes=CHECKED_CHUNK_SIZES):
+    '''
+        Checks that the windows of every stride (of one sample) yielded by generateStreamedWindows for a synthetic stream (see
+        [BEAT_MARKS]) do not depend on how its samples are divided into the chunks passed to addSamples, i.e. that they are the
+        same for all of the chunk sizes in [chunkSizes].
+    '''
+
+    ecgReadings = np.sin(np.arange(NUM_OF_STREAMED_SAMPLES) / SAMPLING_FREQUENCY).astype(np.float32)
+    beatMarks = np.array(BEAT_MARKS, dtype=np.int64)
+    stride = 1.0 / SAMPLING_FREQUENCY
+
+    for chunkSize in chunkSizes[1:]:
+        expectedWindows = generateStreamedWindows(SAMPLING_FREQUENCY, ecgReadings, beatMarks, TIME_WINDOW, MAX_LENGTH_OF_BEAT, stride,
+                                                  chunkSizes[0])
+        windows = generateStreamedWindows(SAMPLING_FREQUENCY, ecgReadings, beatMarks, TIME_WINDOW, MAX_LENGTH_OF_BEAT, stride, chunkSize)
+
+        # The windows are compared as they are yielded, so that only one window of each stream is in memory at once.
+        while (True):
+            (endSampleIndex, window) = next(windows, (None, None))
+            (expectedEndSampleIndex, expectedWindow) = next(expectedWindows, (None, None))
+
+            if (endSampleIndex is None and expectedEndSampleIndex is None):
+                break
+
+            if (endSampleIndex != expectedEndSampleIndex or not np.array_equal(window, expectedWindow)):
+                raise ValueError('The window ending at sample ' + str(endSampleIndex) + ' ' + getChunkDescription(chunkSize) +
+                                 ' differs from the window ending at sample ' + str(expectedEndSampleIndex) + ' ' +
+                                 getChunkDescription(chunkSizes[0]) + '.')
+
+# The checks run by this file.
+CHECKS = [checkEmptyBeats, checkRecordsWithoutBeats, checkChunkSizes]
+
+if __name__ == '__main__':
+    for check in CHECKS:
+        check()
+        print (check.__name__ + ' passed')
@@ -0,0 +1,372 @@
+'''
+    This file contains the definition of the class 'RhythmEpisodeIndex', each object of which is an index of all of the
+    rhythm episodes (maximal runs of consecutive beats that are a part of the same cardiac rhythm) in one or more databases.
+
+    Every episode is described by one element of each of the following (sorted) numpy arrays:
+        * [recordIndices] - the index of the record of the episode, in the lists [databaseNames] and [patientNames].
+        * [begSampleIndices] and [endSampleIndices] - the indices of the first and last samples of the episode.
+        * [labelCodes] and [precedingLabelCodes] - the codes of the rhythm of the episode and of the rhythm of the episode
+          before it in the same record ([NO_AUX] for the first episode of a record).  The strings these codes represent are
+          [labelNames][code] (see annotations.py).
+    The episodes are sorted by record and then by their first sample, so the episodes of a record are consecutive.
+
+    Queries (e.g. all of the onsets of '(VT' preceded by at least 60 seconds of '(N', or all of the episodes longer than 10
+    seconds) are vectorized comparisons on these arrays (see select), so they do not require the records to be read again.
+    The index of every database is built once (from the annotations only) and saved to [CACHE_DIR] (see
+    getRhythmEpisodeIndex).
+'''
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+import annotations
+import datasetCache
+import readData
+import wfdbReader
+from beatTable import CODE_DTYPE
+from raggedBeats import getCodes
+
+# CONSTANTS
+
+# Increment this whenever the layout of the saved files changes.
+INDEX_VERSION = 1
+
+# The source files whose contents determine the episodes of a database.
+SOURCE_CODE_FILES = ['readData.py', 'wfdbReader.py', 'annotations.py', 'rhythmEpisodes.py']
+
+# The names of the arrays with one element per episode.
+EPISODE_ARRAY_NAMES = ['recordIndices', 'begSampleIndices', 'endSampleIndices', 'labelCodes', 'precedingLabelCodes']
+
+class RhythmEpisodeIndex(object):
+
+    def __init__(self, databaseNames, patientNames, samplingFrequencies, recordIndices, begSampleIndices, endSampleIndices,
+                 labelCodes, precedingLabelCodes, labelNames):
+        '''
+            Creates an object of class [RhythmEpisodeIndex]
+
+            [databaseNames], [patientNames] and [samplingFrequencies] are numpy arrays with one element per record.  The other
+            arrays have one element per episode (see the documentation at the top of this file) and [labelNames] is the list of
+            strings that translates the codes of the rhythms back into strings.
+        '''
+
+        # Fields containing information about the records.
+        self.databaseNames = databaseNames
+        self.patientNames = patientNames
+        self.samplingFrequencies = samplingFrequencies
+
+        # Fields containing information about the episodes.
+        self.recordIndices = recordIndices
+        self.begSampleIndices = begSampleIndices
+        self.endSampleIndices = endSampleIndices
+        self.labelCodes = labelCodes
+        self.precedingLabelCodes = precedingLabelCodes
+        self.labelNames = labelNames
+
+        # The time stamps (in seconds) at which the episodes begin and the durations (in seconds) of the episodes and of the
+        # episodes before them (0 for the first episode of a record).
+        samplingFrequencies = self.samplingFrequencies[self.recordIndices]
+        self.begTimeStamps = self.begSampleIndices / samplingFrequencies
+        self.durations = (self.endSampleIndices - self.begSampleIndices + 1) / samplingFrequencies
+
+        self.precedingDurations = np.zeros(len(self.recordIndices), dtype=np.float64)
+        if (len(self.recordIndices) > 1):
+            isSameRecord = (self.recordIndices[1:] == self.recordIndices[:-1])
+            self.precedingDurations[1:][isSameRecord] = self.durations[:-1][isSameRecord]
+
+    @classmethod
+    def fromAnnotations(cls, databaseName, patientName, annotationArr, auxNames, samplingFrequency):
+        '''
+            Returns a [RhythmEpisodeIndex] object containing the episodes of the record of patient [patientName] in database
+            [databaseName], whose beats are described by the annotation array [annotationArr] whose rhythm codes represent the
+            strings in [auxNames] (see annotations.py), and whose sampling frequency is [samplingFrequency].
+        '''
+
+        auxCodes = np.asarray(annotationArr['auxCode'])
+
+        # A record without any beats has no episodes, but it is still listed.
+        if (len(auxCodes) == 0):
+            return cls(np.array([databaseName], dtype=str), np.array([patientName], dtype=str),
+                       np.array([samplingFrequency], dtype=np.float64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                       np.zeros(0, dtype=np.int64), np.zeros(0, dtype=CODE_DTYPE), np.zeros(0, dtype=CODE_DTYPE), list(auxNames))
+
+        # Every episode begins with the first beat of the record or with a beat whose rhythm differs from the rhythm of the previous beat.
+        isBeg = np.ones(len(auxCodes), dtype=bool)
+        isBeg[1:] = (auxCodes[1:] != auxCodes[:-1])
+        begIndices = np.flatnonzero(isBeg)
+        endIndices = np.append(begIndices[1:], len(auxCodes)) - 1
+
+        labelCodes = auxCodes[begIndices]
+        precedingLabelCodes = np.full(len(labelCodes), auxNames.index(annotations.NO_AUX), dtype=CODE_DTYPE)
+        precedingLabelCodes[1:] = labelCodes[:-1]
+
+        return cls(np.array([databaseName], dtype=str), np.array([patientName], dtype=str),
+                   np.array([samplingFrequency], dtype=np.float64), np.zeros(len(begIndices), dtype=np.int64),
+                   np.asarray(annotationArr['begSampleIndex'][begIndices], dtype=np.int64),
+                   np.asarray(annotationArr['endSampleIndex'][endIndices], dtype=np.int64),
+                   labelCodes.astype(CODE_DTYPE), precedingLabelCodes, list(auxNames))
+
+    @classmethod
+    def fromRecord(cls, databaseName, patientName):
+        '''
+            Reads the annotations of the record of patient [patientName] in database [databaseName] (but not its ECG signal) and
+            returns a [RhythmEpisodeIndex] object containing its episodes.
+        '''
+
+        if (readData.USE_NATIVE_READER):
+            (annotationArr, beatTypeNames, auxNames) = annotations.readAnnotationsFromAtr(databaseName, patientName)
+        else:
+            (annotationArr, beatTypeNames, auxNames) = readData.getAnnotationsFromAnn(databaseName, patientName)
+
+        samplingFrequency = wfdbReader.readHeader(databaseName, patientName)['samplingFrequency']
+
+        return cls.fromAnnotations(databaseName, patientName, annotationArr, auxNames, samplingFrequency)
+
+    @classmethod
+    def fromDatabase(cls, databaseName):
+        '''
+            Returns a [RhythmEpisodeIndex] object containing the episodes of all of the records in database [databaseName].
+        '''
+
+        return cls.concatenate([cls.fromRecord(databaseName, patientName) for patientName in sorted(readData.getPatientNames(databaseName))])
+
+    @classmethod
+    def concatenate(cls, listOfIndices):
+        '''
+            Returns a [RhythmEpisodeIndex] object containing the records and episodes of all of the [RhythmEpisodeIndex] objects
+            in the list [listOfIndices], in order.
+        '''
+
+        labelNames = annotations.getAuxNames()
+        listsOfLabelCodes = [np.zeros(0, dtype=CODE_DTYPE)]
+        listsOfPrecedingLabelCodes = [np.zeros(0, dtype=CODE_DTYPE)]
+        listsOfRecordIndices = [np.zeros(0, dtype=np.int64)]
+
+        numOfRecords = 0
+        for index in listOfIndices:
+            # Translate the codes of the [RhythmEpisodeIndex] object into codes shared by all of the episodes.
+            codes = getCodes(index.labelNames, labelNames)
+            listsOfLabelCodes.append(codes[index.labelCodes])
+            listsOfPrecedingLabelCodes.append(codes[index.precedingLabelCodes])
+
+            listsOfRecordIndices.append(index.recordIndices + numOfRecords)
+            numOfRecords = numOfRecords + len(index.databaseNames)
+
+        def concatenateArrays(name, dtype):
+            return np.concatenate([np.zeros(0, dtype=dtype)] + [getattr(index, name) for index in listOfIndices])
+
+        return cls(concatenateArrays('databaseNames', str), concatenateArrays('patientNames', str),
+                   concatenateArrays('samplingFrequencies', np.float64), np.concatenate(listsOfRecordIndices),
+                   concatenateArrays('begSampleIndices', np.int64), concatenateArrays('endSampleIndices', np.int64),
+                   np.concatenate(listsOfLabelCodes), np.concatenate(listsOfPrecedingLabelCodes), labelNames)
+
+    def getLabelCode(self, label):
+        '''
+            Returns the code of the rhythm whose string abbreviation is [label], or -1 if no episode can have this rhythm.
+        '''
+
+        if (label not in self.labelNames):
+            return -1
+
+        return self.labelNames.index(label)
+
+    def getRecordIndex(self, databaseName, patientName):
+        '''
+            Returns the index of the record of patient [patientName] in database [databaseName], or -1 if it is not in this
+            [RhythmEpisodeIndex] object.
+        '''
+
+        isRecord = (self.databaseNames == databaseName) & (self.patientNames == patientName)
+        if (not np.any(isRecord)):
+            return -1
+
+        return int(np.flatnonzero(isRecord)[0])
+
+    def getMask(self, label=None, precedingLabel=None, minDuration=None, maxDuration=None, minPrecedingDuration=None,
+                recordIndex=None):
+        '''
+            Returns a boolean numpy array with one element per episode that is True if and only if the episode has the rhythm
+            [label], the episode before it has the rhythm [precedingLabel], the episode lasts at least [minDuration] and at most
+            [maxDuration] seconds, the episode before it lasts at least [minPrecedingDuration] seconds and the episode is a part of
+            the record whose index is [recordIndex].  Conditions whose arguments are None are ignored.
+        '''
+
+        mask = np.ones(len(self), dtype=bool)
+
+        if (label is not None):
+            mask = mask & (self.labelCodes == self.getLabelCode(label))
+        if (precedingLabel is not None):
+            mask = mask & (self.precedingLabelCodes == self.getLabelCode(precedingLabel))
+        if (minDuration is not None):
+            mask = mask & (self.durations >= minDuration)
+        if (maxDuration is not None):
+            mask = mask & (self.durations <= maxDuration)
+        if (minPrecedingDuration is not None):
+            mask = mask & (self.precedingDurations >= minPrecedingDuration)
+        if (recordIndex is not None):
+            mask = mask & (self.recordIndices == recordIndex)
+
+        return mask
+
+    def select(self, label=None, precedingLabel=None, minDuration=None, maxDuration=None, minPrecedingDuration=None,
+               recordIndex=None):
+        '''
+            Returns a numpy array containing the indices of the episodes that satisfy all of the conditions described in the
+            documentation for getMask, e.g. select('(VT', '(N', minPrecedingDuration=60.0) returns the indices of all of the onsets
+            of '(VT' preceded by at least 60 seconds of '(N'.
+        '''
+
+        return np.flatnonzero(self.getMask(label, precedingLabel, minDuration, maxDuration, minPrecedingDuration, recordIndex))
+
+    def getEpisodesOfRecord(self, recordIndex):
+        '''
+            Returns a numpy array containing the indices of the episodes of the record whose index is [recordIndex].  Since the
+            episodes are sorted by record, they are found by bisection.
+        '''
+
+        begIndex = np.searchsorted(self.recordIndices, recordIndex, side='left')
+        endIndex = np.searchsorted(self.recordIndices, recordIndex, side='right')
+
+        return np.arange(begIndex, endIndex)
+
+    def getEpisodeAt(self, recordIndex, sampleIndex):
+        '''
+            Returns the index of the episode of the record whose index is [recordIndex] that contains the sample [sampleIndex],
+            or -1 if there is no such episode.
+        '''
+
+        episodeIndices = self.getEpisodesOfRecord(recordIndex)
+        position = np.searchsorted(self.begSampleIndices[episodeIndices], sampleIndex, side='right') - 1
+        if (position < 0 or self.endSampleIndices[episodeIndices[position]] < sampleIndex):
+            return -1
+
+        return int(episodeIndices[position])
+
+    def getOnsets(self, episodeIndices):
+        '''
+            Returns a list of tuples of the form ([databaseName], [patientName], [aux], [auxTimeStamp]), one for each episode whose
+            index is in [episodeIndices], where [aux] is the string abbreviation of the rhythm of the episode and [auxTimeStamp]
+            is the time stamp (in seconds) at which it begins.
+        '''
+
+        episodeIndices = np.asarray(episodeIndices, dtype=np.int64)
+        recordIndices = self.recordIndices[episodeIndices]
+
+        return [(str(databaseName), str(patientName), self.labelNames[labelCode], float(begTimeStamp))
+                for (databaseName, patientName, labelCode, begTimeStamp) in zip(self.databaseNames[recordIndices],
+                                                                              self.patientNames[recordIndices],
+                                                                              self.labelCodes[episodeIndices],
+                                                                              self.begTimeStamps[episodeIndices])]
+
+    def save(self, dirName):
+        '''
+            Saves this [RhythmEpisodeIndex] object to the (existing) directory [dirName]: every array with one element per episode is
+            saved to its own .npy file and everything else is saved to the file metadata.json.
+        '''
+
+        for arrayName in EPISODE_ARRAY_NAMES:
+            np.save(os.path.join(dirName, arrayName + '.npy'), getattr(self, arrayName))
+
+        metadata = {'databaseNames': [str(name) for name in self.databaseNames],
+                    'patientNames': [str(name) for name in self.patientNames],
+                    'samplingFrequencies': [float(samplingFrequency) for samplingFrequency in self.samplingFrequencies],
+                    'labelNames': [str(name) for name in self.labelNames]}
+
+        f = open(os.path.join(dirName, 'metadata.json'), 'w')
+        json.dump(metadata, f)
+        f.close()
+
+    @classmethod
+    def load(cls, dirName):
+        '''
+            Loads and returns the [RhythmEpisodeIndex] object saved to the directory [dirName] by save.
+        '''
+
+        arrays = {}
+        for arrayName in EPISODE_ARRAY_NAMES:
+            arrays[arrayName] = np.load(os.path.join(dirName, arrayName + '.npy'))
+
+        f = open(os.path.join(dirName, 'metadata.json'), 'r')
+        metadata = json.load(f)
+        f.close()
+
+        return cls(np.array([str(name) for name in metadata['databaseNames']], dtype=str),
+                   np.array([str(name) for name in metadata['patientNames']], dtype=str),
+                   np.array(metadata['samplingFrequencies'], dtype=np.float64), arrays['recordIndices'], arrays['begSampleIndices'],
+                   arrays['endSampleIndices'], arrays['labelCodes'], arrays['precedingLabelCodes'],
+                   [str(name) for name in metadata['labelNames']])
+
+    def __len__(self):
+        return len(self.recordIndices)
+
+    def __str__(self):
+        # Heading
+        str1 = ' ****** RHYTHM EPISODE INDEX OBJECT ********* \n \n'
+
+        str1 = str1 + 'Number of Records: ' + str(len(self.databaseNames)) + '\n'
+        str1 = str1 + 'Number of Episodes: ' + str(len(self)) + '\n'
+        for labelCode in np.unique(self.labelCodes):
+            isLabel = (self.labelCodes == labelCode)
+            str1 = str1 + self.labelNames[labelCode] + ': ' + str(int(np.sum(isLabel))) + ' episodes, ' + \
+                   str(float(np.sum(self.durations[isLabel]))) + ' seconds\n'
+
+        return str1 + '\n'
+
+def getCacheDirName(databaseName):
+    '''
+        Returns the name of the directory (within [CACHE_DIR] defined in datasetCache.py) in which the [RhythmEpisodeIndex] object
+        of database [databaseName] is saved.  The name contains a hash of the files in the database, the source files in
+        [SOURCE_CODE_FILES] and the reader used ([USE_NATIVE_READER]), so it changes whenever any of these change.
+    '''
+
+    sha = hashlib.sha1()
+    sha.update(json.dumps([INDEX_VERSION, readData.USE_NATIVE_READER]).encode('utf-8'))
+    datasetCache.updateWithDatabase(sha, databaseName)
+
+    codeDir = os.path.dirname(os.path.abspath(__file__))
+    for sourceCodeFile in SOURCE_CODE_FILES:
+        f = open(os.path.join(codeDir, sourceCodeFile), 'rb')
+        sha.update(f.read())
+        f.close()
+
+    return os.path.join(datasetCache.CACHE_DIR, 'rhythmEpisodes-' + os.path.basename(os.path.normpath(databaseName)) + '-' +
+                        sha.hexdigest())
+
+def getRhythmEpisodeIndex(databaseNames=None):
+    '''
+        Returns a [RhythmEpisodeIndex] object containing the episodes of all of the records in the databases in [databaseNames] (or
+        in all of the databases in [DATABASE_DIR], if it is None).
+
+        The index of every database is only built if no up-to-date index of it has been saved; otherwise it is loaded.
+    '''
+
+    if (databaseNames is None):
+        databaseNames = sorted(readData.getDatabases())
+
+    listOfIndices = []
+    for databaseName in databaseNames:
+        cacheDirName = getCacheDirName(databaseName)
+
+        if (os.path.isdir(cacheDirName)):
+            listOfIndices.append(RhythmEpisodeIndex.load(cacheDirName))
+            continue
+
+        index = RhythmEpisodeIndex.fromDatabase(databaseName)
+        listOfIndices.append(index)
+
+        # As in saveListOfBeatsObjs in datasetCache.py, the files are first written to a temporary directory.
+        if (not os.path.isdir(datasetCache.CACHE_DIR)):
+            os.makedirs(datasetCache.CACHE_DIR)
+        tempDirName = tempfile.mkdtemp(dir=datasetCache.CACHE_DIR)
+        index.save(tempDirName)
+
+        if (os.path.isdir(cacheDirName)):
+            shutil.rmtree(tempDirName)
+        else:
+            os.rename(tempDirName, cacheDirName)
+
+    return RhythmEpisodeIndex.concatenate(listOfIndices)
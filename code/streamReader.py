@@ -0,0 +1,225 @@
+'''
+    This file contains the definitions of the class 'RecordStream', each object of which reads the ECG signal of a record
+    in chunks of a fixed number of samples, and of the class 'WindowExtractor', each object of which extracts the windows
+    of beats that precede the cardiac events of a record from these chunks.
+
+    Every chunk is a tuple of the form ([begSampleIndex], [adcValues], [annotationArr]), where [adcValues] contains the raw ADC
+    values of the samples of all of the leads beginning with the sample whose index is [begSampleIndex] (see
+    getCompactECGSignalFromBinary in wfdbReader.py) and [annotationArr] is the annotation array (see annotations.py) of the
+    beats that end in the chunk.
+
+    A [WindowExtractor] object carries everything it needs from one chunk to the next: the rhythm of the last beat (so that a
+    rhythm that begins with the first beat of a chunk is found), and the beats and samples of the last
+    max(amountOfTimeBeforeBeg + timeWindow) seconds (so that windows and beats that straddle two chunks are extracted).  Its
+    windows are therefore identical to the windows extracted from the whole record (see getRaggedBeatsForRecord in
+    readData.py), while the samples in memory are bounded by the size of a chunk and the length of the longest window.
+'''
+
+import numpy as np
+
+import annotations
+import readData
+import wfdbReader
+from beats import Beats
+from beatTable import BeatTable
+
+# CONSTANTS
+
+# The number of samples (of every lead) in a chunk.
+CHUNK_SIZE = 2 ** 20
+
+class RecordStream(object):
+
+    def __init__(self, databaseName, patientName, chunkSize=CHUNK_SIZE):
+        '''
+            Creates an object of class [RecordStream], which reads the record of patient [patientName] in database [databaseName] in
+            chunks of [chunkSize] samples.  The header and the annotations of the record are read at once.
+        '''
+
+        self.databaseName = databaseName
+        self.patientName = patientName
+        self.chunkSize = chunkSize
+
+        self.header = wfdbReader.readHeader(databaseName, patientName)
+        self.samplingFrequency = self.header['samplingFrequency']
+        self.leadNames = [signal['leadName'] for signal in self.header['signals']]
+
+        (self.annotationArr, self.beatTypeNames, self.auxNames) = annotations.readAnnotationsFromAtr(databaseName, patientName)
+
+    def getNumOfSamples(self):
+        '''
+            Returns the number of samples (of every lead) in the record.
+        '''
+
+        if (self.header['numOfSamples'] is not None):
+            return self.header['numOfSamples']
+
+        # If the header does not specify the number of samples, it is the number of samples in the last annotated part of the record.
+        return int(self.annotationArr['endSampleIndex'][-1]) + 1 if (len(self.annotationArr) > 0) else 0
+
+    def __iter__(self):
+        '''
+            Yields the chunks of the record in order (see the documentation at the top of this file).
+        '''
+
+        numOfSamples = self.getNumOfSamples()
+        endSampleIndices = self.annotationArr['endSampleIndex']
+
+        for begSampleIndex in range(0, numOfSamples, self.chunkSize):
+            endSampleIndex = min(begSampleIndex + self.chunkSize, numOfSamples)
+
+            (timeStamps, adcValues) = wfdbReader.getCompactECGSignalFromBinary(self.databaseName, self.patientName, self.header,
+                                                                               begSampleIndex, endSampleIndex)
+
+            # The beats that end in this chunk.
+            begBeatIndex = np.searchsorted(endSampleIndices, begSampleIndex, side='left')
+            endBeatIndex = np.searchsorted(endSampleIndices, endSampleIndex, side='left')
+
+            yield (begSampleIndex, adcValues, self.annotationArr[begBeatIndex:endBeatIndex])
+
+class WindowExtractor(object):
+
+    def __init__(self, recordStream, configurations):
+        '''
+            Creates an object of class [WindowExtractor], which extracts the windows of beats of the record read by [recordStream]
+            for every tuple of the form ([amountOfTimeBeforeBeg], [timeWindow]) in the list [configurations] from the chunks passed
+            to addChunk.
+        '''
+
+        self.recordStream = recordStream
+        self.configurations = configurations
+        self.samplingFrequency = recordStream.samplingFrequency
+        self.auxNames = recordStream.auxNames
+        self.isEvent = annotations.getEventMask(self.auxNames, readData.TYPES_OF_EVENTS_DICT)
+
+        # The number of seconds before the beginning of a cardiac event in which the beats of its windows may begin.
+        self.maxAmountOfTime = max([amountOfTimeBeforeBeg + timeWindow for (amountOfTimeBeforeBeg, timeWindow) in configurations] + [0.0])
+
+        # The state carried from one chunk to the next.
+        self.beats = np.zeros(0, dtype=annotations.ANNOTATION_DTYPE)
+        self.bufferBegSampleIndex = 0
+        self.buffer = np.zeros((0, len(recordStream.leadNames)), dtype=np.int16)
+        self.lastAuxCode = self.auxNames.index(annotations.NO_AUX)
+        self.firstBegTimeStamp = None
+        self.nextBegSampleIndex = 0
+
+        # Contains a list of [Beats] objects for every lead and configuration.
+        self.listsOfBeatsObjs = {}
+        for leadNum in range(len(recordStream.leadNames)):
+            for configuration in configurations:
+                self.listsOfBeatsObjs[(leadNum, configuration)] = []
+
+    def addChunk(self, begSampleIndex, adcValues, annotationArr):
+        '''
+            Extracts the windows of beats preceding the cardiac events that begin with the beats in [annotationArr] from the chunk
+            ([begSampleIndex], [adcValues], [annotationArr]), which must follow the chunk passed to the previous call.
+        '''
+
+        self.buffer = np.concatenate([self.buffer, adcValues])
+
+        if (len(annotationArr) > 0):
+            if (self.firstBegTimeStamp is None):
+                self.firstBegTimeStamp = annotationArr['begSampleIndex'][0] / self.samplingFrequency
+
+            numOfOldBeats = len(self.beats)
+            self.beats = np.concatenate([self.beats, annotationArr])
+
+            # The first beat of every new cardiac rhythm of interest (see getBegsOfAux in ecgReading.py), where the rhythm of the
+            # first beat of this chunk is compared to the rhythm of the last beat of the previous chunk.
+            auxCodes = annotationArr['auxCode']
+            previousAuxCodes = np.empty_like(auxCodes)
+            previousAuxCodes[0] = self.lastAuxCode
+            previousAuxCodes[1:] = auxCodes[:-1]
+            begAuxPositions = np.flatnonzero((auxCodes != previousAuxCodes) & self.isEvent[auxCodes])
+
+            begTimeStamps = self.beats['begSampleIndex'] / self.samplingFrequency
+            endTimeStamps = self.beats['endSampleIndex'] / self.samplingFrequency
+            for begAuxPosition in begAuxPositions:
+                self.extractWindows(numOfOldBeats + begAuxPosition, begTimeStamps, endTimeStamps)
+
+            self.lastAuxCode = auxCodes[-1]
+            self.nextBegSampleIndex = annotationArr['endSampleIndex'][-1] + 1
+
+        self.discardOldBeats()
+
+    def extractWindows(self, begAuxIndex, begTimeStamps, endTimeStamps):
+        '''
+            Extracts the windows of beats of every lead and configuration that precede the cardiac event that begins with the
+            (begAuxIndex + 1)-th beat in [beats] (see createBeatsObjsForConfigurations in ecgReading.py).  [begTimeStamps] and
+            [endTimeStamps] contain the time stamps of the first and last samples of the beats in [beats].
+        '''
+
+        auxTimeStamp = begTimeStamps[begAuxIndex]
+        aux = self.auxNames[self.beats['auxCode'][begAuxIndex]]
+        header = self.recordStream.header
+
+        for configuration in self.configurations:
+            (amountOfTimeBeforeBeg, timeWindow) = configuration
+
+            # As in getIndicesOfWindows in ecgReading.py, there is no window if it would begin before the first beat of the record.
+            timeStamp = auxTimeStamp - (amountOfTimeBeforeBeg + timeWindow)
+            if (timeStamp < self.firstBegTimeStamp):
+                continue
+
+            begIndex = np.searchsorted(begTimeStamps, timeStamp, side='left')
+            endIndex = np.searchsorted(endTimeStamps, auxTimeStamp - amountOfTimeBeforeBeg, side='right') - 1
+            if (endIndex < begIndex):
+                continue
+
+            beats = self.beats[begIndex:endIndex + 1]
+            firstSampleIndex = beats['begSampleIndex'][0]
+            lastSampleIndex = beats['endSampleIndex'][-1]
+            adcValues = self.buffer[firstSampleIndex - self.bufferBegSampleIndex:lastSampleIndex - self.bufferBegSampleIndex + 1]
+
+            for leadNum in range(len(self.recordStream.leadNames)):
+                signal = header['signals'][leadNum]
+
+                # The ECG readings are copied out of [buffer], which only holds the samples of the last few chunks.
+                if (readData.USE_COMPACT_DTYPE):
+                    ecgReadings = adcValues[:, leadNum].copy()
+                    (gain, baseline) = (signal['gain'], signal['baseline'])
+                else:
+                    ecgReadings = wfdbReader.adcToPhysical(adcValues[:, leadNum], signal['gain'], signal['baseline'])
+                    (gain, baseline) = (None, None)
+
+                beatTable = BeatTable(None, ecgReadings, beats['begSampleIndex'] - firstSampleIndex,
+                                      beats['endSampleIndex'] - firstSampleIndex, beats['beatTypeCode'].copy(), beats['auxCode'].copy(),
+                                      self.recordStream.beatTypeNames, self.auxNames, firstSampleIndex, gain, baseline,
+                                      self.samplingFrequency)
+
+                self.listsOfBeatsObjs[(leadNum, configuration)].append(
+                    Beats(self.recordStream.databaseName, self.recordStream.patientName, self.recordStream.leadNames[leadNum],
+                          amountOfTimeBeforeBeg, timeWindow, aux, auxTimeStamp, beatTable))
+
+    def discardOldBeats(self):
+        '''
+            Discards the beats (and samples) that no window of a cardiac event that begins after the last beat in [beats] can
+            contain, i.e. the beats that begin more than [maxAmountOfTime] seconds before the last beat in [beats] begins.
+        '''
+
+        if (len(self.beats) > 0):
+            begTimeStamps = self.beats['begSampleIndex'] / self.samplingFrequency
+            self.beats = self.beats[begTimeStamps >= begTimeStamps[-1] - self.maxAmountOfTime].copy()
+
+        # The samples of the kept beats and of the beats that have not ended yet are kept.
+        firstSampleIndex = self.nextBegSampleIndex
+        if (len(self.beats) > 0):
+            firstSampleIndex = min(firstSampleIndex, self.beats['begSampleIndex'][0])
+        firstSampleIndex = max(firstSampleIndex, self.bufferBegSampleIndex)
+
+        self.buffer = self.buffer[firstSampleIndex - self.bufferBegSampleIndex:].copy()
+        self.bufferBegSampleIndex = firstSampleIndex
+
+    def getListsOfBeatsObjs(self):
+        '''
+            Returns a dictionary containing, for every configuration, the list of [Beats] objects of all of the leads extracted so far,
+            in the same order as getRaggedBeatsForRecord in readData.py (i.e. the windows of the first lead first).
+        '''
+
+        listsOfBeatsObjs = {}
+        for configuration in self.configurations:
+            listsOfBeatsObjs[configuration] = []
+            for leadNum in range(len(self.recordStream.leadNames)):
+                listsOfBeatsObjs[configuration].extend(self.listsOfBeatsObjs[(leadNum, configuration)])
+
+        return listsOfBeatsObjs
@@ -0,0 +1,176 @@
+'''
+    This file contains the methods required to replay a record of a database (e.g. the MIT-BIH Arrhythmia Database) as if its
+    samples arrived in real time (or [speedup] times faster), on many concurrent streams, through a [StreamingPredictionService]
+    object (see streamingPredictor.py), and to report the latency and throughput of the predictions.
+
+    Every stream replays one lead of the record, beginning at a different sample, and its beat marks are the annotations in the
+    .atr file of the record (each of which arrives with its sample).  The latency of a prediction is the time from the arrival
+    of the last sample of its stride to the moment the prediction is returned by update, so it includes the time the prediction
+    waited for the next tick and for the windows of the other streams.
+
+    Usage: python streamReplay.py [databaseName] [patientName] [numOfStreams] [speedup] [modelFileName]
+    If no model file (see exportModel in numpyLSTM.py) is given, a model with the architecture of createModel in LSTM.py and
+    random weights is used.
+'''
+
+import sys
+import time
+
+import numpy as np
+
+import numpyLSTM
+import readData
+import wfdbReader
+from readData import CARDIAC_EVENTS
+from streamingPredictor import DEFAULT_STRIDE, StreamingPredictionService
+
+# CONSTANTS
+DEFAULT_DATABASE_NAME = readData.DATABASE_DIR + "mitdb"
+DEFAULT_PATIENT_NAME = "100"
+
+# The number of seconds of every replayed stream.
+DEFAULT_DURATION = 60.0
+
+# The number of seconds (of wall time) between two updates.
+TICK_DURATION = 0.02
+
+# The values used by the model with random weights.
+DEFAULT_TIME_WINDOW = 7.0
+DEFAULT_MAX_LENGTH_OF_BEAT = 400
+NUM_OF_UNITS = 32
+
+# The percentiles of the latencies that are reported.
+LATENCY_PERCENTILES = [50, 90, 99]
+
+def createRandomModel(numOfReadings, numOfOutcomes, seed=1337):
+    '''
+        Returns a [NumpyLSTMModel] object with the architecture of the model created by createModel in LSTM.py and random weights,
+        whose beats contain [numOfReadings] ECG readings.
+    '''
+
+    randomState = np.random.RandomState(seed)
+
+    layers = []
+    numOfInputs = numOfReadings
+    for layerIndex in range(3):
+        arrays = [('W', randomState.normal(0.0, 0.1, (numOfInputs, 4 * NUM_OF_UNITS))),
+                  ('U', randomState.normal(0.0, 0.1, (NUM_OF_UNITS, 4 * NUM_OF_UNITS))), ('b', np.zeros(4 * NUM_OF_UNITS))]
+        layers.append(({'type': 'LSTM', 'activation': 'tanh', 'innerActivation': 'hard_sigmoid', 'returnSequences': layerIndex < 2},
+                       arrays))
+        layers.append(({'type': 'Dropout'}, []))
+        numOfInputs = NUM_OF_UNITS
+
+    layers.append(({'type': 'Dense', 'activation': 'linear'}, [('W', randomState.normal(0.0, 0.1, (NUM_OF_UNITS, numOfOutcomes))),
+                                                               ('b', np.zeros(numOfOutcomes))]))
+    layers.append(({'type': 'Activation', 'activation': 'softmax'}, []))
+
+    return numpyLSTM.NumpyLSTMModel(layers)
+
+def readRecord(databaseName, patientName, leadNum=0):
+    '''
+        Returns a tuple of the form ([samplingFrequency], [ecgReadings], [beatMarks]) containing the sampling frequency, the ECG
+        readings (in millivolts) of the lead [leadNum] and the sample indices of the annotations of the record of patient
+        [patientName] in database [databaseName].
+    '''
+
+    header = wfdbReader.readHeader(databaseName, patientName)
+    (timeStamps, adcValues) = wfdbReader.getCompactECGSignalFromBinary(databaseName, patientName, header)
+
+    signal = header['signals'][leadNum]
+    ecgReadings = wfdbReader.adcToPhysical(adcValues[:, leadNum], signal['gain'], signal['baseline'], np.float32)
+
+    (sampleIndices, types, auxillaries) = wfdbReader.readAnnotations(databaseName, patientName)
+
+    return (header['samplingFrequency'], ecgReadings, np.asarray(sampleIndices, dtype=np.int64))
+
+def replay(databaseName, patientName, model, timeWindow, numOfStreams=1, speedup=1.0, duration=DEFAULT_DURATION,
+           stride=DEFAULT_STRIDE, leadNum=0):
+    '''
+        Replays [duration] seconds of the lead [leadNum] of the record of patient [patientName] in database [databaseName] on
+        [numOfStreams] streams at [speedup] times real time, predicting the windows of the last [timeWindow] seconds every
+        [stride] seconds with [model] (see getNumOfReadings in streamingPredictor.py).
+
+        Returns a dictionary containing the number of streams, samples and predictions, the wall time of the replay (in seconds),
+        the throughput (in samples and predictions per second) and the latencies of the predictions (in seconds).
+    '''
+
+    (samplingFrequency, ecgReadings, beatMarks) = readRecord(databaseName, patientName, leadNum)
+
+    numOfSamples = min(int(round(duration * samplingFrequency)), len(ecgReadings))
+    samplesPerSecond = samplingFrequency * speedup
+
+    # Every stream begins at a different sample of the record.
+    service = StreamingPredictionService(model, timeWindow, stride)
+    begSampleIndices = np.linspace(0, len(ecgReadings) - numOfSamples, numOfStreams).astype(np.int64)
+    for streamIndex in range(numOfStreams):
+        service.addStream(str(streamIndex), leadNum, samplingFrequency)
+
+    latencies = []
+    numOfFedSamples = 0
+    begTime = time.time()
+
+    while (numOfFedSamples < numOfSamples):
+        # The samples that have arrived by now.
+        numOfArrivedSamples = min(numOfSamples, int((time.time() - begTime) * samplesPerSecond))
+
+        if (numOfArrivedSamples > numOfFedSamples):
+            for streamIndex in range(numOfStreams):
+                begSampleIndex = begSampleIndices[streamIndex]
+                begMarkIndex = np.searchsorted(beatMarks, begSampleIndex + numOfFedSamples, side='left')
+                endMarkIndex = np.searchsorted(beatMarks, begSampleIndex + numOfArrivedSamples, side='left')
+
+                service.addSamples(str(streamIndex), leadNum,
+                                   ecgReadings[begSampleIndex + numOfFedSamples:begSampleIndex + numOfArrivedSamples],
+                                   beatMarks[begMarkIndex:endMarkIndex] - begSampleIndex)
+            numOfFedSamples = numOfArrivedSamples
+
+            predictions = service.update()
+            endTime = time.time()
+            for (patientName, leadName, endSampleIndex, probabilities) in predictions:
+                latencies.append(endTime - (begTime + endSampleIndex / samplesPerSecond))
+
+        # Wait for the next tick.
+        sleepTime = TICK_DURATION - (time.time() - begTime) % TICK_DURATION
+        if (numOfFedSamples < numOfSamples):
+            time.sleep(sleepTime)
+
+    wallTime = time.time() - begTime
+
+    return {'numOfStreams': numOfStreams, 'speedup': speedup, 'numOfSamples': numOfStreams * numOfSamples,
+            'numOfPredictions': len(latencies), 'wallTime': wallTime,
+            'samplesPerSecond': numOfStreams * numOfSamples / wallTime, 'predictionsPerSecond': len(latencies) / wallTime,
+            'latencies': np.array(latencies)}
+
+def getReport(results):
+    '''
+        Returns a string describing [results], the dictionary returned by replay.
+    '''
+
+    report = 'Streams: ' + str(results['numOfStreams']) + ' at ' + str(results['speedup']) + 'x real time\n'
+    report = report + 'Samples: ' + str(results['numOfSamples']) + ', Predictions: ' + str(results['numOfPredictions']) + \
+             ' in ' + ('%.2f' % results['wallTime']) + ' s\n'
+    report = report + 'Throughput: ' + ('%.0f' % results['samplesPerSecond']) + ' samples/s, ' + \
+             ('%.1f' % results['predictionsPerSecond']) + ' predictions/s\n'
+
+    latencies = results['latencies']
+    if (len(latencies) > 0):
+        report = report + 'Latency (ms): ' + ', '.join(['p' + str(percentile) + ' ' + ('%.2f' % (1000 * np.percentile(latencies, percentile)))
+                                                         for percentile in LATENCY_PERCENTILES])
+        report = report + ', max ' + ('%.2f' % (1000 * np.max(latencies))) + '\n'
+
+    return report
+
+if __name__ == '__main__':
+    arguments = sys.argv[1:]
+
+    databaseName = arguments[0] if (len(arguments) > 0) else DEFAULT_DATABASE_NAME
+    patientName = arguments[1] if (len(arguments) > 1) else DEFAULT_PATIENT_NAME
+    numOfStreams = int(arguments[2]) if (len(arguments) > 2) else 1
+    speedup = float(arguments[3]) if (len(arguments) > 3) else 1.0
+
+    if (len(arguments) > 4):
+        model = numpyLSTM.NumpyLSTMModel.load(arguments[4])
+    else:
+        model = createRandomModel(DEFAULT_MAX_LENGTH_OF_BEAT, len(CARDIAC_EVENTS))
+
+    print (getReport(replay(databaseName, patientName, model, DEFAULT_TIME_WINDOW, numOfStreams, speedup)))
@@ -0,0 +1,275 @@
+'''
+    This file contains the definitions of the class 'StreamingPredictor', each object of which predicts the cardiac events
+    that follow the ECG signal of one lead of one patient while the samples of the signal arrive, and of the class
+    'StreamingPredictionService', each object of which runs the [StreamingPredictor] objects of many patients and leads and
+    computes their predictions in batches.
+
+    The samples of a lead (in millivolts) and the beat marks (the indices of the samples at which the annotations of the beats,
+    e.g. those in the .atr file of a record, or those of a QRS detector, are placed) are passed as they arrive.  As in
+    fromAnnotations in annotations.py, every mark ends the beat that began at the previous mark, and a beat is complete once
+    its last sample has arrived.
+
+    Every [stride] seconds (of the signal), the complete beats of the last [timeWindow] seconds form a window, exactly like the
+    windows of the [Beats] objects that the model was trained on (see getIndicesOfWindows in ecgReading.py): the window
+    contains every beat that begins at most [timeWindow] seconds before, and ends before, the end of the stride.  The model
+    predicts the probability of every cardiac event in [CARDIAC_EVENTS] (see readData.py) from the window.  The window of a
+    stride that ends at sample E is only built once sample E (and therefore the mark at E, which ends the beat whose last
+    sample is E - 1) has arrived, so the windows do not depend on how the samples are divided into calls of addSamples.
+
+    Only the samples of the beats that can still be in a window are kept, so the memory and the work of every update are
+    bounded by the number of beats in [timeWindow] seconds.  The windows of all of the streams that are due at an update are
+    predicted together, in one batch for every number of beats, so no window is padded with beats (which would change its
+    prediction, since the model does not mask padding).
+'''
+
+import collections
+
+import numpy as np
+
+from readData import CARDIAC_EVENTS
+
+# CONSTANTS
+
+# The number of seconds of the signal between two predictions.
+DEFAULT_STRIDE = 1.0
+
+# The type of the elements of the windows fed to the model (Keras computes in 32-bit floats).
+DEFAULT_DTYPE = np.float32
+
+# The initial number of samples that the buffer of a [StreamingPredictor] object can hold.
+INITIAL_BUFFER_SIZE = 2 ** 12
+
+def getNumOfReadings(model):
+    '''
+        Returns the number of ECG readings in every beat fed to [model] (a model created by createModel in LSTM.py or a
+        [NumpyLSTMModel] object, see numpyLSTM.py), i.e. the number of inputs of its first layer.
+    '''
+
+    if (hasattr(model, 'input_shape')):
+        return model.input_shape[-1]
+
+    for layer in model.layers:
+        if ('W' in layer):
+            return layer['W'].shape[0]
+
+    raise ValueError('The number of inputs of the model is unknown.')
+
+def getProbabilitiesDict(probabilities):
+    '''
+        Returns a dictionary containing the probability in [probabilities] (a row of the predictions of the model) of every
+        cardiac event in [CARDIAC_EVENTS].
+    '''
+
+    return dict(zip(CARDIAC_EVENTS, [float(probability) for probability in probabilities]))
+
+class StreamingPredictor(object):
+
+    def __init__(self, samplingFrequency, timeWindow, maxLengthOfBeat, stride=DEFAULT_STRIDE, dtype=DEFAULT_DTYPE):
+        '''
+            Creates an object of class [StreamingPredictor], which builds a window of the beats of the last [timeWindow] seconds
+            every [stride] seconds from the samples of a signal sampled at [samplingFrequency] Hz.  Every beat of a window is
+            padded (at the beginning, as in toPadded in raggedBeats.py) to [maxLengthOfBeat] ECG readings; the last
+            [maxLengthOfBeat] ECG readings of longer beats are kept.
+        '''
+
+        self.samplingFrequency = float(samplingFrequency)
+        self.timeWindow = timeWindow
+        self.maxLengthOfBeat = maxLengthOfBeat
+        self.dtype = dtype
+
+        self.strideInSamples = max(1, int(round(stride * self.samplingFrequency)))
+        self.windowInSamples = int(round(timeWindow * self.samplingFrequency))
+
+        # The samples that have arrived, beginning with the sample whose index is [bufferBegSampleIndex].
+        self.buffer = np.zeros(INITIAL_BUFFER_SIZE, dtype=dtype)
+        self.bufferBegSampleIndex = 0
+        self.numOfSamples = 0
+
+        # The marks that do not end a complete beat yet and the complete beats, as tuples of the form ([begSampleIndex],
+        # [endSampleIndex]).
+        self.lastMark = None
+        self.pendingMarks = collections.deque()
+        self.beats = collections.deque()
+
+        # The index of the sample that ends the next stride.
+        self.nextEndSampleIndex = self.windowInSamples
+
+    def addSamples(self, ecgReadings, beatMarks=()):
+        '''
+            Appends [ecgReadings] (the next samples of the signal, in millivolts) and [beatMarks] (the indices of the samples of
+            the marks that have arrived, in increasing order) to the stream.
+        '''
+
+        for beatMark in beatMarks:
+            self.pendingMarks.append(int(beatMark))
+
+        ecgReadings = np.asarray(ecgReadings, dtype=self.dtype)
+        if (len(ecgReadings) > 0):
+            self.discardOldSamples()
+            self.reserve(len(ecgReadings))
+
+            begIndex = self.numOfSamples - self.bufferBegSampleIndex
+            self.buffer[begIndex:begIndex + len(ecgReadings)] = ecgReadings
+            self.numOfSamples = self.numOfSamples + len(ecgReadings)
+
+        # Every mark whose previous sample has arrived ends a complete beat.
+        while (len(self.pendingMarks) > 0 and self.pendingMarks[0] <= self.numOfSamples):
+            beatMark = self.pendingMarks.popleft()
+            if (self.lastMark is not None and beatMark > self.lastMark):
+                self.beats.append((self.lastMark, beatMark - 1))
+            self.lastMark = beatMark
+
+    def reserve(self, numOfNewSamples):
+        '''
+            Makes sure that [numOfNewSamples] more samples fit into [buffer].
+        '''
+
+        numOfBufferedSamples = self.numOfSamples - self.bufferBegSampleIndex
+        if (numOfBufferedSamples + numOfNewSamples <= len(self.buffer)):
+            return
+
+        buffer = np.zeros(max(2 * len(self.buffer), numOfBufferedSamples + numOfNewSamples), dtype=self.dtype)
+        buffer[:numOfBufferedSamples] = self.buffer[:numOfBufferedSamples]
+        self.buffer = buffer
+
+    def discardOldSamples(self):
+        '''
+            Discards the beats that begin before the window of the next stride, and the samples that no complete or future beat
+            contains.
+        '''
+
+        windowBegSampleIndex = self.nextEndSampleIndex - self.windowInSamples
+        while (len(self.beats) > 0 and self.beats[0][0] < windowBegSampleIndex):
+            self.beats.popleft()
+
+        if (len(self.beats) > 0):
+            firstSampleIndex = self.beats[0][0]
+        elif (self.lastMark is not None):
+            firstSampleIndex = self.lastMark
+        else:
+            firstSampleIndex = self.numOfSamples
+        firstSampleIndex = min(max(firstSampleIndex, self.bufferBegSampleIndex), self.numOfSamples)
+
+        numOfDiscardedSamples = firstSampleIndex - self.bufferBegSampleIndex
+        if (numOfDiscardedSamples > 0):
+            numOfBufferedSamples = self.numOfSamples - firstSampleIndex
+            self.buffer[:numOfBufferedSamples] = self.buffer[numOfDiscardedSamples:numOfDiscardedSamples + numOfBufferedSamples]
+            self.bufferBegSampleIndex = firstSampleIndex
+
+    def getWindow(self, endSampleIndex):
+        '''
+            Returns a (number of beats) x [maxLengthOfBeat] numpy array containing the ECG readings of the complete beats that begin
+            at most [windowInSamples] samples before, and end before, the sample whose index is [endSampleIndex].
+        '''
+
+        begSampleIndex = endSampleIndex - self.windowInSamples
+        beats = [beat for beat in self.beats if (beat[0] >= begSampleIndex and beat[1] < endSampleIndex)]
+
+        window = np.zeros((len(beats), self.maxLengthOfBeat), dtype=self.dtype)
+        for (beatIndex, (beatBegSampleIndex, beatEndSampleIndex)) in enumerate(beats):
+            beatBegSampleIndex = max(beatBegSampleIndex, beatEndSampleIndex + 1 - self.maxLengthOfBeat)
+            ecgReadings = self.buffer[beatBegSampleIndex - self.bufferBegSampleIndex:beatEndSampleIndex + 1 - self.bufferBegSampleIndex]
+            window[beatIndex, self.maxLengthOfBeat - len(ecgReadings):] = ecgReadings
+
+        return window
+
+    def getDueWindows(self):
+        '''
+            Returns a list of tuples of the form ([endSampleIndex], [window]) containing the window (see getWindow) of every stride
+            whose end sample (and the mark at it, if any) has arrived since the last call, except for the windows without any
+            beats.
+        '''
+
+        windows = []
+        while (self.numOfSamples > self.nextEndSampleIndex):
+            window = self.getWindow(self.nextEndSampleIndex)
+            if (len(window) > 0):
+                windows.append((self.nextEndSampleIndex, window))
+
+            self.nextEndSampleIndex = self.nextEndSampleIndex + self.strideInSamples
+
+        self.discardOldSamples()
+        return windows
+
+    def predict(self, model):
+        '''
+            Returns a list of tuples of the form ([endSampleIndex], [probabilities]) containing the predictions of [model] (see
+            getNumOfReadings) for the windows returned by getDueWindows.
+        '''
+
+        return [(endSampleIndex, model.predict_on_batch(window[np.newaxis])[0]) for (endSampleIndex, window) in self.getDueWindows()]
+
+class StreamingPredictionService(object):
+
+    def __init__(self, model, timeWindow, stride=DEFAULT_STRIDE, maxLengthOfBeat=None, dtype=DEFAULT_DTYPE):
+        '''
+            Creates an object of class [StreamingPredictionService], which predicts the windows of the last [timeWindow] seconds of
+            every stream every [stride] seconds with [model] (see getNumOfReadings), every beat of which is padded to
+            [maxLengthOfBeat] ECG readings (or to the number of inputs of [model], if it is None).
+        '''
+
+        if (maxLengthOfBeat is None):
+            maxLengthOfBeat = getNumOfReadings(model)
+
+        self.model = model
+        self.timeWindow = timeWindow
+        self.stride = stride
+        self.maxLengthOfBeat = maxLengthOfBeat
+        self.dtype = dtype
+
+        # Contains the [StreamingPredictor] object of every tuple of the form ([patientName], [leadName]).
+        self.streams = collections.OrderedDict()
+
+    def addStream(self, patientName, leadName, samplingFrequency):
+        '''
+            Adds the stream of the lead [leadName] of patient [patientName], which is sampled at [samplingFrequency] Hz.
+        '''
+
+        self.streams[(patientName, leadName)] = StreamingPredictor(samplingFrequency, self.timeWindow, self.maxLengthOfBeat, self.stride,
+                                                                   self.dtype)
+
+    def removeStream(self, patientName, leadName):
+        del self.streams[(patientName, leadName)]
+
+    def addSamples(self, patientName, leadName, ecgReadings, beatMarks=()):
+        '''
+            Appends [ecgReadings] and [beatMarks] to the stream of the lead [leadName] of patient [patientName] (see addSamples in
+            the class [StreamingPredictor]).
+        '''
+
+        self.streams[(patientName, leadName)].addSamples(ecgReadings, beatMarks)
+
+    def update(self):
+        '''
+            Returns a list of tuples of the form ([patientName], [leadName], [endSampleIndex], [probabilities]) containing the
+            predictions of the model for the windows of all of the strides that have ended in any stream since the last call.  The
+            windows with the same number of beats are predicted in one batch.
+        '''
+
+        windowsByNumOfBeats = collections.defaultdict(list)
+        for ((patientName, leadName), stream) in self.streams.items():
+            for (endSampleIndex, window) in stream.getDueWindows():
+                windowsByNumOfBeats[len(window)].append((patientName, leadName, endSampleIndex, window))
+
+        predictions = []
+        for numOfBeats in sorted(windowsByNumOfBeats):
+            windows = windowsByNumOfBeats[numOfBeats]
+            rawPredictedY = self.model.predict_on_batch(np.stack([window for (patientName, leadName, endSampleIndex, window) in windows]))
+
+            for ((patientName, leadName, endSampleIndex, window), probabilities) in zip(windows, rawPredictedY):
+                predictions.append((patientName, leadName, endSampleIndex, probabilities))
+
+        return predictions
+
+    def __len__(self):
+        return len(self.streams)
+
+    def __str__(self):
+        # Heading
+        str1 = ' ****** STREAMING PREDICTION SERVICE OBJECT ********* \n \n'
+
+        str1 = str1 + 'Number of Streams: ' + str(len(self)) + '\n'
+        str1 = str1 + 'Time Window: ' + str(self.timeWindow) + ', Stride: ' + str(self.stride) + '\n'
+        str1 = str1 + 'Readings per Beat: ' + str(self.maxLengthOfBeat) + '\n\n'
+
+        return str1
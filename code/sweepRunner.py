@@ -0,0 +1,331 @@
+'''
+    This file contains the methods required to run the sweep of main.py, i.e. to create, train and evaluate an LSTM model for
+    every pair of values of [amountOfTimeBeforeBeg] and [timeWindow] (a "cell" of the sweep), in parallel and so that an
+    interrupted sweep can be resumed.
+
+    The cells are run by a pool of [numOfWorkers] processes.  Every process limits the number of threads used by the libraries
+    it loads (Keras, Theano and the BLAS and OpenMP libraries they use) to its share of the cores (see threadBudget.py), so the
+    processes do not oversubscribe the cores.  Keras is only imported by the processes that run the cells.  The libraries that
+    were already loaded when the processes were forked (e.g. the OpenBLAS library loaded by numpy) no longer read the
+    environment variables, so main.py sets them before it imports numpy.
+
+    As soon as a cell is completed, its result is appended to the journal, a file in which every line is a JSON dictionary of
+    the form:
+        * 'key' - the key of the cell (see getCellKey).
+        * 'amountOfTimeBeforeBeg', 'timeWindow' - the values of the cell.
+        * 'sensitivity', 'specificity' - the values returned by runModel (or runModelOnBatches) in LSTM.py.
+        * 'verbose' - everything the cell wrote to the verbose results file.
+        * 'seconds' - the number of seconds the cell took.
+    Every line is flushed to disk before the next cell is journaled, so at most the line being written when the sweep is
+    interrupted is lost (and it is ignored by readJournal).  A cell is only run again if the journal contains no result with
+    its key, and the results files written by writeResults are built from the journal alone.
+'''
+
+import hashlib
+import json
+import multiprocessing
+import os
+import pickle
+import random
+import time
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import numpy as np
+
+import datasetCache
+from threadBudget import THREADS_PER_WORKER, setThreadBudget
+
+# CONSTANTS
+JOURNAL_FILE_NAME = '../results/sweepJournal.jsonl'
+
+OVERVIEW_FILE_NAME = '../results/resultsOverview.txt'
+VERBOSE_FILE_NAME = '../results/resultsVerbose.txt'
+SENSITIVITIES_FILE_NAME = '../results/sensitivities.pickle'
+SPECIFICITIES_FILE_NAME = '../results/specificities.pickle'
+
+# The source files whose contents determine the result of a cell (besides the [Beats] objects, see datasetCache.py).
+MODEL_SOURCE_CODE_FILES = ['LSTM.py', 'prepareForLSTM.py', 'batchGenerator.py', 'metrics.py']
+
+# The number of processes that run cells (see [THREADS_PER_WORKER] in threadBudget.py).
+NUM_OF_WORKERS = max(1, multiprocessing.cpu_count() // THREADS_PER_WORKER)
+
+# The seed of the random number generators of the first cell (the seed of the n-th cell is SEED + n - 1).
+SEED = 1337
+
+def getModelFingerprint():
+    '''
+        Returns a string that changes whenever one of the source files in [MODEL_SOURCE_CODE_FILES] changes.
+    '''
+
+    sha = hashlib.sha1()
+
+    codeDir = os.path.dirname(os.path.abspath(__file__))
+    for sourceCodeFile in MODEL_SOURCE_CODE_FILES:
+        f = open(os.path.join(codeDir, sourceCodeFile), 'rb')
+        sha.update(f.read())
+        f.close()
+
+    return sha.hexdigest()
+
+def getCellKey(amountOfTimeBeforeBeg, timeWindow, sourceFingerprint, modelFingerprint, useBatches, seed):
+    '''
+        Returns the key (a hexadecimal string) of the cell ([amountOfTimeBeforeBeg], [timeWindow]), which changes whenever its
+        [Beats] objects (see getCacheKey in datasetCache.py), the model, the way the windows are fed to the model ([useBatches])
+        or the seed of the random number generators change.
+    '''
+
+    parameters = [datasetCache.getCacheKey(amountOfTimeBeforeBeg, timeWindow, sourceFingerprint), modelFingerprint, useBatches, seed]
+    return hashlib.sha1(json.dumps(parameters).encode('utf-8')).hexdigest()
+
+def readJournal(journalFileName=JOURNAL_FILE_NAME):
+    '''
+        Returns a dictionary containing the result (see the documentation at the top of this file) of every cell in the journal
+        [journalFileName], indexed by the key of the cell.  Lines that are not complete JSON dictionaries (i.e. a line that was
+        being written when the sweep was interrupted) are ignored.
+    '''
+
+    results = {}
+    if (not os.path.isfile(journalFileName)):
+        return results
+
+    f = open(journalFileName, 'r')
+    for line in f:
+        try:
+            result = json.loads(line)
+        except ValueError:
+            continue
+
+        if (isinstance(result, dict) and 'key' in result):
+            results[result['key']] = result
+    f.close()
+
+    return results
+
+def appendToJournal(journalFile, result):
+    '''
+        Appends [result] to [journalFile], the open journal, and flushes it to disk.
+    '''
+
+    journalFile.write(json.dumps(result) + '\n')
+    journalFile.flush()
+    os.fsync(journalFile.fileno())
+
+def endsWithNewline(fileName):
+    '''
+        Returns True if and only if the last character of the (non-empty) file [fileName] is a newline.
+    '''
+
+    f = open(fileName, 'rb')
+    f.seek(-1, os.SEEK_END)
+    lastCharacter = f.read(1)
+    f.close()
+
+    return lastCharacter == b'\n'
+
+def initWorker(numOfThreads):
+    '''
+        Initializes a process of the pool that runs the cells, so that the libraries the process loads (e.g. Keras and Theano)
+        use at most [numOfThreads] threads.
+    '''
+
+    setThreadBudget(numOfThreads)
+
+def runCell(cell):
+    '''
+        Creates, trains and evaluates an LSTM model for the cell [cell], a dictionary containing the values 'key',
+        'amountOfTimeBeforeBeg', 'timeWindow', 'sourceFingerprint', 'useBatches' and 'seed', on the [Beats] objects saved by
+        datasetCache.py, and returns its result (see the documentation at the top of this file).
+    '''
+
+    # Keras is only imported here, after the thread budget of the process has been set.
+    from LSTM import runModel, runModelOnBatches
+    from prepareForLSTM import divideIntoTrainingAndTesting, divideIndicesIntoTrainingAndTesting, convertIntoNumpyArrays
+
+    begTime = time.time()
+
+    amountOfTimeBeforeBeg = cell['amountOfTimeBeforeBeg']
+    timeWindow = cell['timeWindow']
+    sourceFingerprint = cell['sourceFingerprint']
+
+    random.seed(cell['seed'])
+    np.random.seed(cell['seed'])
+
+    verboseFile = StringIO()
+    verboseFile.write('**************************************************************\n')
+    verboseFile.write('Amount of time before beginning: ' + str(amountOfTimeBeforeBeg) + '\n')
+    verboseFile.write('Time Window: ' + str(timeWindow) + '\n')
+    verboseFile.write('**************************************************************\n\n')
+
+    # The fraction of the [Beats] objects that should be a part of the training data.
+    trainingFract = 0.5
+
+    if (cell['useBatches']):
+        raggedBeats = datasetCache.loadRaggedBeats(amountOfTimeBeforeBeg, timeWindow, sourceFingerprint)
+        (trainingIndices, testingIndices) = divideIndicesIntoTrainingAndTesting(raggedBeats.cardiacEvents, trainingFract)
+        (sensitivity, specificity) = runModelOnBatches(raggedBeats, trainingIndices, testingIndices, raggedBeats.getMaxNumOfBeats(),
+                                                       raggedBeats.getMaxLengthOfBeat(), verboseFile)
+    else:
+        listOfBeatsObjs = datasetCache.loadListOfBeatsObjs(amountOfTimeBeforeBeg, timeWindow, sourceFingerprint)
+        (trainingObjs, testingObjs) = divideIntoTrainingAndTesting(listOfBeatsObjs, trainingFract)
+        (trainingX, trainingY, testingX, testingY) = convertIntoNumpyArrays(listOfBeatsObjs, trainingObjs, testingObjs)
+        (sensitivity, specificity) = runModel(trainingX, trainingY, testingX, testingY, verboseFile)
+
+    return {'key': cell['key'], 'amountOfTimeBeforeBeg': float(amountOfTimeBeforeBeg), 'timeWindow': float(timeWindow),
+            'sensitivity': float(sensitivity), 'specificity': float(specificity), 'verbose': verboseFile.getvalue(),
+            'seconds': time.time() - begTime}
+
+def getCells(timeBefores, timeWindows, sourceFingerprint, useBatches):
+    '''
+        Returns a list containing the cell (see runCell) of every pair of values in [timeBefores] and [timeWindows], in the order
+        of main.py (i.e. row by row).
+    '''
+
+    modelFingerprint = getModelFingerprint()
+
+    cells = []
+    for amountOfTimeBeforeBeg in timeBefores:
+        for timeWindow in timeWindows:
+            seed = SEED + len(cells)
+            key = getCellKey(amountOfTimeBeforeBeg, timeWindow, sourceFingerprint, modelFingerprint, useBatches, seed)
+            cells.append({'key': key, 'amountOfTimeBeforeBeg': float(amountOfTimeBeforeBeg), 'timeWindow': float(timeWindow),
+                          'sourceFingerprint': sourceFingerprint, 'useBatches': useBatches, 'seed': seed})
+
+    return cells
+
+def runSweep(timeBefores, timeWindows, sourceFingerprint, useBatches, journalFileName=JOURNAL_FILE_NAME, numOfWorkers=None):
+    '''
+        Runs every cell of the sweep over [timeBefores] and [timeWindows] that is not in the journal [journalFileName] yet, by
+        [numOfWorkers] processes in parallel (by [NUM_OF_WORKERS] processes if [numOfWorkers] is None, and without any additional
+        processes if it is 1), and appends the result of every cell to the journal as soon as it is completed.
+
+        The [Beats] objects of every cell must have been saved by datasetCache.py.
+
+        Returns the list of cells of the sweep (see getCells).
+    '''
+
+    if (numOfWorkers is None):
+        numOfWorkers = NUM_OF_WORKERS
+
+    cells = getCells(timeBefores, timeWindows, sourceFingerprint, useBatches)
+    results = readJournal(journalFileName)
+    missingCells = [cell for cell in cells if cell['key'] not in results]
+
+    total = len(cells)
+    count = total - len(missingCells)
+    if (count > 0):
+        print ('Skipping ' + str(count) + ' sets that are already in ' + journalFileName)
+
+    if (len(missingCells) == 0):
+        return cells
+
+    journalDirName = os.path.dirname(journalFileName)
+    if (journalDirName != '' and not os.path.isdir(journalDirName)):
+        os.makedirs(journalDirName)
+
+    if (numOfWorkers > 1 and len(missingCells) > 1):
+        numOfWorkers = min(numOfWorkers, len(missingCells))
+        numOfThreads = max(1, multiprocessing.cpu_count() // numOfWorkers)
+        pool = multiprocessing.Pool(numOfWorkers, initWorker, (numOfThreads,))
+        newResults = pool.imap_unordered(runCell, missingCells)
+    else:
+        pool = None
+        newResults = (runCell(cell) for cell in missingCells)
+
+    journalFile = open(journalFileName, 'a')
+
+    # If the sweep was interrupted while a line was being written, the next line begins on a new line.
+    if (journalFile.tell() > 0 and not(endsWithNewline(journalFileName))):
+        journalFile.write('\n')
+
+    try:
+        for result in newResults:
+            appendToJournal(journalFile, result)
+
+            count = count + 1
+            print ('*********************************************')
+            print ('Completed set of ' + str(count) + ' \ ' + str(total) + ' (amount of time before beginning: ' +
+                   str(result['amountOfTimeBeforeBeg']) + ', time window: ' + str(result['timeWindow']) + ')')
+            print ('*********************************************')
+    finally:
+        journalFile.close()
+
+        if (pool is not None):
+            pool.terminate()
+            pool.join()
+
+    return cells
+
+def getResults(timeBefores, timeWindows, cells, journalFileName=JOURNAL_FILE_NAME):
+    '''
+        Returns a tuple of the form ([sensitivities], [specificities], [verbose]), where [sensitivities] and [specificities] are
+        numpy arrays containing the sensitivity and specificity of every cell in [cells] (one row for every value in [timeBefores]
+        and one column for every value in [timeWindows]) and [verbose] is everything the cells wrote to the verbose results file,
+        in the order of [cells].  The results are read from the journal [journalFileName], which must contain every cell.
+    '''
+
+    results = readJournal(journalFileName)
+
+    sensitivities = np.empty((len(timeBefores), len(timeWindows)), dtype = float)
+    specificities = np.empty((len(timeBefores), len(timeWindows)), dtype = float)
+    verbose = []
+
+    for (cellIndex, cell) in enumerate(cells):
+        result = results[cell['key']]
+        (timeBeforeIndex, timeWindowIndex) = divmod(cellIndex, len(timeWindows))
+
+        sensitivities[timeBeforeIndex][timeWindowIndex] = result['sensitivity']
+        specificities[timeBeforeIndex][timeWindowIndex] = result['specificity']
+        verbose.append(result['verbose'])
+
+    return (sensitivities, specificities, ''.join(verbose))
+
+def writeResults(timeBefores, timeWindows, cells, journalFileName=JOURNAL_FILE_NAME):
+    '''
+        Writes the overview and verbose results files and the pickled sensitivities and specificities of the sweep over
+        [timeBefores] and [timeWindows] (whose cells are [cells]) from the journal [journalFileName].
+    '''
+
+    (sensitivities, specificities, verbose) = getResults(timeBefores, timeWindows, cells, journalFileName)
+
+    verboseFile = open(VERBOSE_FILE_NAME, 'w')
+    verboseFile.write(verbose)
+    verboseFile.close()
+
+    overviewFile = open(OVERVIEW_FILE_NAME, 'w')
+
+    # Print sensitivity
+    overviewFile.write('Each column represents a different time window and each row represents a different time before beginning of cardiac event.  The first row and column contain the values of these variables.\n\n')
+
+    np.set_printoptions(precision=3)
+
+    # Print timeWindows.
+    overviewFile.write('***********************\nTime Windows\n**********************\n\n')
+    overviewFile.write(str(timeWindows))
+    overviewFile.write('\n\n')
+
+    # Print timeBefores.
+    overviewFile.write('*************************\nTime Before Beginning of Cardiac Event\n************************\n\n')
+    overviewFile.write(str(timeBefores))
+    overviewFile.write('\n\n')
+
+    # Print specificity.
+    overviewFile.write('*************************\nSensitivity\n************************\n\n')
+    overviewFile.write(str(specificities))
+    overviewFile.write('\n\n')
+
+    # Print sensitivity.
+    overviewFile.write('*************************\nSpecificity\n************************\n\n')
+    overviewFile.write(str(sensitivities))
+    overviewFile.write('\n\n')
+
+    overviewFile.close()
+
+    with open(SENSITIVITIES_FILE_NAME, 'w') as f:
+        pickle.dump([sensitivities], f)
+
+    with open(SPECIFICITIES_FILE_NAME, 'w') as f:
+        pickle.dump([specificities], f)
@@ -0,0 +1,26 @@
+'''
+    This file contains the methods required to limit the number of threads used by the numerical libraries (the BLAS and
+    OpenMP libraries used by numpy, Keras and Theano).
+
+    These libraries only read the environment variables in [THREAD_ENV_VARS] when they are loaded, so setThreadBudget has to
+    be called before they are first imported.  This file does not import any of them, so that main.py can import it (and
+    call setThreadBudget) before anything else.
+'''
+
+import os
+
+# CONSTANTS
+
+# The environment variables that limit the number of threads of the numerical libraries.
+THREAD_ENV_VARS = ['OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS']
+
+# The number of threads of every process that runs cells of the sweep (see sweepRunner.py).
+THREADS_PER_WORKER = 2
+
+def setThreadBudget(numOfThreads):
+    '''
+        Limits the number of threads of the numerical libraries loaded by the current process after this call to [numOfThreads].
+    '''
+
+    for envVar in THREAD_ENV_VARS:
+        os.environ[envVar] = str(numOfThreads)
@@ -0,0 +1,455 @@
+'''
+    This file contains the methods required to read the ECG data and annotations contained within
+    the .atr, .dat, and .hea files directly, without first converting them into text files with the
+    rdsamp and rdann WFDB commands.
+
+    Three types of files are read:
+        (1) [patientName].hea
+            The header file, which describes the number of leads, the sampling frequency, the number of
+            samples, and for each lead the name of the file containing its samples, the format of that file,
+            the gain and baseline required to convert the raw ADC values into millivolts, and the lead name.
+
+        (2) [patientName].dat
+            The signal file, which contains the raw ADC values of all of the leads.  Format 212 (two 12-bit
+            samples packed into three bytes) is used by the MIT-BIH databases, but formats 16 and 80 are also
+            supported.
+
+        (3) [patientName].atr
+            The annotation file, which contains the reference beat and rhythm annotations in the MIT format.
+
+    The formats of these files are explained online at the following websites:
+    https://www.physionet.org/physiotools/wag/header-5.htm
+    https://www.physionet.org/physiotools/wag/signal-5.htm
+    https://www.physionet.org/physiotools/wag/annot-5.htm
+
+    The methods getBeatsFromAtr, getECGSignalFromBinary and getLeadNamesFromHea return exactly the same
+    structures as the methods getBeatsFromAnn, getECGSignalFromDat and getLeadNames in readData.py, which
+    read the text files produced by rdsamp and rdann.
+
+    The method getCompactECGSignalFromBinary instead returns the raw 16-bit ADC values, which take a quarter
+    of the memory of the ECG readings in millivolts and can be converted into millivolts by adcToPhysical.
+'''
+
+import os
+import numpy as np
+
+# CONSTANTS
+HEADER_EXTENSION = ".hea"
+ANNOTATOR_EXTENSION = ".atr"
+
+# The gain that is assumed by the WFDB library if the header file does not specify one.
+DEFAULT_GAIN = 200.0
+
+# The value of a 12-bit sample (format 212) that marks an invalid sample.
+INVALID_SAMPLE_212 = -2048
+
+# The value that marks an invalid sample in the raw ADC values returned by getCompactECGSignalFromBinary
+# (the same value that marks an invalid sample in format 16).
+INVALID_ADC_VALUE = -32768
+
+# Codes of the special "pseudo-annotations" in an MIT format annotation file.  These modify the
+# annotation that precedes them (or, in the case of SKIP, the time of the annotation that follows them).
+SKIP = 59
+NUM = 60
+SUB = 61
+CHN = 62
+AUX = 63
+
+# Codes of the annotations that can appear in the header of an annotation file.
+NOTE = 22
+
+# The mnemonics of the annotation codes, in the order of their codes, as printed by rdann.  The meanings
+# of these mnemonics are explained online at the following website:
+# https://www.physionet.org/physiobank/annotations.shtml
+ANNOTATION_MNEMONICS = [' ', 'N', 'L', 'R', 'a', 'V', 'F', 'J', 'A', 'S',
+                        'E', 'j', '/', 'Q', '~', '[15]', '|', '[17]', 's', 'T',
+                        '*', 'D', '"', '=', 'p', 'B', '^', 't', '+', 'u',
+                        '?', '!', '[', ']', 'e', 'n', '@', 'x', 'f', '(',
+                        ')', 'r', '[42]', '[43]', '[44]', '[45]', '[46]', '[47]', '[48]', '[49]']
+
+def readHeader(databaseName, patientName):
+    '''
+        Reads the header file associated with the ECG signal for patient [patientName] in database [databaseName]
+        and returns a dictionary with the following keys:
+            * 'numOfSignals'      - the number of leads.
+            * 'samplingFrequency' - the number of samples per second (per lead).
+            * 'numOfSamples'      - the number of samples (per lead), or None if the header does not specify it.
+            * 'signals'           - a list containing one dictionary per lead, in the order in which the leads
+                                    are described in the header file.  Each of these dictionaries has the keys
+                                    'fileName', 'format', 'byteOffset', 'gain', 'baseline', 'units', 'adcZero'
+                                    and 'leadName'.
+    '''
+
+    fullFileName = os.path.join(databaseName, patientName) + HEADER_EXTENSION
+
+    f = open(fullFileName, 'r')
+    lines = [line.strip() for line in f if line.strip() != '' and not line.strip().startswith('#')]
+    f.close()
+
+    # The first line is the record line: "[recordName] [numOfSignals] [samplingFrequency] [numOfSamples] ...".
+    recordLine = lines[0].split()
+    if ('/' in recordLine[0]):
+        raise ValueError('Multi-segment records are not supported: ' + fullFileName)
+
+    numOfSignals = int(recordLine[1])
+
+    samplingFrequency = 250.0
+    if (len(recordLine) > 2):
+        # The sampling frequency may be followed by a counter frequency and a base counter value,
+        # e.g. "360/360(0)".
+        samplingFrequency = float(recordLine[2].split('/')[0].split('(')[0])
+
+    numOfSamples = None
+    if (len(recordLine) > 3):
+        numOfSamples = int(recordLine[3])
+
+    # The remaining lines are the signal specification lines, one per lead:
+    # "[fileName] [format] [gain(baseline)/units] [adcResolution] [adcZero] [initialValue] [checksum] [blockSize] [description]"
+    signals = []
+    for line in lines[1:numOfSignals + 1]:
+        fields = line.split()
+
+        # The format may be followed by the number of samples per frame, the skew and the byte offset,
+        # e.g. "212x1:0+0".
+        formatField = fields[1]
+        byteOffset = 0
+        if ('+' in formatField):
+            formatField, byteOffset = formatField.split('+')
+            byteOffset = int(byteOffset)
+        if (':' in formatField):
+            formatField = formatField.split(':')[0]
+        if ('x' in formatField):
+            formatField, samplesPerFrame = formatField.split('x')
+            if (int(samplesPerFrame) != 1):
+                raise ValueError('Multi-frequency records are not supported: ' + fullFileName)
+
+        adcZero = 0
+        if (len(fields) > 4):
+            adcZero = int(fields[4])
+
+        gain = DEFAULT_GAIN
+        baseline = adcZero
+        units = 'mV'
+        if (len(fields) > 2):
+            gainField = fields[2]
+            if ('/' in gainField):
+                gainField, units = gainField.split('/')
+            if ('(' in gainField):
+                gainField, baselineField = gainField.split('(')
+                baseline = int(baselineField.rstrip(')'))
+            if (float(gainField) != 0):
+                gain = float(gainField)
+
+        leadName = ''
+        if (len(fields) > 8):
+            leadName = ' '.join(fields[8:])
+
+        signals.append({'fileName': fields[0],
+                        'format': int(formatField),
+                        'byteOffset': byteOffset,
+                        'gain': gain,
+                        'baseline': baseline,
+                        'units': units,
+                        'adcZero': adcZero,
+                        'leadName': leadName})
+
+    return {'numOfSignals': numOfSignals,
+            'samplingFrequency': samplingFrequency,
+            'numOfSamples': numOfSamples,
+            'signals': signals}
+
+def decodeFormat212(rawBytes, numOfValues):
+    '''
+        Decodes the first [numOfValues] 12-bit samples packed into the numpy array of bytes [rawBytes] in format 212,
+        in which every pair of samples is stored in three bytes, and returns them as a numpy array of 16-bit integers.
+
+        The first sample of a pair consists of the 8 bits of the first byte (least significant) and the 4 least
+        significant bits of the second byte (most significant).  The second sample of a pair consists of the 8 bits
+        of the third byte (least significant) and the 4 most significant bits of the second byte (most significant).
+    '''
+
+    numOfTriplets = (numOfValues + 1) // 2
+
+    # Pad the bytes so that they divide evenly into triplets (the last triplet of a signal file containing an
+    # odd number of samples only contains two bytes).
+    triplets = np.zeros(3 * numOfTriplets, dtype=np.uint8)
+    numOfBytes = min(len(rawBytes), 3 * numOfTriplets)
+    triplets[:numOfBytes] = rawBytes[:numOfBytes]
+    triplets = triplets.reshape((numOfTriplets, 3)).astype(np.int16)
+
+    values = np.empty(2 * numOfTriplets, dtype=np.int16)
+    values[0::2] = triplets[:, 0] | ((triplets[:, 1] & 0x0F) << 8)
+    values[1::2] = triplets[:, 2] | ((triplets[:, 1] & 0xF0) << 4)
+
+    # The samples are 12-bit two's complement integers.
+    values[values > 2047] -= 4096
+
+    return values[:numOfValues]
+
+def readSignalFile(fullFileName, signalFormat, byteOffset, numOfSignalsInFile, numOfSamples, begSampleIndex=0):
+    '''
+        Reads the signal file [fullFileName], which contains the interleaved samples of [numOfSignalsInFile] leads
+        stored in the WFDB format [signalFormat] starting [byteOffset] bytes into the file, and returns a
+        [numOfSamples] x [numOfSignalsInFile] numpy array of the raw ADC values and a boolean numpy array of the same
+        shape that is True wherever a sample is marked as invalid.
+
+        Only the bytes of the [numOfSamples] samples beginning with the sample whose index is [begSampleIndex] are read.
+        If [numOfSamples] is None, all of the samples in the file from that sample on are read.
+    '''
+
+    if (signalFormat == 212):
+        bytesPerFrame = 1.5 * numOfSignalsInFile
+    elif (signalFormat == 16):
+        bytesPerFrame = 2 * numOfSignalsInFile
+    elif (signalFormat == 80):
+        bytesPerFrame = numOfSignalsInFile
+    else:
+        raise ValueError('Unsupported signal format ' + str(signalFormat) + ': ' + fullFileName)
+
+    if (numOfSamples is None):
+        numOfSamples = int((os.path.getsize(fullFileName) - byteOffset) // bytesPerFrame) - begSampleIndex
+
+    numOfValues = numOfSamples * numOfSignalsInFile
+    begValueIndex = begSampleIndex * numOfSignalsInFile
+
+    f = open(fullFileName, 'rb')
+    if (signalFormat == 212):
+        # Every pair of values is stored in three bytes, so reading must begin with the first value of a pair.
+        numOfSkippedValues = begValueIndex % 2
+        f.seek(byteOffset + 3 * (begValueIndex // 2))
+        rawBytes = np.fromfile(f, dtype=np.uint8, count=int(np.ceil(1.5 * (numOfSkippedValues + numOfValues))))
+        values = decodeFormat212(rawBytes, numOfSkippedValues + numOfValues)[numOfSkippedValues:]
+        invalid = (values == INVALID_SAMPLE_212)
+    elif (signalFormat == 16):
+        f.seek(byteOffset + 2 * begValueIndex)
+        values = np.fromfile(f, dtype='<i2', count=numOfValues).astype(np.int16)
+        invalid = (values == -32768)
+    else:
+        f.seek(byteOffset + begValueIndex)
+        values = (np.fromfile(f, dtype=np.uint8, count=numOfValues).astype(np.int16) - 128)
+        invalid = (values == -128)
+    f.close()
+
+    if (len(values) < numOfValues):
+        raise ValueError('The signal file ' + fullFileName + ' contains fewer samples than its header specifies.')
+
+    return (values.reshape((numOfSamples, numOfSignalsInFile)), invalid.reshape((numOfSamples, numOfSignalsInFile)))
+
+def readSignal(databaseName, patientName, header=None, begSampleIndex=0, endSampleIndex=None):
+    '''
+        Reads the signal file(s) associated with the ECG signal for patient [patientName] in database [databaseName]
+        and returns a tuple of the form ([adcValues], [invalid]), where [adcValues] is a [numOfSamples] x [numOfSignals]
+        numpy array of 16-bit integers containing the raw ADC values of each lead and [invalid] is a boolean numpy array
+        of the same shape that is True wherever a sample is marked as invalid.
+
+        Only the samples whose indices are at least [begSampleIndex] and less than [endSampleIndex] (or all of the samples
+        from [begSampleIndex] on, if it is None) are read.
+
+        [header] is the dictionary returned by readHeader.  If it is None, the header file is read.
+    '''
+
+    if (header is None):
+        header = readHeader(databaseName, patientName)
+
+    signals = header['signals']
+    numOfSamples = header['numOfSamples']
+    if (endSampleIndex is not None):
+        numOfSamples = endSampleIndex - begSampleIndex
+    elif (numOfSamples is not None):
+        numOfSamples = numOfSamples - begSampleIndex
+
+    # Group the leads by the signal file in which they are stored, preserving the order of the leads.
+    fileNames = []
+    for signal in signals:
+        if (signal['fileName'] not in fileNames):
+            fileNames.append(signal['fileName'])
+
+    columns = []
+    invalidColumns = []
+    for fileName in fileNames:
+        signalsInFile = [signal for signal in signals if signal['fileName'] == fileName]
+        (values, invalid) = readSignalFile(os.path.join(databaseName, fileName), signalsInFile[0]['format'],
+                                           signalsInFile[0]['byteOffset'], len(signalsInFile), numOfSamples, begSampleIndex)
+        numOfSamples = values.shape[0]
+        columns.append(values)
+        invalidColumns.append(invalid)
+
+    return (np.hstack(columns), np.hstack(invalidColumns))
+
+def getECGSignalFromBinary(databaseName, patientName):
+    '''
+        Reads the signal file associated with the ECG signal for patient [patientName] in database [databaseName]
+        and produces (and returns) a [numOfSamples] x (1 + [numOfDataSources]) two-dimensional numpy array, where
+        [numOfSamples] is the number of samples in the ECG signal and [numOfDataSources] is the number of data sources.
+
+        The first column contains the time stamps (in seconds) of the samples and the remaining columns contain the
+        ECG readings (in millivolts) of each lead, just like the data text file produced by "rdsamp -p".  Invalid
+        samples are represented by NaN.
+    '''
+
+    header = readHeader(databaseName, patientName)
+    (adcValues, invalid) = readSignal(databaseName, patientName, header)
+
+    (numOfSamples, numOfSignals) = adcValues.shape
+    gains = np.array([signal['gain'] for signal in header['signals']])
+    baselines = np.array([signal['baseline'] for signal in header['signals']])
+
+    ecgData = np.empty((numOfSamples, 1 + numOfSignals), dtype=np.float64)
+    ecgData[:, 0] = np.arange(numOfSamples) / header['samplingFrequency']
+    ecgData[:, 1:] = (adcValues - baselines) / gains
+    ecgData[:, 1:][invalid] = np.nan
+
+    return ecgData
+
+def getCompactECGSignalFromBinary(databaseName, patientName, header=None, begSampleIndex=0, endSampleIndex=None):
+    '''
+        Reads the signal file associated with the ECG signal for patient [patientName] in database [databaseName]
+        and returns a tuple of the form ([timeStamps], [adcValues]), where [timeStamps] is a numpy array containing the
+        time stamps (in seconds) of the samples and [adcValues] is a [numOfSamples] x [numOfDataSources] numpy array of
+        16-bit integers containing the raw ADC values of each lead, in which invalid samples are [INVALID_ADC_VALUE].
+
+        The ADC values of the (n + 1)-th lead can be converted into the ECG readings returned by getECGSignalFromBinary by
+        adcToPhysical with the gain and baseline header['signals'][n]['gain'] and header['signals'][n]['baseline'].
+
+        Only the samples whose indices are at least [begSampleIndex] and less than [endSampleIndex] are read (see readSignal).
+
+        [header] is the dictionary returned by readHeader.  If it is None, the header file is read.
+    '''
+
+    if (header is None):
+        header = readHeader(databaseName, patientName)
+    (adcValues, invalid) = readSignal(databaseName, patientName, header, begSampleIndex, endSampleIndex)
+
+    adcValues = np.array(adcValues, dtype=np.int16)
+    adcValues[invalid] = INVALID_ADC_VALUE
+
+    timeStamps = np.arange(begSampleIndex, begSampleIndex + adcValues.shape[0]) / header['samplingFrequency']
+
+    return (timeStamps, adcValues)
+
+def adcToPhysical(adcValues, gain, baseline, dtype=np.float64):
+    '''
+        Converts [adcValues], a numpy array of raw ADC values, into ECG readings (in millivolts) using [gain] and [baseline],
+        which are either numbers or numpy arrays of the same shape as [adcValues].  Samples whose ADC value is [INVALID_ADC_VALUE]
+        are converted into NaN.
+
+        Returns a numpy array whose elements are of type [dtype].
+    '''
+
+    adcValues = np.asarray(adcValues)
+
+    ecgReadings = (adcValues.astype(dtype) - np.asarray(baseline, dtype=dtype)) / np.asarray(gain, dtype=dtype)
+    ecgReadings[adcValues == INVALID_ADC_VALUE] = np.nan
+
+    return ecgReadings
+
+def getLeadNamesFromHea(databaseName, patientName):
+    '''
+        Returns a vector containing the names of all of leads that have been used to collect ECG signals from the patient
+        [patientName] in the database [databaseName] in the order in which they are recorded in the signal file associated
+        with the specified patient.
+    '''
+
+    return [signal['leadName'] for signal in readHeader(databaseName, patientName)['signals']]
+
+def readAnnotations(databaseName, patientName):
+    '''
+        Reads the annotation file associated with the ECG signal for patient [patientName] in database [databaseName]
+        and returns a tuple of the form ([sampleIndices], [types], [auxillaries]), where [sampleIndices] is a numpy array
+        containing the (zero-indexed) sample index of every annotation, [types] is a list containing the mnemonic of every
+        annotation (e.g. 'N' or '+') and [auxillaries] is a list containing the auxillary string of every annotation (the
+        empty string if the annotation has none).
+    '''
+
+    fullFileName = os.path.join(databaseName, patientName) + ANNOTATOR_EXTENSION
+
+    # Each annotation consists of a 16-bit little-endian word, whose 6 most significant bits contain the annotation
+    # code [A] and whose 10 least significant bits contain the number of samples [I] since the previous annotation,
+    # optionally followed by words containing pseudo-annotations.
+    rawBytes = np.fromfile(fullFileName, dtype=np.uint8)
+    words = rawBytes[:len(rawBytes) - (len(rawBytes) % 2)].view('<u2')
+    codes = (words >> 10).tolist()
+    intervals = (words & 0x3FF).tolist()
+
+    sampleIndices = []
+    types = []
+    auxillaries = []
+
+    sampleIndex = 0
+    wordIndex = 0
+    numOfWords = len(codes)
+    while (wordIndex < numOfWords):
+        code = codes[wordIndex]
+        interval = intervals[wordIndex]
+
+        # A word of zero marks the end of the file.
+        if (code == 0 and interval == 0):
+            break
+
+        if (code == SKIP):
+            # The next two words contain the (signed) number of samples to skip, most significant word first.
+            skip = (int(words[wordIndex + 1]) << 16) | int(words[wordIndex + 2])
+            if (skip >= 2 ** 31):
+                skip = skip - 2 ** 32
+            sampleIndex = sampleIndex + skip
+            wordIndex = wordIndex + 3
+        elif (code == AUX):
+            # The next [interval] bytes (padded to an even number of bytes) contain the auxillary string of the
+            # previous annotation.
+            begByte = 2 * (wordIndex + 1)
+            aux = str(rawBytes[begByte:begByte + interval].tobytes().decode('latin-1').rstrip('\x00'))
+            if (len(auxillaries) > 0):
+                auxillaries[-1] = aux
+            wordIndex = wordIndex + 1 + (interval + 1) // 2
+        elif (code == NUM or code == SUB or code == CHN):
+            wordIndex = wordIndex + 1
+        else:
+            sampleIndex = sampleIndex + interval
+            sampleIndices.append(sampleIndex)
+            types.append(ANNOTATION_MNEMONICS[code])
+            auxillaries.append('')
+            wordIndex = wordIndex + 1
+
+    # Annotation files may begin with header annotations (NOTE annotations at the first sample whose auxillary strings
+    # begin with "## "), which are not displayed by rdann.
+    numOfHeaderAnnotations = 0
+    while (numOfHeaderAnnotations < len(types) and sampleIndices[numOfHeaderAnnotations] == 0 and
+           types[numOfHeaderAnnotations] == ANNOTATION_MNEMONICS[NOTE] and auxillaries[numOfHeaderAnnotations].startswith('## ')):
+        numOfHeaderAnnotations = numOfHeaderAnnotations + 1
+
+    return (np.array(sampleIndices[numOfHeaderAnnotations:], dtype=np.int64), types[numOfHeaderAnnotations:],
+            auxillaries[numOfHeaderAnnotations:])
+
+def getBeatsFromAtr(databaseName, patientName):
+    '''
+        Reads the annotation file associated with the ECG signal for patient [patientName] in database [databaseName]
+        and produces (and returns) a list of tuples of the form ([beginSampleIndex], [endSampleIndex], [typeOfBeat], [auxillary]).
+
+        The returned list is identical to the list returned by getBeatsFromAnn in readData.py for the annotation text file
+        produced by rdann (see the documentation for that method for a full description of the list).
+    '''
+
+    (sampleIndices, types, auxillaries) = readAnnotations(databaseName, patientName)
+
+    # Every annotation ends the beat that began one sample after the previous annotation.  Mirror getBeatsFromAnn,
+    # which (treating the sample numbers printed by rdann as one-indexed) subtracts one from both indices.
+    endSampleIndices = sampleIndices - 1
+    begSampleIndices = np.empty_like(sampleIndices)
+    begSampleIndices[0] = -1
+    begSampleIndices[1:] = sampleIndices[:-1]
+
+    listOfBeats = []
+    lastAux = ""
+    for (begSampleIndex, endSampleIndex, beatType, aux) in zip(begSampleIndices.tolist(), endSampleIndices.tolist(), types, auxillaries):
+        listOfBeats.append((begSampleIndex, endSampleIndex, beatType, lastAux))
+
+        # rdann prints the auxillary string as the last column, so getBeatsFromAnn only notices it if it contains no
+        # whitespace.
+        if (aux != '' and len(aux.split()) == 1):
+            lastAux = aux
+
+    # Remove the first and last tuple because they will correspond to incomplete beats.
+    listOfBeats.pop(0)
+    listOfBeats.pop()
+
+    return listOfBeats